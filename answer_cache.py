@@ -0,0 +1,132 @@
+"""
+On-disk cache of language model answers, shared by every worker process.
+
+Answers are stored in a SQLite file in WAL mode, so any number of gunicorn
+workers read it concurrently while one writes, and they survive pm2
+restarts and gunicorn's max-requests recycling. Entries are keyed by
+(model, knowledge hash, normalized question): a new catalog version or
+another model never sees old answers, and they age out of the size-capped
+table least recently used first.
+"""
+
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+QUERY_PUNCTUATION_RE = re.compile(r"[?!.,;:\s]+")
+TOUCH_INTERVAL = 60  # Seconds between last-used updates of a hot entry, to keep reads read-only
+
+
+def normalize_query(query):
+    """Question text as cached: lowercase, punctuation and spacing folded"""
+    return QUERY_PUNCTUATION_RE.sub(" ", query.lower()).strip()
+
+
+def answer_key(model, knowledge_hash, query):
+    """Cache key for a question asked of model with the given knowledge"""
+    return hashlib.sha256(f"{model}\0{knowledge_hash}\0{normalize_query(query)}".encode("utf-8")).hexdigest()
+
+
+class AnswerCache:
+    """Size-capped LRU table of answers in a SQLite file"""
+
+    def __init__(self, path, max_entries=5000):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        # Per process: each worker reports the hit rate it saw
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+
+        self._connection().execute(
+            "CREATE TABLE IF NOT EXISTS answers (key TEXT PRIMARY KEY, model TEXT NOT NULL, "
+            "knowledge TEXT NOT NULL, query TEXT NOT NULL, answer TEXT NOT NULL, "
+            "created REAL NOT NULL, last_used REAL NOT NULL)")
+        self._connection().execute("CREATE INDEX IF NOT EXISTS answers_last_used ON answers (last_used)")
+
+    def _connection(self):
+        # One connection per thread and process; connections must not cross a fork
+        db = getattr(self._local, "db", None)
+        if db is None or self._local.pid != os.getpid():
+            db = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+            self._local.pid = os.getpid()
+        return db
+
+    def get(self, model, knowledge_hash, query):
+        """Cached answer, or None; a broken cache file only costs a miss"""
+        return self.get_any([model], knowledge_hash, query)
+
+    def get_any(self, models, knowledge_hash, query):
+        """Cached answer of the first of models that has one, or None; one hit or miss per call"""
+        keys = [answer_key(model, knowledge_hash, query) for model in models]
+        try:
+            db = self._connection()
+            rows = dict((row[0], row[1:]) for row in db.execute(
+                f"SELECT key, answer, last_used FROM answers WHERE key IN ({', '.join('?' * len(keys))})", keys))
+            key = next((key for key in keys if key in rows), None)
+            row = rows.get(key)
+            now = time.time()
+            if row is not None and now - row[1] > TOUCH_INTERVAL:
+                db.execute("UPDATE answers SET last_used = ? WHERE key = ?", (now, key))
+        except sqlite3.Error as e:
+            logger.warning(f"Answer cache read failed: {e}")
+            row = None
+        with self._lock:
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return row[0]
+
+    def put(self, model, knowledge_hash, query, answer):
+        now = time.time()
+        try:
+            db = self._connection()
+            db.execute("INSERT OR REPLACE INTO answers (key, model, knowledge, query, answer, created, last_used) "
+                       "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                       (answer_key(model, knowledge_hash, query), model, knowledge_hash, normalize_query(query),
+                        answer, now, now))
+            evicted = db.execute("DELETE FROM answers WHERE key IN (SELECT key FROM answers "
+                                 "ORDER BY last_used DESC LIMIT -1 OFFSET ?)", (self.max_entries,)).rowcount
+        except sqlite3.Error as e:
+            logger.warning(f"Answer cache write failed: {e}")
+            return
+        with self._lock:
+            self.writes += 1
+            self.evictions += max(0, evicted)
+
+    def clear(self):
+        self._connection().execute("DELETE FROM answers")
+
+    def __len__(self):
+        return self._connection().execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+
+    def stats(self):
+        entries = len(self)
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "path": self.path,
+                "entries": entries,
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "writes": self.writes,
+                "evictions": self.evictions,
+            }
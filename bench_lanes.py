@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Benchmark fast-lane latency while the language model is saturated
+
+Serves the app with waitress (as start_production.py does) and a fake
+model that takes --llm-seconds per answer, keeps --llm-clients clients
+asking questions that need the model, and measures the latency of
+questions answered without it (listings, greetings, prices) from one
+client. Each configuration runs in its own subprocess:
+
+    idle       no model traffic
+    no-lanes   model traffic, lane limits off (SLOW_LANE_CONCURRENCY=0)
+    lanes      model traffic, the configured lanes
+
+With lanes the fast p99 should stay close to the idle one: model-bound
+requests beyond the slow lane are answered from the catalog at once
+instead of holding the server's threads.
+
+Usage:
+    python bench_lanes.py
+    python bench_lanes.py --threads 4 --llm-clients 8 --llm-seconds 2 --seconds 15
+"""
+
+import argparse
+import http.client
+import json
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+FAST_QUERIES = [
+    "what products do you have",
+    "hello",
+    "how much is the camshaft",
+    "what services do you offer",
+    "magkano ang brake pads",
+    "what are your hours",
+    "do you have brake pads",
+]
+LLM_QUERIES = [
+    "can you explain why my engine makes a noise when it is cold",
+    "what should I do if my car overheats in traffic",
+    "is it bad to drive with the check engine light on",
+]
+
+CONFIGURATIONS = {
+    "idle": {},
+    "no-lanes": {"SLOW_LANE_CONCURRENCY": "0"},
+    "lanes": {},
+}
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+def ask(port, message):
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=120)
+    try:
+        connection.request("POST", "/api/chat", body=json.dumps({"message": message}),
+                           headers={"Content-Type": "application/json"})
+        response = connection.getresponse()
+        body = json.loads(response.read() or b"{}")
+        return response.status, body.get("response", "")
+    finally:
+        connection.close()
+
+
+def run_server(args, port):
+    """Child process: the app under waitress with a fake model"""
+    import main
+    from waitress import serve
+
+    def fake_chat(model, messages, **kwargs):
+        time.sleep(args.llm_seconds)
+        return {"message": {"content": "An answer from the fake model."}, "load_duration": 0}
+
+    main.ollama_client.chat = fake_chat
+    serve(main.app, host="127.0.0.1", port=port, threads=args.threads, _quiet=True)
+
+
+def measure(args, name):
+    """Child process: start the server, apply the load and print the results as JSON"""
+    port = args.port
+    server = threading.Thread(target=run_server, args=(args, port), daemon=True)
+    server.start()
+    for _ in range(200):
+        try:
+            ask(port, "hello")
+            break
+        except OSError:
+            time.sleep(0.1)
+
+    stop = threading.Event()
+    slow = {"model": 0, "turned_away": 0}
+    slow_lock = threading.Lock()
+
+    def llm_client(index):
+        n = 0
+        while not stop.is_set():
+            n += 1
+            # A counter keeps every question out of the answer caches
+            status, text = ask(port, f"{LLM_QUERIES[n % len(LLM_QUERIES)]} {index}-{n}")
+            answered = text.startswith("An answer from the fake model")
+            with slow_lock:
+                slow["model" if answered else "turned_away"] += 1
+            if not answered:
+                time.sleep(args.retry_seconds)  # The customer reads the catalog answer before asking again
+
+    clients = []
+    if name != "idle":
+        clients = [threading.Thread(target=llm_client, args=(i,), daemon=True) for i in range(args.llm_clients)]
+        for client in clients:
+            client.start()
+        time.sleep(args.llm_seconds)  # Let the model traffic fill the threads
+
+    latencies = []
+    deadline = time.monotonic() + args.seconds
+    n = 0
+    while time.monotonic() < deadline:
+        start = time.perf_counter()
+        ask(port, FAST_QUERIES[n % len(FAST_QUERIES)])
+        latencies.append((time.perf_counter() - start) * 1000)
+        n += 1
+        time.sleep(args.fast_interval)
+    stop.set()
+
+    latencies.sort()
+    print(json.dumps({
+        "fast_requests": len(latencies),
+        "fast_p50_ms": round(statistics.median(latencies), 2),
+        "fast_p99_ms": round(percentile(latencies, 0.99), 2),
+        "fast_max_ms": round(latencies[-1], 2),
+        "llm_answered": slow["model"],
+        "llm_turned_away": slow["turned_away"],
+    }))
+    sys.stdout.flush()
+    os._exit(0)  # Waitress and the load threads do not stop on their own
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark fast-lane latency under model saturation")
+    parser.add_argument("--threads", type=int, default=4, help="waitress threads (default: 4)")
+    parser.add_argument("--llm-clients", type=int, default=8, help="concurrent model-bound clients (default: 8)")
+    parser.add_argument("--llm-seconds", type=float, default=2.0, help="fake model time per answer (default: 2)")
+    parser.add_argument("--seconds", type=float, default=10.0, help="measuring time per configuration (default: 10)")
+    parser.add_argument("--retry-seconds", type=float, default=1.0,
+                        help="pause of a model-bound client after a catalog answer (default: 1)")
+    parser.add_argument("--fast-interval", type=float, default=0.02, help="pause between fast requests (default: 0.02)")
+    parser.add_argument("--port", type=int, default=18551)
+    parser.add_argument("--measure", choices=CONFIGURATIONS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        measure(args, args.measure)
+        return
+
+    base_env = dict(os.environ, OLLAMA_WARMUP="0", CACHE_WARMUP="0", RATE_LIMIT_ENABLED="0",
+                    ANSWER_CACHE_PATH="", OLLAMA_SMALL_MODEL="", CHAT_JOB_STORE="memory")
+    print(f"waitress threads={args.threads}, {args.llm_clients} model-bound clients, "
+          f"{args.llm_seconds}s per model answer")
+    print(f"{'configuration':<12} {'fast n':>7} {'p50 ms':>9} {'p99 ms':>9} {'max ms':>9} "
+          f"{'llm answered':>13} {'turned away':>12}")
+    for name, overrides in CONFIGURATIONS.items():
+        command = [sys.executable, __file__, "--measure", name,
+                   "--threads", str(args.threads), "--llm-clients", str(args.llm_clients),
+                   "--llm-seconds", str(args.llm_seconds), "--seconds", str(args.seconds),
+                   "--retry-seconds", str(args.retry_seconds),
+                   "--fast-interval", str(args.fast_interval), "--port", str(args.port)]
+        output = subprocess.run(command, env=dict(base_env, **overrides), capture_output=True, text=True)
+        lines = [line for line in output.stdout.splitlines() if line.startswith("{")]
+        if not lines:
+            print(f"{name:<12} failed:\n{output.stderr[-2000:]}")
+            continue
+        result = json.loads(lines[-1])
+        print(f"{name:<12} {result['fast_requests']:>7} {result['fast_p50_ms']:>9.2f} {result['fast_p99_ms']:>9.2f} "
+              f"{result['fast_max_ms']:>9.2f} {result['llm_answered']:>13} {result['llm_turned_away']:>12}")
+
+
+if __name__ == "__main__":
+    main()
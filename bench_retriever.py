@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Benchmark the retriever backends used by rag_pipeline.py
+
+Compares the Chroma path with the in-process flat vector index on import
+time, resident memory and query latency. Each backend runs in its own
+subprocess so import cost and RSS are measured from a clean interpreter.
+
+Usage:
+    python bench_retriever.py                    # real Ollama embeddings
+    python bench_retriever.py --fake-embeddings  # deterministic, no Ollama needed
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+QUERIES = [
+    "how much is the camshaft",
+    "what transmission services do you offer",
+    "brake pads price",
+    "where is the shop located",
+    "do you have a warranty on engine rebuilds",
+    "magkano ang cvt cleaning",
+    "what payment methods do you accept",
+    "how often should I change my engine oil",
+]
+
+
+class FakeEmbeddings:
+    """Deterministic bag-of-words hashing embeddings for offline benchmarking"""
+
+    def __init__(self, dim=896):
+        self.dim = dim
+
+    def embed_query(self, text):
+        vector = [0.0] * self.dim
+        for token in re.findall(r"\w+", text.lower()):
+            h = int(hashlib.md5(token.encode("utf-8")).hexdigest(), 16)
+            vector[h % self.dim] += 1.0 if (h >> 64) & 1 else -1.0
+        return vector
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+
+def rss_mb():
+    """Current resident set size in MB"""
+    with open("/proc/self/statm") as f:
+        pages = int(f.read().split()[1])
+    return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+
+def load_chunks():
+    from langchain_community.document_loaders import TextLoader
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+    documents = TextLoader("knowledge_base.txt", encoding="utf-8").load()
+    return RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=100).split_documents(documents)
+
+
+def run_backend(backend, fake_embeddings, repeat, quantize):
+    """Measure a single backend inside this (fresh) process and print a JSON result"""
+    baseline_rss = rss_mb()
+    chunks = load_chunks()
+
+    if fake_embeddings:
+        embedding = FakeEmbeddings()
+    else:
+        from langchain_ollama.embeddings import OllamaEmbeddings
+        from embedding_cache import CachedEmbeddings
+        embedding = CachedEmbeddings(OllamaEmbeddings(model="qwen2.5:0.5b"), model="qwen2.5:0.5b")
+
+    start = time.perf_counter()
+    if backend == "flat":
+        from vector_index import FlatVectorStore
+    else:
+        from langchain_community.vectorstores import Chroma
+    import_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    if backend == "flat":
+        store = FlatVectorStore.from_documents(chunks, embedding, quantize=quantize)
+    else:
+        store = Chroma.from_documents(chunks, embedding)
+    build_seconds = time.perf_counter() - start
+
+    retriever = store.as_retriever(search_kwargs={"k": 2})
+    retriever.invoke(QUERIES[0])  # warm up
+
+    latencies = []
+    for _ in range(repeat):
+        for query in QUERIES:
+            start = time.perf_counter()
+            retriever.invoke(query)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    latencies.sort()
+    print(json.dumps({
+        "backend": backend + ("-int8" if backend == "flat" and quantize else ""),
+        "chunks": len(chunks),
+        "import_ms": round(import_seconds * 1000, 1),
+        "build_ms": round(build_seconds * 1000, 1),
+        "rss_mb": round(rss_mb(), 1),
+        "rss_delta_mb": round(rss_mb() - baseline_rss, 1),
+        "query_p50_ms": round(statistics.median(latencies), 3),
+        "query_p95_ms": round(latencies[int(len(latencies) * 0.95) - 1], 3),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark RAG retriever backends")
+    parser.add_argument("--backends", default="chroma,flat,flat-int8",
+                        help="Comma separated list of: chroma, flat, flat-int8")
+    parser.add_argument("--fake-embeddings", action="store_true",
+                        help="Use deterministic hashing embeddings instead of Ollama")
+    parser.add_argument("--repeat", type=int, default=50, help="Passes over the query set")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        backend = "flat" if args.child.startswith("flat") else args.child
+        run_backend(backend, args.fake_embeddings, args.repeat, args.child == "flat-int8")
+        return
+
+    print(f"{'backend':<10} {'chunks':>6} {'import ms':>10} {'build ms':>9} {'RSS MB':>8} "
+          f"{'ΔRSS MB':>8} {'p50 ms':>8} {'p95 ms':>8}")
+    for backend in args.backends.split(","):
+        cmd = [sys.executable, __file__, "--child", backend, "--repeat", str(args.repeat)]
+        if args.fake_embeddings:
+            cmd.append("--fake-embeddings")
+        proc = subprocess.run(cmd, capture_output=True, text=True)
+        if proc.returncode != 0:
+            error = (proc.stderr.strip().splitlines() or ["failed"])[-1]
+            print(f"{backend:<10} unavailable: {error}")
+            continue
+        r = json.loads(proc.stdout.strip().splitlines()[-1])
+        print(f"{r['backend']:<10} {r['chunks']:>6} {r['import_ms']:>10} {r['build_ms']:>9} {r['rss_mb']:>8} "
+              f"{r['rss_delta_mb']:>8} {r['query_p50_ms']:>8} {r['query_p95_ms']:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+"""
+Background warming of the answer caches after a knowledge base is published.
+
+The phrases listed in SUPPORTED_QUESTIONS.md and the most frequent live
+questions are answered once against the new snapshot, so the first
+customers asking them after a deploy or /api/reload find the answer
+cached instead of waiting on the model. Warming runs on a few daemon
+threads, waits while customer requests are being answered (by any
+worker on the host when the in-flight count is kept in a shared file), and
+a newer snapshot of the same tenant supersedes a run still in progress.
+
+Live questions are counted with the space-saving algorithm: a fixed
+number of counters, the smallest one taken over by a new question, so the
+frequent ones are found in bounded memory.
+"""
+
+import logging
+import mmap
+import os
+import random
+import re
+import struct
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import fcntl
+except ImportError:  # Windows: only the per-process count is available
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Outcomes of warming one question
+WARM = "warm"  # Already answered without the model (catalog, canned answer or a cache hit)
+WARMED = "warmed"  # Answered by the model now and cached
+FAILED = "failed"
+SKIPPED = "skipped"  # Superseded by a newer snapshot or given up after repeated failures
+
+QUESTION_LINE_RE = re.compile(r'^- "(.+)"$')
+MAX_CONSECUTIVE_FAILURES = 3  # The model is likely down; stop rather than burn through the list
+
+IN_FLIGHT_MAGIC = b"PBIF0001"
+IN_FLIGHT_HEADER = struct.Struct("<8sQ")  # magic, slot count
+IN_FLIGHT_SLOT = struct.Struct("<qq")  # pid (0 = free), answers in flight
+
+
+def read_supported_questions(path="SUPPORTED_QUESTIONS.md"):
+    """Quoted example questions of SUPPORTED_QUESTIONS.md, without [placeholder] templates"""
+    if not os.path.exists(path):
+        return []
+    questions = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            match = QUESTION_LINE_RE.match(line.strip())
+            if match and "[" not in match.group(1):
+                questions.append(match.group(1))
+    return questions
+
+
+class QueryCounter:
+    """Approximate counts of the most frequent questions (space-saving)"""
+
+    def __init__(self, capacity=500):
+        self.capacity = capacity
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def record(self, query):
+        with self._lock:
+            if query in self._counts or len(self._counts) < self.capacity:
+                self._counts[query] = self._counts.get(query, 0) + 1
+                return
+            smallest = min(self._counts, key=self._counts.get)
+            self._counts[query] = self._counts.pop(smallest) + 1
+
+    def top(self, n):
+        """Up to n (query, count) pairs, most frequent first"""
+        with self._lock:
+            return sorted(self._counts.items(), key=lambda item: -item[1])[:n]
+
+    def __len__(self):
+        return len(self._counts)
+
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class InFlightCounter:
+    """
+    Customer answers in flight. With a path, every process on the host has
+    a slot in a small memory-mapped file and busy() sees the answers of all
+    gunicorn workers; each process only writes its own slot, and slots of
+    processes that died are taken over. Without one the count is per process.
+    """
+
+    def __init__(self, path=None, slots=256):
+        if path and fcntl is None:
+            raise RuntimeError("A shared in-flight count needs fcntl (POSIX)")
+        self.path = path
+        self.slots = slots
+        self._lock = threading.Lock()
+        self._count = 0
+        self._pid = None
+        self._map = None
+        self._offset = None  # Of this process's slot; None while it has none
+        if path:
+            self._attach()
+
+    def _attach(self):
+        """Map the file and claim a slot; called again after a fork"""
+        self._pid = os.getpid()
+        self._count = 0
+        self._offset = None
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        size = IN_FLIGHT_HEADER.size + IN_FLIGHT_SLOT.size * self.slots
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                header = os.pread(fd, IN_FLIGHT_HEADER.size, 0)
+                expected = IN_FLIGHT_HEADER.pack(IN_FLIGHT_MAGIC, self.slots)
+                if header != expected:
+                    os.ftruncate(fd, 0)
+                    os.ftruncate(fd, size)
+                    os.pwrite(fd, expected, 0)
+                self._map = mmap.mmap(fd, size)
+                for i in range(self.slots):
+                    offset = IN_FLIGHT_HEADER.size + i * IN_FLIGHT_SLOT.size
+                    pid, _ = IN_FLIGHT_SLOT.unpack_from(self._map, offset)
+                    if pid == 0 or pid == self._pid or not _process_alive(pid):
+                        IN_FLIGHT_SLOT.pack_into(self._map, offset, self._pid, 0)
+                        self._offset = offset
+                        break
+                else:
+                    logger.warning(f"No free slot in {self.path}: other workers cannot see this one's requests")
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+        finally:
+            os.close(fd)  # The mapping stays valid
+
+    def _ensure_attached(self):
+        if self.path and self._pid != os.getpid():
+            try:
+                self._attach()
+            except OSError as e:
+                logger.warning(f"Could not open {self.path}, other workers cannot see this one's requests: {e}")
+                self._map = self._offset = None
+
+    def add(self, delta):
+        with self._lock:
+            self._ensure_attached()
+            self._count += delta
+            if self._offset is not None:
+                IN_FLIGHT_SLOT.pack_into(self._map, self._offset, self._pid, self._count)
+
+    def busy(self):
+        """Whether a customer's question is being answered (in any process sharing the file)"""
+        with self._lock:
+            self._ensure_attached()
+            if self._count > 0:
+                return True
+            if self._map is None:
+                return False
+            slots = [IN_FLIGHT_SLOT.unpack_from(self._map, IN_FLIGHT_HEADER.size + i * IN_FLIGHT_SLOT.size)
+                     for i in range(self.slots)]
+        return any(count > 0 and pid != self._pid and _process_alive(pid) for pid, count in slots)
+
+
+class CacheWarmer:
+    """
+    Answers a list of questions in the background whenever a snapshot is
+    published. ``answer(kb, question)`` returns WARM, WARMED or FAILED;
+    ``is_busy()`` tells whether customer requests are being answered. Each
+    tenant has its own runs: a new snapshot only supersedes its tenant's.
+    """
+
+    def __init__(self, answer, questions, is_busy=None, concurrency=1, top_n=50, min_count=2, busy_poll=0.5):
+        self.answer = answer
+        self.questions = list(questions)
+        self.is_busy = is_busy or (lambda: False)
+        self.concurrency = max(1, concurrency)
+        self.top_n = top_n
+        self.min_count = min_count  # Live questions asked fewer times are not worth a model call
+        self.busy_poll = busy_poll
+        self.live = QueryCounter()
+
+        self._lock = threading.Lock()
+        self._generations = {}  # tenant -> generation of its latest run
+        self.runs = 0
+        self.running = {}  # tenant -> report of its run in progress
+        self.last_run = None
+
+    def record(self, query):
+        """Count a live question for the next warm-up"""
+        self.live.record(query)
+
+    def plan(self):
+        """Questions of the next run: live heavy hitters first, then the supported questions"""
+        fixed = self.questions[:]
+        # Workers warm in different orders, so parallel runs mostly fill different entries
+        random.Random(os.getpid()).shuffle(fixed)
+        seen = set()
+        plan = []
+        live = [query for query, count in self.live.top(self.top_n) if count >= self.min_count]
+        for question in live + fixed:
+            key = question.strip().lower()
+            if key and key not in seen:
+                seen.add(key)
+                plan.append(question)
+        return plan
+
+    def schedule(self, kb):
+        """Warm the caches for kb in the background, superseding a run in progress for the same tenant"""
+        with self._lock:
+            generation = self._generations.get(kb.tenant, 0) + 1
+            self._generations[kb.tenant] = generation
+        threading.Thread(target=self._run, args=(generation, kb), name="cache-warmer", daemon=True).start()
+
+    def _current(self, tenant, generation):
+        with self._lock:
+            return generation == self._generations.get(tenant)
+
+    def _run(self, generation, kb):
+        questions = self.plan()
+        report = {"tenant": kb.tenant, "version": kb.version, "questions": len(questions),
+                  WARM: 0, WARMED: 0, FAILED: 0, SKIPPED: 0, "coverage": 0.0, "seconds": 0.0}
+        state = {"consecutive_failures": 0}
+        started = time.monotonic()
+        with self._lock:
+            self.running[kb.tenant] = report
+
+        def warm(question):
+            while self.is_busy() and self._current(kb.tenant, generation):
+                time.sleep(self.busy_poll)
+            if not self._current(kb.tenant, generation) or state["consecutive_failures"] >= MAX_CONSECUTIVE_FAILURES:
+                outcome = SKIPPED
+            else:
+                try:
+                    outcome = self.answer(kb, question)
+                except Exception as e:
+                    logger.warning(f"Warming {question!r} failed: {e}")
+                    outcome = FAILED
+            with self._lock:
+                report[outcome] += 1
+                if outcome == FAILED:
+                    state["consecutive_failures"] += 1
+                elif outcome != SKIPPED:
+                    state["consecutive_failures"] = 0
+
+        with ThreadPoolExecutor(self.concurrency, thread_name_prefix="cache-warmer") as pool:
+            list(pool.map(warm, questions))
+
+        with self._lock:
+            report["coverage"] = round((report[WARM] + report[WARMED]) / len(questions), 4) if questions else 1.0
+            report["seconds"] = round(time.monotonic() - started, 2)
+            if self.running.get(kb.tenant) is report:
+                del self.running[kb.tenant]
+            self.runs += 1
+            self.last_run = report
+        logger.info(f"Warmed answers of tenant {kb.tenant} in {report['seconds']}s: {report[WARM]} already warm, "
+                    f"{report[WARMED]} from the model, {report[FAILED]} failed, {report[SKIPPED]} skipped "
+                    f"({report['coverage']:.0%} coverage)")
+
+    def stats(self):
+        with self._lock:
+            return {
+                "runs": self.runs,
+                "concurrency": self.concurrency,
+                "supported_questions": len(self.questions),
+                "live_questions_tracked": len(self.live),
+                "running": {tenant: dict(report) for tenant, report in self.running.items()},
+                "last_run": self.last_run,
+            }
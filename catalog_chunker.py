@@ -0,0 +1,185 @@
+"""
+Section-aware chunking for the catalog knowledge base.
+
+Splits knowledge_base.txt along its own structure instead of fixed character
+windows: ``===`` banners open a section, ``Heading:`` lines open a category
+block, and ``Q:``/``A:`` pairs become one chunk each. Every chunk is
+self-contained (it starts with its section and headings) and carries
+metadata with the section, categories and any priced item names it lists.
+"""
+
+import re
+
+BANNER_RE = re.compile(r'^\s*={3,}\s*$')
+HEADING_RE = re.compile(r'^([A-Za-z0-9][^:,]{1,40}):\s*$')
+ITEM_RE = re.compile(r'^-?\s*([A-Za-z0-9][^₱]{1,60}?)\s*[-–—:]\s*(?:Labor:\s*)?₱')
+QUESTION_RE = re.compile(r'^Q:\s*')
+
+
+def _item_names(lines):
+    names = []
+    for line in lines:
+        match = ITEM_RE.match(line.strip())
+        if match:
+            names.append(match.group(1).strip())
+    return names
+
+
+def _split_sections(text):
+    """Yield (section title, lines) pairs using the === banner lines"""
+    lines = text.splitlines()
+    section = "Overview"
+    current = []
+    i = 0
+
+    while i < len(lines):
+        # A banner is "=====", a title line, then "====="
+        if (BANNER_RE.match(lines[i]) and i + 2 < len(lines)
+                and BANNER_RE.match(lines[i + 2]) and lines[i + 1].strip()):
+            yield section, current
+            section = lines[i + 1].strip().title()
+            current = []
+            i += 3
+            continue
+        current.append(lines[i].rstrip())
+        i += 1
+
+    yield section, current
+
+
+def _split_blocks(lines):
+    """Group lines into paragraphs separated by blank lines"""
+    block = []
+    for line in lines:
+        if line.strip():
+            block.append(line)
+        elif block:
+            yield block
+            block = []
+    if block:
+        yield block
+
+
+def _render(section, blocks):
+    """Build one chunk from (category, kind, lines) blocks of the same section"""
+    parts = [f"{section}:"]
+    categories = []
+    items = []
+    for category, kind, lines in blocks:
+        if category and kind != "qa":
+            parts.append(f"{category}:")
+            categories.append(category)
+        parts.extend(line.rstrip() if kind == "qa" else line.strip() for line in lines)
+        items.extend(_item_names(lines))
+
+    kinds = {kind for _, kind, _ in blocks}
+    metadata = {
+        "section": section,
+        "category": " | ".join(categories),
+        "kind": kinds.pop() if len(kinds) == 1 else "mixed",
+        "items": ", ".join(items),
+        "item_count": len(items),
+    }
+    questions = [lines[0].strip()[2:].strip() for _, kind, lines in blocks if kind == "qa"]
+    if questions:
+        metadata["questions"] = " | ".join(questions)
+    return {"text": "\n".join(parts), "metadata": metadata}
+
+
+def _block_size(block):
+    category, _, lines = block
+    return len(category or "") + sum(len(line) + 1 for line in lines)
+
+
+def _pack(section, blocks, target_chars, max_chars):
+    """
+    Greedily merge consecutive blocks up to target_chars. A block is never
+    split unless it alone exceeds max_chars, in which case it is cut by
+    lines and its heading repeated in every piece.
+    """
+    chunks = []
+    group = []
+    size = 0
+
+    for block in blocks:
+        block_size = _block_size(block)
+
+        if block_size > max_chars:
+            if group:
+                chunks.append(_render(section, group))
+                group, size = [], 0
+            category, kind, lines = block
+            piece, piece_size = [], 0
+            for line in lines:
+                if piece and piece_size + len(line) + 1 > max_chars:
+                    chunks.append(_render(section, [(category, kind, piece)]))
+                    piece, piece_size = [], 0
+                piece.append(line)
+                piece_size += len(line) + 1
+            if piece:
+                chunks.append(_render(section, [(category, kind, piece)]))
+            continue
+
+        if group and size + block_size > target_chars:
+            chunks.append(_render(section, group))
+            group, size = [], 0
+        group.append(block)
+        size += block_size
+
+    if group:
+        chunks.append(_render(section, group))
+    return chunks
+
+
+def chunk_catalog(text, target_chars=600, max_chars=1200):
+    """
+    Split catalog text into self-contained chunks.
+
+    Category blocks and Q/A pairs are never cut in the middle; small
+    neighbours within the same section are merged up to target_chars.
+    Returns a list of {"text": str, "metadata": dict} in document order.
+    """
+    chunks = []
+
+    for section, lines in _split_sections(text):
+        blocks = []
+
+        for paragraph in _split_blocks(lines):
+            first = paragraph[0].strip()
+
+            if QUESTION_RE.match(first):
+                blocks.append((None, "qa", paragraph))
+                continue
+
+            heading = HEADING_RE.match(first)
+            if heading:
+                blocks.append((heading.group(1).strip(), "category", list(paragraph[1:])))
+                continue
+
+            # Paragraph without its own heading: continuation of the open category
+            if blocks and blocks[-1][1] == "category":
+                blocks[-1][2].extend(paragraph)
+            else:
+                blocks.append((None, "text", list(paragraph)))
+
+        chunks.extend(_pack(section, blocks, target_chars, max_chars))
+
+    return chunks
+
+
+class CatalogTextSplitter:
+    """Text splitter with the split_documents() interface used by rag_pipeline"""
+
+    def __init__(self, target_chars=600, max_chars=1200):
+        self.target_chars = target_chars
+        self.max_chars = max_chars
+
+    def split_documents(self, documents):
+        split = []
+        for doc in documents:
+            for chunk in chunk_catalog(doc.page_content, self.target_chars, self.max_chars):
+                split.append(type(doc)(
+                    page_content=chunk["text"],
+                    metadata={**doc.metadata, **chunk["metadata"]},
+                ))
+        return split
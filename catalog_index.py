@@ -0,0 +1,295 @@
+"""
+Typed, array-backed view of the PomWorkz catalog.
+
+Built once per knowledge base load from the catalog lines of the PDF
+("Camshaft - ₱1,700", "Engine Rebuild – ₱8,000 - ₱15,000") together with
+the category heading each line sits under. Items are compact ``__slots__``
+records; every (kind, category) view keeps its items sorted by price next
+to a plain list of prices, so price-range, cheapest/most-expensive and
+category questions are answered with bisect instead of the language model.
+"""
+
+import re
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+
+PRODUCT = "product"
+SERVICE = "service"
+
+BANNER_RE = re.compile(r'^\s*={3,}\s*$')
+ITEM_RE = re.compile(
+    r'^(?P<name>[A-Za-z0-9][^₱]*?)\s+[-–—]\s+(?:Labor:\s*)?₱\s*(?P<low>\d[\d,]*)'
+    r'(?:\s*[-–—]\s*₱?\s*(?P<high>\d[\d,]*))?'
+)
+
+# Query parsing: a bound needs a number right after its keyword, so
+# "under warranty" is not read as a price filter. The whole number is
+# taken ("20000", never "2000" of it), and numbers of days, hours, times
+# of day or distances are not amounts ("within 3 days", "up to 6pm")
+AMOUNT = (r'((?:₱|php|p)?\s*\d[\d,]*(?:\.\d+)?k?)(?![\d.k]|,\d)'
+          r'(?!\s*(?:am|pm|days?|araw|hours?|hrs?|oras|minutes?|mins?|weeks?|months?|years?|yrs?|km|kms'
+          r'|kilometers?|kph|mph|cc|o\'?clock|:\d)(?![a-z]))')
+BETWEEN_RE = re.compile(rf'(?:between|from|mula)\s*{AMOUNT}\s*(?:and|to|hanggang|-|–)\s*{AMOUNT}')
+UPPER_RE = re.compile(
+    rf'(?:under|below|less than|cheaper than|lower than|up to|at most|max(?:imum)?|within|budget(?: of| is)?'
+    rf'|hanggang|hindi lalagpas(?: sa)?|mababa sa|kulang sa)\s*{AMOUNT}'
+)
+UPPER_SUFFIX_RE = re.compile(rf'{AMOUNT}\s*(?:and below|or less|and under|pababa|below|or below)')
+LOWER_RE = re.compile(
+    rf'(?:over|above|more than|at least|higher than|starting at|mahigit(?: sa)?|higit sa|lampas sa)\s*{AMOUNT}'
+)
+LOWER_SUFFIX_RE = re.compile(rf'{AMOUNT}\s*(?:and above|or more|and up|pataas|or above)')
+CHEAPEST_RE = re.compile(r'cheapest|least expensive|lowest price|most affordable|pinaka\s*mura|pinakamura')
+PRICIEST_RE = re.compile(r'most expensive|priciest|highest price|pinaka\s*mahal|pinakamahal')
+
+PRICE_WORDS = {'price', 'prices', 'cost', 'costs', 'budget', 'presyo', 'magkano', 'halaga', 'peso', 'pesos'}
+PRODUCT_WORDS = {'part', 'parts', 'product', 'products', 'item', 'items', 'piyesa', 'piyesang', 'produkto'}
+SERVICE_WORDS = {'service', 'services', 'labor', 'serbisyo', 'repair', 'repairs'}
+
+CatalogQuery = namedtuple("CatalogQuery", ["kind", "category", "low", "high", "order", "terms"])
+
+
+def normalize_name(name):
+    """Lowercase, whitespace-normalized name as used for PRODUCTS/SERVICES keys"""
+    return re.sub(r'\s+', ' ', name).strip().lower()
+
+
+def _amount(text):
+    text = re.sub(r'^(?:₱|php|p)', '', text.strip()).replace(',', '').strip()
+    if text.endswith('k'):
+        return int(float(text[:-1]) * 1000)
+    return int(float(text))
+
+
+def _is_marked_amount(text):
+    """True if text carries a currency marker or a "k" suffix, so it is a price on its own"""
+    text = text.strip()
+    return text.endswith('k') or re.match(r'(?:₱|php|p)', text) is not None
+
+
+def _tokens(text):
+    return re.findall(r'[a-z0-9]+', text.lower())
+
+
+class CatalogItem:
+    """One priced catalog line; services may carry a price range"""
+
+    __slots__ = ("name", "display_name", "kind", "category", "min_price", "max_price", "tokens")
+
+    def __init__(self, name, display_name, kind, category, min_price, max_price):
+        self.name = name
+        self.display_name = display_name
+        self.kind = kind
+        self.category = category
+        self.min_price = min_price
+        self.max_price = max_price
+        self.tokens = frozenset(_tokens(name))
+
+    @property
+    def price_text(self):
+        if self.max_price != self.min_price:
+            return f"₱{self.min_price:,} - ₱{self.max_price:,}"
+        return f"₱{self.min_price:,}"
+
+    def __repr__(self):
+        return f"CatalogItem({self.display_name!r}, {self.kind}, {self.category!r}, {self.price_text})"
+
+
+def parse_catalog_items(text):
+    """
+    Extract CatalogItems from catalog text. Items are products unless the
+    ``===`` section or the category heading they sit under mentions services.
+    """
+    items = []
+    section = ""
+    category = None
+    lines = [line.strip() for line in text.split('\n')]
+
+    for i, line in enumerate(lines):
+        if not line:
+            continue
+        if BANNER_RE.match(line):
+            # "=====", section title, "=====": the title sets the section
+            if i + 2 < len(lines) and BANNER_RE.match(lines[i + 2]) and lines[i + 1]:
+                section = lines[i + 1].lower()
+            category = None
+            continue
+
+        # Headings look like "Engine Components:" with no price on the line
+        if line.endswith(':') and '₱' not in line and len(line) <= 50:
+            category = line[:-1].strip()
+            continue
+
+        match = ITEM_RE.match(line)
+        if not category or not match:
+            continue
+
+        low = int(match.group("low").replace(',', ''))
+        high = int(match.group("high").replace(',', '')) if match.group("high") else low
+        kind = SERVICE if "service" in section or "service" in category.lower() else PRODUCT
+        display_name = re.sub(r'\s+', ' ', match.group("name")).strip()
+        items.append(CatalogItem(normalize_name(display_name), display_name, kind, category,
+                                 min(low, high), max(low, high)))
+
+    return items
+
+
+class CatalogIndex:
+    """Price-sorted views of the catalog per kind and per category"""
+
+    __slots__ = ("items", "_by_name", "_categories", "_views", "_vocabulary")
+
+    def __init__(self, items=()):
+        self.items = tuple(items)
+        self._by_name = {}
+        self._categories = {}  # lowercase -> heading as written in the PDF
+        self._vocabulary = set()
+        for item in self.items:
+            self._by_name.setdefault(item.name, item)
+            self._categories.setdefault(item.category.lower(), item.category)
+            self._vocabulary.update(item.tokens)
+
+        groups = {(None, None): list(self.items)}
+        for item in self.items:
+            groups.setdefault((item.kind, None), []).append(item)
+            groups.setdefault((None, item.category.lower()), []).append(item)
+
+        # Stable sort keeps catalog order among equal prices
+        self._views = {}
+        for key, group in groups.items():
+            group.sort(key=lambda item: item.min_price)
+            self._views[key] = ([item.min_price for item in group], group)
+
+    def __len__(self):
+        return len(self.items)
+
+    def find(self, name):
+        return self._by_name.get(normalize_name(name))
+
+    def categories(self, kind=None):
+        """Category headings in catalog order"""
+        seen = []
+        for item in self.items:
+            if (kind is None or item.kind == kind) and item.category not in seen:
+                seen.append(item.category)
+        return seen
+
+    def select(self, kind=None, category=None, low=None, high=None):
+        """
+        Items whose (starting) price lies within [low, high], cheapest first.
+        Both bounds are optional; category is matched case-insensitively.
+        """
+        key = (None, category.lower()) if category else (kind, None)
+        prices, items = self._views.get(key, ((), ()))
+        start = bisect_left(prices, low) if low is not None else 0
+        end = bisect_right(prices, high) if high is not None else len(prices)
+        selected = items[start:end]
+        if category and kind:
+            selected = [item for item in selected if item.kind == kind]
+        return list(selected)
+
+    def cheapest(self, n=1, **filters):
+        return self.select(**filters)[:n]
+
+    def most_expensive(self, n=1, **filters):
+        return self.select(**filters)[::-1][:n]
+
+    def resolve_category(self, text):
+        """Category heading mentioned in text ("&" may be written as "and"), or None"""
+        text = text.lower().replace(' and ', ' & ')
+        matches = [heading for lowered, heading in self._categories.items() if lowered in text]
+        # Prefer the longest heading, e.g. "Electrical Services" over a shorter overlap
+        return max(matches, key=len) if matches else None
+
+    def parse_query(self, query):
+        """
+        Read a price-range, cheapest/most-expensive or category question into
+        a CatalogQuery, or return None when the query is none of those.
+        """
+        query = query.lower()
+        low = high = None
+        amounts = []
+
+        between = BETWEEN_RE.search(query)
+        if between:
+            amounts = [between.group(1), between.group(2)]
+            low, high = sorted((_amount(between.group(1)), _amount(between.group(2))))
+        else:
+            upper = UPPER_RE.search(query) or UPPER_SUFFIX_RE.search(query)
+            lower = LOWER_RE.search(query) or LOWER_SUFFIX_RE.search(query)
+            high = _amount(upper.group(1)) if upper else None
+            low = _amount(lower.group(1)) if lower else None
+            amounts = [match.group(1) for match in (upper, lower) if match]
+
+        tokens = set(_tokens(query))
+        category = self.resolve_category(query)
+        # A bare number is only a price when the question is about prices or the catalog
+        # ("over 20000", "from 8 to 5" alone are not)
+        if amounts and not any(_is_marked_amount(amount) for amount in amounts):
+            about_catalog = (tokens & (PRICE_WORDS | PRODUCT_WORDS | SERVICE_WORDS) or category
+                             or 'how much' in query or self.vocabulary_terms(query))
+            if not about_catalog:
+                low = high = None
+
+        order = "asc" if CHEAPEST_RE.search(query) else "desc" if PRICIEST_RE.search(query) else None
+        if low is None and high is None and order is None and category is None:
+            return None
+
+        kind = None
+        if tokens & SERVICE_WORDS and not tokens & PRODUCT_WORDS:
+            kind = SERVICE
+        elif tokens & PRODUCT_WORDS and not tokens & SERVICE_WORDS:
+            kind = PRODUCT
+
+        # Remaining words that name items narrow the result ("cheapest brake part")
+        ignored = PRODUCT_WORDS | SERVICE_WORDS | set(_tokens(category or ""))
+        terms = self.vocabulary_terms(query, ignored)
+
+        return CatalogQuery(kind, category, low, high, order, tuple(terms))
+
+    def _vocabulary_form(self, token):
+        """token as it appears in item names: "plugs" -> "plug" when only the singular is known"""
+        if token not in self._vocabulary and token.endswith('s') and token[:-1] in self._vocabulary:
+            return token[:-1]
+        return token
+
+    def mentions(self, text):
+        """
+        Items named in full in text ("do you have spark plugs" -> Spark Plug),
+        longest names first. An item whose name is part of another match
+        ("valve" in "valve adjustment") is left out.
+        """
+        words = {self._vocabulary_form(token) for token in _tokens(text)}
+        found = [item for item in self.items if item.tokens <= words]
+        found.sort(key=lambda item: len(item.tokens), reverse=True)
+        return [item for item in found if not any(item.tokens < other.tokens for other in found)]
+
+    def containing(self, terms):
+        """Items whose name contains any of terms, in catalog order"""
+        terms = {self._vocabulary_form(term) for term in terms} & self._vocabulary
+        return [item for item in self.items if item.tokens & terms]
+
+    def vocabulary_terms(self, text, ignored=()):
+        """Words of text that occur in item names, minus ignored ones"""
+        terms = []
+        for token in _tokens(text):
+            token = self._vocabulary_form(token)
+            if token in self._vocabulary and token not in ignored and not token.isdigit() and token not in terms:
+                terms.append(token)
+        return terms
+
+    def related(self, item, n=3):
+        """Other items in item's category, closest in price first"""
+        others = [other for other in self.select(category=item.category) if other is not item]
+        return sorted(others, key=lambda other: abs(other.min_price - item.min_price))[:n]
+
+    def run_query(self, catalog_query, limit=None):
+        """Items answering a CatalogQuery, in price order"""
+        items = self.select(kind=catalog_query.kind, category=catalog_query.category,
+                            low=catalog_query.low, high=catalog_query.high)
+        if catalog_query.terms:
+            terms = set(catalog_query.terms)
+            items = [item for item in items if terms <= item.tokens]
+        if catalog_query.order == "desc":
+            items.reverse()
+        return items[:limit] if limit else items
@@ -0,0 +1,256 @@
+"""
+Background answering of chat questions that need the language model.
+
+A job is submitted with a function that produces the answer and gets an
+unguessable id back at once; a small pool of daemon threads works through
+a bounded queue. Job records live in a store with a time-to-live and a
+size cap: in process memory, or in a SQLite file shared by every gunicorn
+worker on the host, so a client can poll whichever worker it reaches.
+Long-polling waits on an event for jobs of this process and re-reads the
+store for jobs of other workers.
+"""
+
+import logging
+import os
+import queue
+import secrets
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+FINISHED = (DONE, FAILED)
+
+POLL_INTERVAL = 0.25  # Seconds between store reads when long-polling another worker's job
+
+
+class Job:
+    """State of one background answer"""
+
+    __slots__ = ("id", "status", "response", "error", "created", "finished")
+
+    def __init__(self, job_id, status=QUEUED, response=None, error=None, created=None, finished=None):
+        self.id = job_id
+        self.status = status
+        self.response = response
+        self.error = error
+        self.created = created if created is not None else time.time()
+        self.finished = finished
+
+    @property
+    def done(self):
+        return self.status in FINISHED
+
+    def to_dict(self):
+        data = {"id": self.id, "status": self.status, "created_at": self.created}
+        if self.done:
+            data["finished_at"] = self.finished
+            data["response"] = self.response
+            if self.error:
+                data["error"] = self.error
+        return data
+
+
+class MemoryJobStore:
+    """Job records in an insertion-ordered dict; per process"""
+
+    def __init__(self, ttl=600, max_jobs=1000):
+        self.ttl = ttl
+        self.max_jobs = max_jobs
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, job):
+        with self._lock:
+            self._jobs[job.id] = Job(job.id, job.status, job.response, job.error, job.created, job.finished)
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return Job(job.id, job.status, job.response, job.error, job.created, job.finished) if job else None
+
+    def purge(self, now):
+        """Drop jobs older than the TTL, then the oldest ones over max_jobs"""
+        with self._lock:
+            while self._jobs:
+                job = next(iter(self._jobs.values()))
+                if now - job.created <= self.ttl and len(self._jobs) <= self.max_jobs:
+                    break
+                self._jobs.popitem(last=False)
+
+    def __len__(self):
+        return len(self._jobs)
+
+
+class SQLiteJobStore:
+    """Job records in a SQLite file (WAL), shared by every process that opens it"""
+
+    def __init__(self, path, ttl=600, max_jobs=1000):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.ttl = ttl
+        self.max_jobs = max_jobs
+        self._local = threading.local()
+        with self._connection() as db:
+            db.execute("CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, status TEXT NOT NULL, "
+                       "response TEXT, error TEXT, created REAL NOT NULL, finished REAL)")
+            db.execute("CREATE INDEX IF NOT EXISTS jobs_created ON jobs (created)")
+
+    def _connection(self):
+        # One connection per thread and process; connections must not cross a fork
+        db = getattr(self._local, "db", None)
+        if db is None or self._local.pid != os.getpid():
+            db = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+            self._local.pid = os.getpid()
+        return db
+
+    def put(self, job):
+        self._connection().execute(
+            "INSERT OR REPLACE INTO jobs (id, status, response, error, created, finished) VALUES (?, ?, ?, ?, ?, ?)",
+            (job.id, job.status, job.response, job.error, job.created, job.finished))
+
+    def get(self, job_id):
+        row = self._connection().execute(
+            "SELECT id, status, response, error, created, finished FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return Job(*row) if row else None
+
+    def purge(self, now):
+        db = self._connection()
+        db.execute("DELETE FROM jobs WHERE created < ?", (now - self.ttl,))
+        db.execute("DELETE FROM jobs WHERE id IN (SELECT id FROM jobs ORDER BY created DESC LIMIT -1 OFFSET ?)",
+                   (self.max_jobs,))
+
+    def __len__(self):
+        return self._connection().execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+
+
+class JobRunner:
+    """
+    Bounded queue of jobs answered by `workers` daemon threads. Threads are
+    started on first use in each process, so the runner can be created
+    before gunicorn forks.
+    """
+
+    def __init__(self, store, workers=2, max_pending=32, stale_after=300):
+        self.store = store
+        self.workers = workers
+        self.max_pending = max_pending
+        self.stale_after = stale_after  # Unfinished jobs this old were lost (e.g. worker restart)
+
+        self._lock = threading.Lock()
+        self._pid = None
+        self._queue = None
+        self._events = {}  # job id -> Event for jobs of this process
+        self.submitted = 0
+        self.rejected = 0
+        self.completed = 0
+        self.failed = 0
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._queue = queue.Queue(maxsize=self.max_pending)
+            self._events = {}
+            for i in range(self.workers):
+                threading.Thread(target=self._work, name=f"chat-job-{i}", daemon=True).start()
+
+    def submit(self, func):
+        """Queue func() -> answer text; returns the Job, or None when the queue is full"""
+        self._ensure_started()
+        now = time.time()
+        self.store.purge(now)
+        job = Job(secrets.token_urlsafe(12), created=now)
+        event = threading.Event()
+        with self._lock:
+            self._events[job.id] = event
+        self.store.put(job)
+        try:
+            self._queue.put_nowait((job, func, event))
+        except queue.Full:
+            with self._lock:
+                self._events.pop(job.id, None)
+                self.rejected += 1
+            job.status, job.error, job.finished = FAILED, "queue full", time.time()
+            self.store.put(job)
+            return None
+        with self._lock:
+            self.submitted += 1
+        return job
+
+    def _save(self, job):
+        """store.put() that logs failures instead of raising, so the worker keeps running"""
+        try:
+            self.store.put(job)
+        except Exception as e:
+            logger.error(f"Could not save chat job {job.id}: {e}")
+
+    def _work(self):
+        while True:
+            job, func, event = self._queue.get()
+            try:
+                job.status = RUNNING
+                self._save(job)
+                try:
+                    job.response = func()
+                    job.status = DONE
+                except Exception as e:
+                    logger.error(f"Chat job {job.id} failed: {e}")
+                    job.status, job.error = FAILED, "internal error"
+                job.finished = time.time()
+                self._save(job)
+            finally:
+                with self._lock:
+                    if job.status == DONE:
+                        self.completed += 1
+                    else:
+                        self.failed += 1
+                    self._events.pop(job.id, None)
+                event.set()
+
+    def get(self, job_id):
+        """Current state of a job, or None if unknown or expired"""
+        job = self.store.get(job_id)
+        if job and not job.done and time.time() - job.created > self.stale_after:
+            job.status, job.error, job.finished = FAILED, "job was lost", time.time()
+        return job
+
+    def wait(self, job_id, timeout):
+        """get() after waiting up to timeout seconds for the job to finish"""
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            event = self._events.get(job_id)
+        if event is not None:
+            event.wait(timeout)
+            return self.get(job_id)
+
+        job = self.get(job_id)
+        while job and not job.done and time.monotonic() < deadline:
+            time.sleep(min(POLL_INTERVAL, max(0.0, deadline - time.monotonic())))
+            job = self.get(job_id)
+        return job
+
+    def stats(self):
+        with self._lock:
+            return {
+                "store": type(self.store).__name__,
+                "workers": self.workers,
+                "pending": self._queue.qsize() if self._queue else 0,
+                "max_pending": self.max_pending,
+                "submitted": self.submitted,
+                "rejected": self.rejected,
+                "completed": self.completed,
+                "failed": self.failed,
+            }
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+Check OllamaPool against local fake Ollama servers
+
+Starts a few fake servers (GET /api/tags, POST /api/chat and
+/api/generate, streamed or not) whose delay, status code and models can be
+changed while the checks run, and exercises the pool the way the app uses
+it:
+
+    spread      concurrent calls use every backend
+    affinity    calls with the same system prompt stay on one backend
+    failover    calls to a backend answering 503 are retried on another one
+    ejection    a backend failing OLLAMA_EJECT_AFTER calls in a row gets no calls
+    recovery    it gets calls again once the ejection has run out
+    down        a backend that stops answering the health check is skipped,
+                and used again once it answers
+    models      a backend without the requested model is skipped
+    release     calls that raise leave no call counted in flight
+
+Prints one line per check and exits with 1 if any failed.
+
+Usage:
+    python check_ollama_pool.py
+    python check_ollama_pool.py --verbose   # also show the pool's log
+"""
+
+import argparse
+import json
+import logging
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from ollama_pool import OllamaPool
+
+MODEL = "phi"
+
+
+class FakeOllama:
+    """A fake Ollama server on a free local port; status, delay and models can be changed at any time"""
+
+    def __init__(self, name, models=(MODEL,)):
+        self.name = name
+        self.models = [model if ":" in model else f"{model}:latest" for model in models]
+        self.status = 200
+        self.delay = 0.0
+        self.calls = 0
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.server.daemon_threads = True
+        self.host = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _reply(self, status, body):
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                if fake.status != 200:
+                    return self._reply(fake.status, {"error": "unavailable"})
+                self._reply(200, {"models": [{"name": model} for model in fake.models]})
+
+            def do_POST(self):
+                payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                with fake._lock:
+                    fake.calls += 1
+                if fake.status != 200:
+                    return self._reply(fake.status, {"error": "unavailable"})
+                if payload.get("model", "") not in fake.models and f"{payload.get('model')}:latest" not in fake.models:
+                    return self._reply(404, {"error": f"model '{payload.get('model')}' not found"})
+                time.sleep(fake.delay)
+                content = f"answer from {fake.name}"
+                final = {"done": True, "total_duration": int(fake.delay * 1e9)}
+                if "messages" in payload:
+                    final["message"] = {"role": "assistant", "content": content}
+                else:
+                    final["response"] = content
+                if not payload.get("stream"):
+                    return self._reply(200, final)
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.end_headers()
+                self.wfile.write((json.dumps(final) + "\n").encode("utf-8"))
+
+        return Handler
+
+    def take_calls(self):
+        with self._lock:
+            calls, self.calls = self.calls, 0
+        return calls
+
+
+def ask(pool, system="You are PomBot.", **kwargs):
+    messages = [{"role": "system", "content": system}, {"role": "user", "content": "hi"}]
+    return pool.chat(MODEL, messages, **kwargs)["message"]["content"].rsplit(" ", 1)[-1]
+
+
+def check_spread(pool, servers):
+    for server in servers:
+        server.delay = 0.2
+    with ThreadPoolExecutor(max_workers=6) as executor:
+        # Distinct system prompts: no affinity, only the in-flight counts decide
+        answered = Counter(executor.map(lambda i: ask(pool, system=f"prompt {i}"), range(6)))
+    for server in servers:
+        server.delay = 0.0
+    return len(answered) == len(servers), f"answered by {dict(answered)}"
+
+
+def check_affinity(pool, servers):
+    answered = Counter(ask(pool) for _ in range(10))
+    return len(answered) == 1, f"answered by {dict(answered)}"
+
+
+def check_failover(pool, servers):
+    failing = servers[0]
+    failing.status = 503
+    failovers = pool.stats()["failovers"]
+    answered = Counter()
+    # Different prompts until one prefers the failing backend
+    for i in range(30):
+        answered[ask(pool, system=f"failover {i}")] += 1
+        if pool.stats()["failovers"] > failovers:
+            break
+    retried = pool.stats()["failovers"] - failovers
+    ok = failing.name not in answered and retried > 0
+    return ok, f"answered by {dict(answered)}, {retried} failovers"
+
+
+def check_ejection(pool, servers):
+    failing = servers[0]
+
+    def backend_stats():
+        return next(backend for backend in pool.stats()["backends"] if backend["host"] == failing.host)
+
+    for i in range(20):
+        if backend_stats()["ejections"]:
+            break
+        ask(pool, system=f"ejection {i}")
+    failing.take_calls()
+    for i in range(6):
+        ask(pool, system=f"while ejected {i}")
+    calls = failing.take_calls()
+    ejected = backend_stats()
+    ok = ejected["ejections"] == 1 and ejected["ejected_seconds"] > 0 and calls == 0
+    return ok, f"ejected for {ejected['ejected_seconds']}s, {calls} calls while ejected"
+
+
+def check_recovery(pool, servers, eject_seconds):
+    failing = servers[0]
+    failing.status = 200
+    time.sleep(eject_seconds + 0.1)
+    answered = Counter(ask(pool, system=f"recovery {i}") for i in range(30))
+    return failing.name in answered, f"answered by {dict(answered)}"
+
+
+def check_down(pool, servers):
+    down = servers[1]
+    down.status = 503
+    pool.check_health()
+    down.take_calls()
+    answered = Counter(ask(pool, system=f"down {i}") for i in range(6))
+    skipped = down.take_calls() == 0 and down.name not in answered
+    down.status = 200
+    pool.check_health()
+    answered_after = Counter(ask(pool, system=f"up {i}") for i in range(30))
+    ok = skipped and down.name in answered_after
+    return ok, f"while down {dict(answered)}, after {dict(answered_after)}"
+
+
+def check_models(pool, servers):
+    lacking = servers[2]
+    lacking.models = ["other:latest"]
+    pool.check_health()
+    lacking.take_calls()
+    answered = Counter(ask(pool, system=f"models {i}") for i in range(6))
+    calls = lacking.take_calls()
+    lacking.models = [f"{MODEL}:latest"]
+    pool.check_health()
+    return calls == 0 and lacking.name not in answered, f"answered by {dict(answered)}, {calls} calls to {lacking.name}"
+
+
+def check_release(pool, servers):
+    for backend in pool.backends:
+        original = backend.client.post
+
+        def broken(*args, **kwargs):
+            raise KeyError("unexpected")
+
+        backend.client.post = broken
+        try:
+            ask(pool)
+        except KeyError:
+            pass
+        finally:
+            backend.client.post = original
+    # A cancelled stream is released as well
+    try:
+        pool.chat(MODEL, [{"role": "user", "content": "hi"}], cancel=lambda: "disconnect")
+    except Exception:
+        pass
+    outstanding = {backend["host"]: backend["outstanding"] for backend in pool.stats()["backends"]}
+    return not any(outstanding.values()), f"in flight afterwards: {outstanding}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check OllamaPool against fake Ollama servers")
+    parser.add_argument("--verbose", action="store_true", help="show the pool's log")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.ERROR, format="%(levelname)s %(message)s")
+
+    servers = [FakeOllama(name) for name in "ABC"]
+    eject_seconds = 1.0
+    pool = OllamaPool([server.host for server in servers], read_timeout=5, deadline=10, max_attempts=3,
+                      backoff_base=0.01, backoff_max=0.05, affinity_slack=1, eject_after=2,
+                      eject_seconds=eject_seconds, models=[MODEL])
+    pool.check_health()
+
+    checks = [
+        ("spread", lambda: check_spread(pool, servers)),
+        ("affinity", lambda: check_affinity(pool, servers)),
+        ("failover", lambda: check_failover(pool, servers)),
+        ("ejection", lambda: check_ejection(pool, servers)),
+        ("recovery", lambda: check_recovery(pool, servers, eject_seconds)),
+        ("down", lambda: check_down(pool, servers)),
+        ("models", lambda: check_models(pool, servers)),
+        ("release", lambda: check_release(pool, servers)),
+    ]
+    failed = 0
+    for name, check in checks:
+        try:
+            ok, detail = check()
+        except Exception as e:
+            ok, detail = False, f"raised {e!r}"
+        failed += not ok
+        print(f"{'ok  ' if ok else 'FAIL'} {name:<10} {detail}")
+
+    stats = pool.stats()
+    print(f"pool: {stats['requests']} requests, {stats['retries']} retries, {stats['failures']} failures, "
+          f"{sum(backend['ejections'] for backend in stats['backends'])} ejections")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
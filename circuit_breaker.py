@@ -0,0 +1,117 @@
+"""
+Circuit breaker for calls to the local language model.
+
+Tracks the outcome and latency of the most recent calls. When too many of
+them fail or are slow the breaker opens and callers fail fast instead of
+queuing behind a dead or overloaded Ollama. After a cool-down a limited
+number of trial calls are let through (half-open); their outcome decides
+whether the breaker closes again or re-opens.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Failure-rate and slow-call-rate circuit breaker with a sliding window"""
+
+    def __init__(self, window_size=20, minimum_calls=5, failure_rate_threshold=0.5,
+                 slow_call_seconds=30.0, slow_call_rate_threshold=0.8,
+                 open_seconds=30.0, half_open_max_calls=1):
+        self.window_size = window_size
+        self.minimum_calls = minimum_calls
+        self.failure_rate_threshold = failure_rate_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate_threshold = slow_call_rate_threshold
+        self.open_seconds = open_seconds
+        self.half_open_max_calls = half_open_max_calls
+
+        self._lock = threading.Lock()
+        self._window = deque(maxlen=window_size)  # (succeeded, slow) per call
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._half_open_calls = 0
+
+        self.rejected = 0
+        self.times_opened = 0
+
+    @property
+    def state(self):
+        with self._lock:
+            self._update_state()
+            return self._state
+
+    def _update_state(self):
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+            self._state = HALF_OPEN
+            self._half_open_calls = 0
+            logger.info("Circuit breaker half-open: allowing trial calls")
+
+    def _open(self):
+        self._state = OPEN
+        self._opened_at = time.monotonic()
+        self.times_opened += 1
+        logger.warning("Circuit breaker opened: failing fast to degraded responses")
+
+    def allow(self):
+        """Return True if a call may proceed; every allowed call must be followed by record()"""
+        with self._lock:
+            self._update_state()
+            if self._state == CLOSED:
+                return True
+            if self._state == HALF_OPEN and self._half_open_calls < self.half_open_max_calls:
+                self._half_open_calls += 1
+                return True
+            self.rejected += 1
+            return False
+
+    def record(self, succeeded, elapsed):
+        """Record the outcome and duration (seconds) of an allowed call"""
+        slow = elapsed >= self.slow_call_seconds
+        with self._lock:
+            if self._state == HALF_OPEN:
+                if succeeded and not slow:
+                    self._state = CLOSED
+                    self._window.clear()
+                    logger.info("Circuit breaker closed: trial call succeeded")
+                else:
+                    self._open()
+                return
+
+            self._window.append((succeeded, slow))
+            if self._state != CLOSED or len(self._window) < self.minimum_calls:
+                return
+
+            calls = len(self._window)
+            failure_rate = sum(1 for ok, _ in self._window if not ok) / calls
+            slow_rate = sum(1 for _, is_slow in self._window if is_slow) / calls
+            if failure_rate >= self.failure_rate_threshold or slow_rate >= self.slow_call_rate_threshold:
+                self._window.clear()
+                self._open()
+
+    def release(self):
+        """Give back an allowed call that says nothing about the model, e.g. one the client abandoned"""
+        with self._lock:
+            if self._state == HALF_OPEN and self._half_open_calls > 0:
+                self._half_open_calls -= 1
+
+    def stats(self):
+        with self._lock:
+            self._update_state()
+            calls = len(self._window)
+            return {
+                "state": self._state,
+                "window_calls": calls,
+                "failure_rate": round(sum(1 for ok, _ in self._window if not ok) / calls, 3) if calls else 0.0,
+                "slow_call_rate": round(sum(1 for _, slow in self._window if slow) / calls, 3) if calls else 0.0,
+                "times_opened": self.times_opened,
+                "rejected": self.rejected,
+            }
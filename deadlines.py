@@ -0,0 +1,97 @@
+"""
+Request deadlines and client disconnect detection.
+
+Every request gets a Deadline: the server's time budget, shortened by the
+client's own timeout header if it sends one. It is held in a context
+variable so that the model call deep inside the answer pipeline can give
+up when the budget is spent or the customer has gone away (closed the
+chat widget, or the proxy gave up on the request) instead of generating
+an answer nobody will read.
+
+Whether the client is still connected is read from the server's socket
+without consuming anything: waitress reports it itself (with
+channel_request_lookahead), gunicorn and the Werkzeug development server
+expose the socket, which is peeked for end-of-file. Other servers cannot
+tell, and only the deadline applies.
+"""
+
+import contextvars
+import select
+import socket
+import time
+
+DEADLINE = "deadline"
+DISCONNECT = "disconnect"
+
+
+class Deadline:
+    """Time budget of one request and a way to tell whether its client is still there"""
+
+    def __init__(self, seconds, disconnected=None, from_client=False):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+        self.disconnected = disconnected
+        self.from_client = from_client  # The client's timeout header, not the server's budget, set it
+
+    def remaining(self):
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self):
+        return time.monotonic() >= self.expires_at
+
+    def cancel_reason(self):
+        """DEADLINE or DISCONNECT if work for this request should stop, else None"""
+        if self.expired():
+            return DEADLINE
+        if self.disconnected is not None and self.disconnected():
+            return DISCONNECT
+        return None
+
+
+def parse_timeout(value):
+    """Seconds from a client timeout header, or None if missing or malformed"""
+    try:
+        seconds = float(value)
+    except (TypeError, ValueError):
+        return None
+    return seconds if 0 < seconds < float("inf") else None
+
+
+def _socket_closed(sock):
+    try:
+        readable, _, _ = select.select([sock], [], [], 0)
+        if not readable:
+            return False
+        return sock.recv(1, socket.MSG_PEEK) == b""  # Readable with no data: the peer closed
+    except ValueError:
+        return False  # TLS sockets do not support peeking; cannot tell
+    except OSError:
+        return True
+
+
+def disconnect_probe(environ):
+    """Callable telling whether the request's client went away, or None if the server cannot tell"""
+    probe = environ.get("waitress.client_disconnected")
+    if probe is not None:
+        return probe
+    sock = environ.get("gunicorn.socket") or environ.get("werkzeug.socket")
+    if sock is None:
+        return None
+    return lambda: _socket_closed(sock)
+
+
+_current_deadline = contextvars.ContextVar("request_deadline", default=None)
+
+
+def current_deadline():
+    """Deadline of the request being handled, or None outside of requests"""
+    return _current_deadline.get()
+
+
+def start_deadline(deadline):
+    """Make deadline the current one; returns the token for stop_deadline()"""
+    return _current_deadline.set(deadline)
+
+
+def stop_deadline(token):
+    _current_deadline.reset(token)
@@ -3,7 +3,7 @@ module.exports = {
     {
       name: 'mj-chatbot',
       script: 'gunicorn',
-      args: 'main:app --bind 0.0.0.0:1551 --workers 2 --threads 4 --timeout 120 --keep-alive 2 --max-requests 1000 --max-requests-jitter 100 --preload',
+      args: 'wsgi:app --bind 0.0.0.0:1551 --workers 2 --threads 4 --timeout 120 --keep-alive 2 --max-requests 1000 --max-requests-jitter 100 --preload',
       interpreter: '/usr/bin/python3',
       exec_mode: 'fork',
       cwd: './',
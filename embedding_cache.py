@@ -0,0 +1,185 @@
+"""
+Batched, cached embeddings for the RAG retriever.
+
+Wraps any embeddings object exposing ``embed_documents``/``embed_query``
+(e.g. ``OllamaEmbeddings``) so that document chunks are sent to Ollama in
+batches with bounded concurrency, and every vector is kept in an in-memory
+LRU plus an on-disk SQLite cache keyed by (model, text hash).
+"""
+
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+def embedding_key(model, text):
+    """Cache key for a (model, text) pair"""
+    return hashlib.sha256(f"{model}\0{text}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """In-memory LRU in front of an optional SQLite store of vectors"""
+
+    def __init__(self, path=None, max_memory_entries=10000):
+        self.path = path
+        self.max_memory_entries = max_memory_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+        if self.path:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            with self._connect() as conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS embeddings ("
+                    "key TEXT PRIMARY KEY, model TEXT NOT NULL, vector BLOB NOT NULL)"
+                )
+
+    def _connect(self):
+        # sqlite3 connections cannot be shared between threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _remember(self, key, vector):
+        with self._lock:
+            self._memory[key] = vector
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_memory_entries:
+                self._memory.popitem(last=False)
+
+    def get(self, key):
+        """Return the cached vector for key, or None"""
+        with self._lock:
+            vector = self._memory.get(key)
+            if vector is not None:
+                self._memory.move_to_end(key)
+                return vector
+
+        if not self.path:
+            return None
+
+        row = self._connect().execute(
+            "SELECT vector FROM embeddings WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        vector = array("f")
+        vector.frombytes(row[0])
+        vector = vector.tolist()
+        self._remember(key, vector)
+        return vector
+
+    def put_many(self, model, items):
+        """Store (key, vector) pairs in memory and on disk"""
+        for key, vector in items:
+            self._remember(key, vector)
+
+        if self.path and items:
+            with self._connect() as conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, model, vector) VALUES (?, ?, ?)",
+                    [(key, model, array("f", vector).tobytes()) for key, vector in items],
+                )
+
+
+class CachedEmbeddings:
+    """Drop-in embeddings wrapper adding batching, concurrency and caching"""
+
+    def __init__(self, embeddings, model, cache=None, batch_size=32, max_concurrency=2):
+        self.embeddings = embeddings
+        self.model = model
+        self.cache = cache if cache is not None else EmbeddingCache()
+        self.batch_size = max(1, batch_size)
+        self.max_concurrency = max(1, max_concurrency)
+
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.batches = 0
+        self.embedded_texts = 0
+        self.embed_seconds = 0.0
+
+    def _embed_batch(self, batch):
+        start = time.perf_counter()
+        vectors = self.embeddings.embed_documents(batch)
+        elapsed = time.perf_counter() - start
+        with self._stats_lock:
+            self.batches += 1
+            self.embedded_texts += len(batch)
+            self.embed_seconds += elapsed
+        return vectors
+
+    def embed_documents(self, texts):
+        """Embed texts, only sending cache misses to the model"""
+        texts = list(texts)
+        keys = [embedding_key(self.model, text) for text in texts]
+        results = [self.cache.get(key) for key in keys]
+
+        # Deduplicate misses so repeated chunks are embedded once
+        pending = OrderedDict()
+        for index, vector in enumerate(results):
+            if vector is None:
+                pending.setdefault(keys[index], texts[index])
+
+        with self._stats_lock:
+            self.hits += len(texts) - len(pending)
+            self.misses += len(pending)
+
+        if pending:
+            miss_keys = list(pending.keys())
+            miss_texts = list(pending.values())
+            batches = [
+                miss_texts[i:i + self.batch_size]
+                for i in range(0, len(miss_texts), self.batch_size)
+            ]
+
+            if len(batches) == 1 or self.max_concurrency == 1:
+                embedded = [self._embed_batch(batch) for batch in batches]
+            else:
+                with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+                    embedded = list(executor.map(self._embed_batch, batches))
+
+            vectors = [vector for batch in embedded for vector in batch]
+            logger.info(f"Embedded {len(miss_texts)} texts in {len(batches)} batches with {self.model}")
+            computed = dict(zip(miss_keys, vectors))
+            self.cache.put_many(self.model, list(computed.items()))
+
+            results = [
+                vector if vector is not None else computed[keys[index]]
+                for index, vector in enumerate(results)
+            ]
+
+        return results
+
+    def embed_query(self, text):
+        """Embed a single query string through the cache"""
+        return self.embed_documents([text])[0]
+
+    def stats(self):
+        """Cache and throughput counters"""
+        with self._stats_lock:
+            lookups = self.hits + self.misses
+            return {
+                "model": self.model,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "batches": self.batches,
+                "embedded_texts": self.embedded_texts,
+                "embed_seconds": round(self.embed_seconds, 4),
+                "texts_per_second": round(self.embedded_texts / self.embed_seconds, 2) if self.embed_seconds else 0.0,
+            }
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Evaluate the EN/TL language identifier on SUPPORTED_QUESTIONS.md
+
+Every example listed under an **English:** or **Tagalog:** heading becomes a
+labeled query ("[product name]" is filled in with real catalog items).
+Examples listed in both languages are dropped as ambiguous. Reports
+accuracy, the misclassified queries and the per-call cost, next to the
+substring check it replaced.
+
+Usage:
+    python eval_language_id.py
+    python eval_language_id.py --verbose   # also print every misclassified query
+"""
+
+import argparse
+import re
+import time
+
+from language_id import default_identifier
+
+PLACEHOLDER_ITEMS = ["brake pads", "camshaft", "spark plug"]
+
+# The marker substrings main.py used before language_id.py, kept for comparison
+LEGACY_INDICATORS = ['ano', 'gaano', 'ilang', 'paano', 'saan', 'kailan', 'bakit', 'kung', 'mga', 'ng', 'sa',
+                     'para', 'naman', 'lang', 'po', 'magkano', 'meron', 'walang', 'kumusta', 'kamusta']
+
+
+def legacy_is_tagalog(text):
+    text = text.lower()
+    return any(indicator in text for indicator in LEGACY_INDICATORS)
+
+
+def load_examples(path="SUPPORTED_QUESTIONS.md"):
+    """(query, "en"/"tl") pairs from the language-labeled lists"""
+    examples = []
+    label = None
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line.startswith("#") or line.startswith("**"):
+                label = {"**English:**": "en", "**Tagalog:**": "tl"}.get(line)
+                continue
+            match = re.match(r'^- "(.+)"$', line)
+            if not match or not label:
+                continue
+            query = match.group(1)
+            if "[product name]" in query:
+                examples.extend((query.replace("[product name]", item), label) for item in PLACEHOLDER_ITEMS)
+            else:
+                examples.append((query, label))
+
+    labels = {}
+    for query, label in examples:
+        labels.setdefault(query.lower(), set()).add(label)
+    return [(query, label) for query, label in examples if len(labels[query.lower()]) == 1]
+
+
+def evaluate(name, predict, examples, verbose):
+    correct = {"en": 0, "tl": 0}
+    total = {"en": 0, "tl": 0}
+    errors = []
+    for query, label in examples:
+        predicted = "tl" if predict(query) else "en"
+        total[label] += 1
+        if predicted == label:
+            correct[label] += 1
+        else:
+            errors.append((query, label, predicted))
+
+    start = time.perf_counter()
+    rounds = 200
+    for _ in range(rounds):
+        for query, _ in examples:
+            predict(query)
+    per_call_us = (time.perf_counter() - start) / (rounds * len(examples)) * 1e6
+
+    accuracy = (correct["en"] + correct["tl"]) / len(examples)
+    print(f"{name:<12} accuracy {accuracy:6.1%}  "
+          f"(en {correct['en']}/{total['en']}, tl {correct['tl']}/{total['tl']})  {per_call_us:5.2f} us/call")
+    if verbose:
+        for query, label, predicted in errors:
+            print(f"    {label} -> {predicted}: {query}")
+    return errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate the EN/TL language identifier")
+    parser.add_argument("--verbose", action="store_true", help="print misclassified queries")
+    args = parser.parse_args()
+
+    examples = load_examples()
+    print(f"{len(examples)} labeled queries from SUPPORTED_QUESTIONS.md\n")
+    evaluate("substring", legacy_is_tagalog, examples, args.verbose)
+    evaluate("language_id", default_identifier.is_tagalog, examples, args.verbose)
+
+
+if __name__ == "__main__":
+    main()
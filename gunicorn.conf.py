@@ -1,4 +1,5 @@
 # Gunicorn configuration file
+import gc
 import multiprocessing
 import os
 
@@ -6,6 +7,11 @@ import os
 bind = "0.0.0.0:1551"  # Listen on all interfaces
 backlog = 2048
 
+# Application: wsgi:app loads the knowledge base in create_app(); with
+# preload_app that happens once in the master and workers share it
+wsgi_app = "wsgi:app"
+preload_app = True
+
 # Worker processes
 workers = 3  # Reduced number of workers for stability
 worker_class = 'sync'
@@ -38,4 +44,18 @@ forwarded_allow_ips = '*'  # Allow forwarded requests
 proxy_allow_ips = '*'      # Allow proxy requests
 
 # SSL
- 
\ No newline at end of file
+ 
+
+
+# Server hooks
+def pre_fork(server, worker):
+    # Move everything built so far (the knowledge snapshot) out of the
+    # collector's reach, so collections in the workers do not write to
+    # those pages and they stay shared copy-on-write
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    # Threads do not survive fork: start the model warm-up in each worker
+    import main
+    main.start_worker()
@@ -0,0 +1,126 @@
+"""
+Compaction of a knowledge base into the context sent to the language model.
+
+The knowledge base text repeats itself: the raw PDF text, the product and
+service lists parsed from it, and knowledge_base.txt (the file the PDF was
+generated from) all say the same thing. Compaction normalizes whitespace,
+drops emoji, markdown emphasis and ===== rules, keeps only the first
+occurrence of every line (compared on letters and digits, so "Camshaft -
+₱1,700" and "- Camshaft: ₱1,700" are the same line) and removes headings
+left without content. Every prompt token costs prefill time on each model
+call, and small models silently drop whatever exceeds their context window.
+
+No tokenizer for the Ollama models is available offline, so tokens are
+estimated the way byte-level BPE vocabularies split text: about one token
+per five letters of a word, one per digit and per punctuation mark, two per
+non-ASCII symbol. The estimate errs on the high side.
+"""
+
+import math
+import re
+
+# Emoji and dingbats used in rule banners (❌ ✅ 🚨), plus the variation selector
+EMOJI_RE = re.compile("[\U0001F000-\U0001FAFF☀-➿⬀-⯿️]")
+EMPHASIS_RE = re.compile(r"\*\*|__")
+KEY_RE = re.compile(r"[\W_]+")
+TOKEN_PIECE_RE = re.compile(r"[A-Za-z]+|[0-9]|[^\sA-Za-z0-9]")
+
+# Lines whose letters and digits are shorter than this ("- Tip") are never treated as duplicates
+MIN_DEDUP_KEY = 4
+
+
+class KnowledgeBudgetError(ValueError):
+    """Raised when a knowledge base does not fit the prompt token budget and trimming is off"""
+
+
+def estimate_tokens(text):
+    """Approximate prompt tokens of text"""
+    tokens = 0
+    for piece in TOKEN_PIECE_RE.findall(text):
+        if piece.isalpha():
+            tokens += math.ceil(len(piece) / 5)
+        elif piece.isascii():
+            tokens += 1
+        else:
+            tokens += 2
+    return tokens
+
+
+def _normalize_line(line):
+    line = EMPHASIS_RE.sub("", EMOJI_RE.sub("", line))
+    return " ".join(line.split())
+
+
+def _is_heading(line):
+    return line.endswith(":") and len(line) < 60
+
+
+def compact_knowledge(text):
+    """text without repeated lines, decoration or redundant whitespace"""
+    seen = set()
+    lines = []
+    for raw in text.splitlines():
+        line = _normalize_line(raw)
+        key = KEY_RE.sub("", line.lower())
+        if not line:
+            if lines and lines[-1]:
+                lines.append("")
+            continue
+        if not key:
+            continue  # ===== rules and stray bullets
+        if len(key) >= MIN_DEDUP_KEY:
+            if key in seen:
+                continue
+            seen.add(key)
+        lines.append(line)
+
+    # Drop headings whose lines were all duplicates, walking backwards so a
+    # heading directly above a kept sub-heading survives
+    kept = []
+    below = None  # "content" or "heading": the next kept line
+    blank_below = False
+    for line in reversed(lines):
+        if not line:
+            kept.append(line)
+            blank_below = True
+            continue
+        if _is_heading(line):
+            if below != "content" and (below != "heading" or blank_below):
+                continue
+            below = "heading"
+        else:
+            below = "content"
+        kept.append(line)
+        blank_below = False
+    kept.reverse()
+
+    compacted = []
+    for line in kept:
+        if line or (compacted and compacted[-1]):
+            compacted.append(line)
+    return "\n".join(compacted).strip()
+
+
+def trim_to_budget(text, max_tokens):
+    """
+    (text, dropped lines) with lines removed from the end until it fits
+    max_tokens. The closing block (after the last blank line, the response
+    rules) is always kept.
+    """
+    body, separator, closing = text.rpartition("\n\n")
+    if not separator:
+        body, closing = text, ""
+    budget = max_tokens - estimate_tokens(closing)
+    lines = body.splitlines()
+    used = 0
+    keep = 0
+    for line in lines:
+        cost = estimate_tokens(line) + 1  # plus the newline
+        if used + cost > budget:
+            break
+        used += cost
+        keep += 1
+    trimmed = "\n".join(lines[:keep]).rstrip()
+    if closing:
+        trimmed = f"{trimmed}\n\n{closing}" if trimmed else closing
+    return trimmed, len(lines) - keep
@@ -0,0 +1,104 @@
+"""
+Fast and slow lanes for chat requests.
+
+A server worker has a handful of threads (waitress ``threads=4``), and a
+request waiting on the language model holds its thread for seconds. When
+every thread waits on the model, a price lookup that takes microseconds
+queues behind them. Requests are therefore put in a lane as soon as their
+intent is known: deterministic answers (catalog, greetings, listings) in
+the fast lane, model calls in the slow lane. Each lane admits a limited
+number of requests at once and lets a bounded number wait; beyond that it
+refuses right away, so the slow lane can never hold all of the threads.
+
+Lanes record how long requests waited for admission and how long they
+ran, for the /health endpoint.
+"""
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+
+class LaneFull(Exception):
+    """Raised when a lane's queue is full or no slot freed up in time"""
+
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class Lane:
+    """Concurrency limit with a bounded wait queue; concurrency 0 admits everything"""
+
+    def __init__(self, name, concurrency, max_queue=0, window_size=1000):
+        self.name = name
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+
+        self._condition = threading.Condition()
+        self._waits = deque(maxlen=window_size)
+        self._runs = deque(maxlen=window_size)
+        self.active = 0
+        self.queued = 0
+        self.peak_active = 0
+        self.peak_queued = 0
+        self.admitted = 0
+        self.rejected = 0  # Queue full
+        self.timed_out = 0  # Waited the whole timeout
+
+    def _full_locked(self):
+        return self.concurrency > 0 and self.active >= self.concurrency
+
+    @contextmanager
+    def admit(self, timeout=None):
+        """Run the block once the lane has a free slot; raises LaneFull instead of waiting over timeout"""
+        enqueued = time.perf_counter()
+        with self._condition:
+            # Newcomers queue behind waiting requests instead of overtaking them
+            if self._full_locked() or self.queued:
+                if self.queued >= self.max_queue:
+                    self.rejected += 1
+                    raise LaneFull(f"The {self.name} lane is full")
+                self.queued += 1
+                self.peak_queued = max(self.peak_queued, self.queued)
+                try:
+                    admitted = self._condition.wait_for(lambda: not self._full_locked(), timeout)
+                finally:
+                    self.queued -= 1
+                if not admitted:
+                    self.timed_out += 1
+                    raise LaneFull(f"No slot in the {self.name} lane within {timeout:.2f}s")
+            self.active += 1
+            self.peak_active = max(self.peak_active, self.active)
+            self.admitted += 1
+            started = time.perf_counter()
+            self._waits.append(started - enqueued)
+        try:
+            yield
+        finally:
+            with self._condition:
+                self.active -= 1
+                self._runs.append(time.perf_counter() - started)
+                self._condition.notify()
+
+    def stats(self):
+        with self._condition:
+            waits = list(self._waits)
+            runs = list(self._runs)
+            return {
+                "concurrency": self.concurrency,
+                "max_queue": self.max_queue,
+                "active": self.active,
+                "queued": self.queued,
+                "peak_active": self.peak_active,
+                "peak_queued": self.peak_queued,
+                "admitted": self.admitted,
+                "rejected": self.rejected,
+                "timed_out": self.timed_out,
+                "wait_p50_ms": round(_percentile(waits, 0.50) * 1000, 2) if waits else None,
+                "wait_p99_ms": round(_percentile(waits, 0.99) * 1000, 2) if waits else None,
+                "run_p50_ms": round(_percentile(runs, 0.50) * 1000, 2) if runs else None,
+                "run_p99_ms": round(_percentile(runs, 0.99) * 1000, 2) if runs else None,
+            }
@@ -0,0 +1,115 @@
+"""
+English/Tagalog language identification for customer queries.
+
+Scores whole tokens against a weight table of function words and common
+vocabulary (positive = Tagalog, negative = English). Tokens not in the
+table, such as product names or Taglish spellings, fall back to character
+n-gram weights for Tagalog affixes and English endings, scaled down so
+they only tip the balance when no known word does. Queries with no
+Tagalog evidence are English, which is also the bot's default language.
+"""
+
+import re
+
+TOKEN_RE = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+
+# Function words and words that are unambiguous in customer questions
+TAGALOG_WORDS = {
+    3.0: ["ang", "ng", "mga", "po", "opo", "ba", "bang", "kayo", "ninyo", "niyo", "nyo", "namin", "natin",
+          "ano", "anong", "paano", "pano", "nasaan", "saan", "asan", "sino", "kailan", "bakit", "ilang",
+          "gaano", "magkano", "meron", "mayroon", "wala", "walang", "hindi", "salamat", "naman",
+          "kumusta", "kamusta", "magandang", "yung", "iyong", "ito", "iyan", "yan", "dito", "diyan", "doon"],
+    2.0: ["sa", "na", "lang", "lamang", "din", "rin", "nga", "kung", "para", "pero", "mag", "nag", "pag",
+          "ako", "ko", "mo", "ikaw", "siya", "sila", "tayo", "kami", "si", "ni", "kay", "ay", "pa",
+          "bumili", "presyo", "halaga", "bayad", "tanong", "madalas", "gumawa", "naggawa", "garantiya",
+          "patakaran", "araw", "buwan", "taon", "umaga", "hapon", "gabi", "hoy", "oy", "numero", "oras",
+          "lista", "listahan", "pwede", "puwede", "pwedeng", "gusto", "kailangan", "ngayon", "hakbang",
+          "nangyayari", "katagal", "mula", "hanggang", "pababa", "pataas", "piyesa", "serbisyo", "kayong",
+          "sana", "lahat", "ilan", "alin", "mura", "mahal", "pinakamura", "pinakamahal", "oo"],
+    1.0: ["may", "bukas", "ka"],
+}
+
+ENGLISH_WORDS = {
+    2.0: ["the", "is", "are", "was", "does", "did", "you", "your", "what", "how", "where", "when", "who",
+          "which", "why", "much", "many", "can", "could", "would", "will", "have", "has", "there", "this",
+          "that", "please", "thanks", "thank", "hello", "good", "morning", "afternoon", "evening"],
+    1.0: ["a", "an", "do", "i", "my", "me", "we", "our", "of", "to", "for", "in", "on", "at", "with",
+          "about", "and", "or", "any", "it", "tell", "show", "give", "long", "find", "located", "open",
+          "made", "created", "steps", "happens", "during", "work", "number", "address", "information",
+          "hi", "price", "cost", "buy", "purchase", "list", "under", "below", "cheapest"],
+}
+
+# Character n-grams of out-of-vocabulary tokens, padded with ^ and $
+NGRAM_WEIGHTS = {
+    # Tagalog affixes, infixes and reduplication-heavy spellings
+    "^mag": 1.0, "^nag": 1.0, "^pag": 0.8, "^pin": 0.6, "^ma": 0.4, "^ka": 0.4, "^pa": 0.3,
+    "ng$": 0.6, "ang": 0.6, "nga": 0.6, "yan": 0.6, "aan": 0.8, "iya": 0.5, "uma": 0.5, "umi": 0.4,
+    "ay$": 0.4, "an$": 0.3, "in$": 0.2, "aka": 0.5, "ala": 0.3, "ami": 0.4,
+    # English spellings that Tagalog words rarely contain
+    "th": -0.8, "ing$": -1.4, "tion": -1.2, "ck": -0.8, "sh": -0.6, "^wh": -1.0, "ee": -0.6,
+    "ght": -1.0, "ould": -1.0, "ly$": -0.6, "ed$": -0.5, "er$": -0.5, "es$": -0.4, "ce$": -0.6,
+    "ph": -0.6, "ou": -0.4, "x": -0.5, "q": -0.5, "c": -0.3, "f": -0.3, "v": -0.3, "z": -0.3,
+}
+
+
+def _token_table():
+    weights = {}
+    for weight, words in ENGLISH_WORDS.items():
+        for word in words:
+            weights[word] = -weight
+    for weight, words in TAGALOG_WORDS.items():
+        for word in words:
+            weights[word] = weight
+    return weights
+
+
+class LanguageIdentifier:
+    """Token and character n-gram scorer; score() > threshold means Tagalog"""
+
+    def __init__(self, token_weights, ngram_weights, ngram_scale=0.5, threshold=0.0, cache_size=4096):
+        self.token_weights = dict(token_weights)
+        self.ngram_weights = dict(ngram_weights)
+        self.ngram_scale = ngram_scale
+        self.threshold = threshold
+        self.cache_size = cache_size
+        self._max_ngram = max(len(ngram) for ngram in self.ngram_weights)
+        self._oov_scores = {}
+
+    def _oov_score(self, token):
+        score = self._oov_scores.get(token)
+        if score is None:
+            padded = f"^{token}$"
+            score = 0.0
+            for size in range(1, self._max_ngram + 1):
+                for start in range(len(padded) - size + 1):
+                    score += self.ngram_weights.get(padded[start:start + size], 0.0)
+            # Keep a single unknown word from outweighing a known function word
+            score = max(-1.0, min(1.0, score * self.ngram_scale))
+            if len(self._oov_scores) < self.cache_size:
+                self._oov_scores[token] = score
+        return score
+
+    def score(self, text):
+        """Sum of token evidence; positive leans Tagalog, negative English"""
+        token_weights = self.token_weights
+        total = 0.0
+        for token in TOKEN_RE.findall(text.lower()):
+            weight = token_weights.get(token)
+            if weight is None:
+                weight = 0.0 if token.isdigit() else self._oov_score(token)
+            total += weight
+        return total
+
+    def is_tagalog(self, text):
+        return self.score(text) > self.threshold
+
+    def identify(self, text):
+        return "tl" if self.is_tagalog(text) else "en"
+
+
+default_identifier = LanguageIdentifier(_token_table(), NGRAM_WEIGHTS)
+
+
+def is_tagalog(text):
+    """True if text is (mostly) Tagalog or Taglish, using the default tables"""
+    return default_identifier.is_tagalog(text)
@@ -1,18 +1,41 @@
+import time
+_IMPORT_STARTED = time.perf_counter()  # Import time is reported by boot()
 import re
 import os
-import requests
-import ollama  # Added for local LLM integration
-from flask import Flask, request, jsonify
-from functools import lru_cache
-from waitress import serve
+from flask import Flask, request, jsonify, g, has_request_context, url_for
+from functools import wraps
+from collections import OrderedDict, namedtuple
+import difflib
+import gzip
+import hashlib
+import hmac
+import sqlite3
+import threading
 import json
-import time
-from werkzeug.serving import run_simple
+import math
+import contextvars
+from contextlib import contextmanager, nullcontext
 from flask_cors import CORS
-import PyPDF2
-import pdfplumber
 from pathlib import Path
 import logging
+from model_warmup import ModelWarmer
+from ollama_client import OllamaCancelled, OllamaError
+from ollama_pool import OllamaPool, model_name
+from circuit_breaker import CircuitBreaker, OPEN
+import language_id
+from profanity import ProfanityFilter
+from rate_limiter import Budget, FileBucketStore, MemoryBucketStore, RateLimiter
+from profiling import SamplingProfiler, current_timer, start_timer, stop_timer
+from lanes import Lane, LaneFull
+from deadlines import DEADLINE, DISCONNECT, Deadline, current_deadline, disconnect_probe, parse_timeout, start_deadline, stop_deadline
+from answer_cache import AnswerCache
+from cache_warmer import CacheWarmer, FAILED, InFlightCounter, WARM, WARMED, read_supported_questions
+from model_router import LARGE, SMALL, ModelRouter, ModelTier, QueryFeatures
+from chat_jobs import JobRunner, MemoryJobStore, SQLiteJobStore
+from knowledge_compaction import KnowledgeBudgetError, compact_knowledge, estimate_tokens, trim_to_budget
+from catalog_index import CatalogIndex, parse_catalog_items, PRODUCT, SERVICE
+from tenants import (DEFAULT_TENANT, TENANT_ENVIRON_KEY, TENANT_ID_RE, KnowledgeSnapshot,
+                     TenantPathMiddleware, TenantRegistry, UnknownTenantError)
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -20,6 +43,7 @@ logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 CORS(app, resources={r"/api/*": {"origins": "*"}})  # Enable CORS for API routes
+app.wsgi_app = TenantPathMiddleware(app.wsgi_app)  # Also serve every route under /t/<tenant>/
 
 # Configuration
 OLLAMA_API_URL = "http://localhost:11434/api/generate"
@@ -27,11 +51,79 @@ OLLAMA_MODEL = os.environ.get("OLLAMA_MODEL", "phi:latest")  # Default to phi:la
 HOST = "0.0.0.0"  # Listen on all interfaces
 PORT = int(os.environ.get("PORT", 1551))
 PDF_PATH = os.environ.get("PDF_PATH", "POMWORKZ AUTO PARTS CATALOG.pdf")  # Updated to use your PDF name
-
-# Global variables to store PDF-extracted data
-KNOWLEDGE_BASE = ""
-PRODUCTS = {}
-SERVICES = {}
+CATALOG_PAGE_SIZE = int(os.environ.get("CATALOG_PAGE_SIZE", 20))
+CATALOG_MAX_PAGE_SIZE = int(os.environ.get("CATALOG_MAX_PAGE_SIZE", 100))
+CATALOG_GZIP_MIN_BYTES = int(os.environ.get("CATALOG_GZIP_MIN_BYTES", 1024))  # Only compress catalog pages larger than this
+OLLAMA_NUM_PREDICT = int(os.environ.get("OLLAMA_NUM_PREDICT", 0))  # Answer token cap of OLLAMA_MODEL; 0 for Ollama's default
+OLLAMA_NUM_CTX = int(os.environ.get("OLLAMA_NUM_CTX", 0))  # Context window of OLLAMA_MODEL; 0 for Ollama's default
+OLLAMA_SMALL_MODEL = os.environ.get("OLLAMA_SMALL_MODEL", "qwen2.5:0.5b")  # Tried first for short, simple questions; empty to disable
+OLLAMA_SMALL_NUM_PREDICT = int(os.environ.get("OLLAMA_SMALL_NUM_PREDICT", 256))
+OLLAMA_SMALL_NUM_CTX = int(os.environ.get("OLLAMA_SMALL_NUM_CTX", 4096))  # Room for the knowledge base prompt and the answer
+MODEL_SLO_P95_SECONDS = float(os.environ.get("MODEL_SLO_P95_SECONDS", 20))  # Above this p95 only the small model is used...
+MODEL_DEMOTE_SECONDS = float(os.environ.get("MODEL_DEMOTE_SECONDS", 300))  # ...for this long
+OLLAMA_HOST = os.environ.get("OLLAMA_HOST", "http://localhost:11434")
+OLLAMA_HOSTS = [host.strip() for host in os.environ.get("OLLAMA_HOSTS", OLLAMA_HOST).split(",") if host.strip()]  # Ollama servers to spread model calls over
+OLLAMA_AFFINITY_SLACK = int(os.environ.get("OLLAMA_AFFINITY_SLACK", 2))  # Extra calls in flight a server takes to keep a prompt where it is cached
+OLLAMA_EJECT_AFTER = int(os.environ.get("OLLAMA_EJECT_AFTER", 3))  # Failed calls in a row that take a server out of rotation...
+OLLAMA_EJECT_SECONDS = float(os.environ.get("OLLAMA_EJECT_SECONDS", 30))  # ...for this long
+OLLAMA_HEALTH_INTERVAL = float(os.environ.get("OLLAMA_HEALTH_INTERVAL", 15))  # Seconds between model list checks of every server
+OLLAMA_CONNECT_TIMEOUT = float(os.environ.get("OLLAMA_CONNECT_TIMEOUT", 3))
+OLLAMA_READ_TIMEOUT = float(os.environ.get("OLLAMA_READ_TIMEOUT", 60))
+OLLAMA_DEADLINE = float(os.environ.get("OLLAMA_DEADLINE", 90))  # Total time per question, below gunicorn's 120s timeout
+REQUEST_DEADLINE_SECONDS = float(os.environ.get("REQUEST_DEADLINE_SECONDS", OLLAMA_DEADLINE))  # Model calls of a request stop after this
+DEADLINE_HEADER = os.environ.get("DEADLINE_HEADER", "X-Request-Timeout")  # Seconds the client waits; can only shorten the deadline
+OLLAMA_POOL_SIZE = int(os.environ.get("OLLAMA_POOL_SIZE", 8))
+OLLAMA_KEEP_ALIVE = os.environ.get("OLLAMA_KEEP_ALIVE", "30m")  # How long Ollama keeps the model loaded after a call
+OLLAMA_WARMUP = os.environ.get("OLLAMA_WARMUP", "1") == "1"  # Preload models at startup and keep them resident
+WARMUP_EMBEDDING_MODEL = os.environ.get("EMBEDDING_MODEL", "")  # Also keep the RAG embedding model resident if set
+WARMUP_PING_INTERVAL = int(os.environ.get("WARMUP_PING_INTERVAL", 600))
+BREAKER_FAILURE_RATE = float(os.environ.get("BREAKER_FAILURE_RATE", 0.5))  # Open when this share of recent LLM calls fail
+BREAKER_SLOW_CALL_SECONDS = float(os.environ.get("BREAKER_SLOW_CALL_SECONDS", 30))  # LLM calls slower than this count as slow
+BREAKER_OPEN_SECONDS = float(os.environ.get("BREAKER_OPEN_SECONDS", 30))  # Fail fast for this long before a trial call
+TENANTS_DIR = os.environ.get("TENANTS_DIR", "tenants")  # One sub-directory per extra shop: <tenant>/*.pdf + knowledge_base.txt
+TENANT_HEADER = os.environ.get("TENANT_HEADER", "X-Tenant-ID")
+TENANT_MEMORY_BUDGET_MB = float(os.environ.get("TENANT_MEMORY_BUDGET_MB", 256))  # Loaded tenants beyond this are evicted LRU
+ANSWER_CACHE_PATH = os.environ.get("ANSWER_CACHE_PATH", "cache/answers.sqlite3")  # Model answers shared by all workers; empty to disable
+ANSWER_CACHE_MAX_ENTRIES = int(os.environ.get("ANSWER_CACHE_MAX_ENTRIES", 5000))  # Least recently used answers beyond this are dropped
+CACHE_WARMUP = os.environ.get("CACHE_WARMUP", "1") == "1"  # Pre-answer common questions after each start and reload
+CACHE_WARMUP_CONCURRENCY = int(os.environ.get("CACHE_WARMUP_CONCURRENCY", 1))  # Questions warmed at once per worker
+CACHE_WARMUP_TOP_N = int(os.environ.get("CACHE_WARMUP_TOP_N", 50))  # Most frequent live questions warmed with SUPPORTED_QUESTIONS.md
+CACHE_WARMUP_BUSY_FILE = os.environ.get("CACHE_WARMUP_BUSY_FILE", "cache/answers_in_flight.bin")  # Lets warming wait for every worker's requests; "memory" for per-process
+KNOWLEDGE_COMPACTION = os.environ.get("KNOWLEDGE_COMPACTION", "1") == "1"  # Deduplicate the knowledge base sent to the model
+PROMPT_TOKEN_BUDGET = int(os.environ.get("PROMPT_TOKEN_BUDGET", 3072))  # Knowledge tokens per prompt; leave room in the model's num_ctx
+PROMPT_OVER_BUDGET = os.environ.get("PROMPT_OVER_BUDGET", "trim")  # "trim" the end of the knowledge, or "refuse" to load it
+RATE_LIMIT_ENABLED = os.environ.get("RATE_LIMIT_ENABLED", "1") == "1"
+RATE_LIMIT_FAST_PER_MINUTE = float(os.environ.get("RATE_LIMIT_FAST_PER_MINUTE", 60))  # Every /api/chat request
+RATE_LIMIT_FAST_BURST = int(os.environ.get("RATE_LIMIT_FAST_BURST", 20))
+RATE_LIMIT_LLM_PER_MINUTE = float(os.environ.get("RATE_LIMIT_LLM_PER_MINUTE", 6))  # Requests that reach the model
+RATE_LIMIT_LLM_BURST = int(os.environ.get("RATE_LIMIT_LLM_BURST", 3))
+RATE_LIMIT_STORE = os.environ.get("RATE_LIMIT_STORE", "cache/rate_limits.bin")  # Shared by gunicorn workers; "memory" for per-process
+RATE_LIMIT_MAX_CLIENTS = int(os.environ.get("RATE_LIMIT_MAX_CLIENTS", 4096))
+RATE_LIMIT_TRUSTED_PROXIES = {ip.strip() for ip in os.environ.get("RATE_LIMIT_TRUSTED_PROXIES", "127.0.0.1,::1").split(",") if ip.strip()}
+API_KEY_HEADER = os.environ.get("API_KEY_HEADER", "X-API-Key")
+API_KEYS = {key.strip() for key in os.environ.get("API_KEYS", "").split(",") if key.strip()}  # Keys with their own rate limit; others are limited by IP
+SERVER_TIMING = os.environ.get("SERVER_TIMING", "1") == "1"  # Stage durations in a Server-Timing header on /api/chat
+FAST_LANE_CONCURRENCY = int(os.environ.get("FAST_LANE_CONCURRENCY", 32))  # Deterministic answers at once per process; 0 for no limit
+FAST_LANE_QUEUE = int(os.environ.get("FAST_LANE_QUEUE", 64))
+FAST_LANE_MAX_WAIT = float(os.environ.get("FAST_LANE_MAX_WAIT", 2))  # Seconds before a waiting fast request gets a 503
+SLOW_LANE_CONCURRENCY = int(os.environ.get("SLOW_LANE_CONCURRENCY", 2))  # Requests waiting on the model at once per process; keep below the server's threads
+SLOW_LANE_QUEUE = int(os.environ.get("SLOW_LANE_QUEUE", 1))  # Model-bound requests beyond these get the catalog answer right away
+SLOW_LANE_MAX_WAIT = float(os.environ.get("SLOW_LANE_MAX_WAIT", 10))
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN", "")  # Bearer token for /api/admin/*; admin endpoints are off when empty
+PROFILE_MAX_SECONDS = float(os.environ.get("PROFILE_MAX_SECONDS", 30))
+CHAT_JOB_WORKERS = int(os.environ.get("CHAT_JOB_WORKERS", 2))  # Background threads per process answering /api/chat/jobs
+CHAT_JOB_MAX_PENDING = int(os.environ.get("CHAT_JOB_MAX_PENDING", 32))  # Queued jobs per process before 503
+CHAT_JOB_TTL = float(os.environ.get("CHAT_JOB_TTL", 600))  # Seconds a job and its answer are kept
+CHAT_JOB_MAX_RESULTS = int(os.environ.get("CHAT_JOB_MAX_RESULTS", 1000))
+CHAT_JOB_STORE = os.environ.get("CHAT_JOB_STORE", "cache/chat_jobs.sqlite3")  # Shared by gunicorn workers; "memory" for per-process
+CHAT_JOB_MAX_WAIT = float(os.environ.get("CHAT_JOB_MAX_WAIT", 25))  # Longest long-poll, below proxy timeouts
+
+# KnowledgeSnapshot (PDF-extracted data of one tenant) the current request is answered from
+_current_knowledge = contextvars.ContextVar("current_knowledge", default=None)
+# Set while /api/chat/jobs answers inline: model calls return DeferredResponse instead of running
+_defer_model_calls = contextvars.ContextVar("defer_model_calls", default=False)
+# Set while a job answers a question /api/chat/jobs already looked up in the caches: one lookup per question
+_caches_checked = contextvars.ContextVar("caches_checked", default=False)
 
 BADWORDS = [
     "arse", "arsehead", "arsehole", "ass", "ass hole", "asshole", "bastard", "bitch", 
@@ -49,13 +141,82 @@ BADWORDS = [
     "son of a whore", "spastic", "sweet Jesus", "twat", "wanker",
 ]
 
+# Sent instead of routing a message that contains one of BADWORDS
+PROFANITY_REPLY_EN = ("Let's keep our conversation respectful. I'm happy to help with PomWorkz parts, "
+                      "services, prices and bookings.")
+PROFANITY_REPLY_TL = ("Panatilihin po nating magalang ang ating usapan. Masaya akong tumulong tungkol sa "
+                      "parts, services, presyo at booking sa PomWorkz.")
+
+# Query routing keywords, checked in the order used by detect_intent()
+LOCATION_KEYWORDS = ['where are you located', 'where is your shop', 'your location', 'your address', 'where can i find you', 'shop location', 'workshop location', 'location',
+                     'saan kayo', 'nasaan kayo', 'asan ang shop', 'location nyo', 'address nyo', 'saan po kayo', 'nasaan po kayo', 'saan kayo located', 'saan po kayo located', 'saan ang location', 'asan kayo', 'saan ang shop']
+CONTACT_KEYWORDS = ['contact', 'phone', 'email', 'hours', 'operating hours', 'open hours', 'business hours',
+                    'numero', 'oras', 'bukas']
+WARRANTY_KEYWORDS = ['warranty', 'guarantee', 'coverage', 'how long', 'return policy',
+                     'garantiya', 'takot', 'gaano katagal', 'ilang araw', 'ilang buwan', 'ilang taon', 'policy', 'patakaran']
+AVAILABILITY_KEYWORDS_TL = ['may', 'meron', 'available', 'ba kayo', 'po ba']
+AVAILABILITY_SKIP_WORDS = ['may', 'meron', 'po', 'ba', 'kayo', 'available', 'ang', 'ng', 'na',
+                           'product', 'products', 'service', 'services']  # Generic words, not item names
+SERVICE_LIST_KEYWORDS = ["what are the service", "what are the servic", "what service", "list service",
+                         "available service", "show service", "tell me the service", "what are your service",
+                         "services offer", "service list",
+                         "ano ang service", "ano ang mga service", "anong service", "mga service",
+                         "lista ng service", "available na service", "pwedeng service", "ano ang pwedeng service"]
+BOOKING_KEYWORDS = ["how to book", "book service", "book a service", "booking process", "how do i book",
+                    "steps to book", "booking procedure", "how can i book", "service booking", "book services",
+                    "schedule service", "appointment",
+                    "paano mag book", "pano mag book", "paano mag appointment", "mag book ng service", "paano mag schedule"]
+ORDERING_KEYWORDS = ["how to order", "order product", "order products", "ordering process", "how do i order",
+                     "steps to order", "ordering procedure", "how can i order", "product ordering", "buy product",
+                     "purchase product", "how to buy", "how to purchase",
+                     "paano mag order", "pano mag order", "paano bumili", "mag order ng product",
+                     "paano mag purchase", "bumili ng product"]
+SERVICE_PROCESS_KEYWORDS = ["how is the process of the service", "service process", "what is the service process",
+                            "how does the service work", "service workflow", "what happens during service",
+                            "service procedure", "steps of service", "how do you service", "service steps",
+                            "ano ang process ng service", "paano ang service process",
+                            "ano ang nangyayari sa service", "process ng pag service", "hakbang sa service"]
+GREETINGS_EN = ["hello", "hi"]
+GREETINGS_TL = ["kumusta", "magandang", "kamusta", "hoy", "oy"]
+CREATOR_KEYWORDS = ["who created you", "who made you", "who is your creator",
+                    "sino gumawa", "sino naggawa", "sino creator", "sino ang gumawa"]
+FAQ_KEYWORDS = ['faq', 'frequently asked', 'common questions', 'mga tanong', 'common na tanong', 'madalas na tanong']
+SERVICES_AVAILABLE_KEYWORDS = ["what services", "available services", "list services"]
+PRODUCT_LIST_KEYWORDS = ["what products", "available products", "list products",
+                         "ano ang products", "mga products", "anong products", "lista ng products",
+                         "ano po mga parts", "mga parts nyo", "ano ang parts", "anong parts",
+                         "available na parts", "mga available na parts"]
+PRICE_KEYWORDS = ["how much", "price", "cost", "magkano", "presyo", "halaga", "bayad"]
+PRODUCT_AVAILABILITY_KEYWORDS = ["do you have", "do you sell", "do you carry", "do you offer", "have any",
+                                 "got any", "in stock", "available", "can i buy", "is there",
+                                 "are there", "sell", "mayroon", "meron", "may stock", "nagbebenta", "benta"]
+PRODUCT_DESCRIPTION_KEYWORDS = ["tell me about", "what is", "what's", "what are", "describe", "info about",
+                                "information about", "information on", "details", "more about", "what does",
+                                "used for", "ano ang", "ano yung", "ano ba ang", "ano po ang", "anong klase",
+                                "para saan", "tungkol sa", "ano ba yung"]
+# Item-name words too generic to identify a product on their own ("set", "service", ...)
+GENERIC_ITEM_WORDS = {"adjustment", "assembly", "change", "cleaning", "front", "general", "machine", "repair",
+                      "replacement", "service", "set", "side", "system", "unit", "up", "works"}
+PRODUCT_INFO_MAX_ITEMS = 8
+
+# Questions asking for explanation or comparison go to the large model tier
+REASONING_RE = re.compile(r"\b(why|how|explain|compare|difference|better|best|recommend|should|which|"
+                          r"bakit|paano|pano|alin|mas|pagkakaiba|dapat)\b")
+UNSURE_ANSWER = "i am not sure"  # What build_system_prompt tells the model to say without an answer
+
+# Intents whose answer depends only on the loaded catalog and the language
+STATIC_INTENTS = ("service_list", "booking", "ordering", "service_process", "greeting", "creator",
+                  "services_available", "product_list")
+
 
 def extract_text_from_pdf(pdf_path):
     """Extract text from PDF using multiple methods for better compatibility"""
     text = ""
     
     try:
-        # Try pdfplumber first (better for complex layouts)
+        # Try pdfplumber first (better for complex layouts); imported here so
+        # starting the app does not pay for the PDF libraries until a load
+        import pdfplumber
         with pdfplumber.open(pdf_path) as pdf:
             for page in pdf.pages:
                 page_text = page.extract_text()
@@ -71,6 +232,7 @@ def extract_text_from_pdf(pdf_path):
     
     try:
         # Fallback to PyPDF2
+        import PyPDF2
         with open(pdf_path, 'rb') as file:
             pdf_reader = PyPDF2.PdfReader(file)
             for page in pdf_reader.pages:
@@ -201,13 +363,66 @@ def parse_services_from_text(text):
     return services
 
 
+def catalog_item(name):
+    """CatalogItem of the current tenant for a products/services key, or None"""
+    catalog = current_knowledge().catalog
+    if not catalog:
+        return None
+    item = catalog.find(name)
+    if item:
+        return item
+    # Parsed names are sometimes a suffix of the catalog line ("t engine oil")
+    for item in catalog.items:
+        if item.name.endswith(name):
+            return item
+    return None
+
+
 def load_knowledge_from_pdf(pdf_path):
-    """Load and parse knowledge base from PDF and knowledge_base.txt"""
-    global KNOWLEDGE_BASE, PRODUCTS, SERVICES
-    
+    """Load and parse the default tenant's knowledge base from PDF and knowledge_base.txt"""
+    kb = build_response_snapshot(_load_knowledge_sources(pdf_path))
+    tenant_registry.install(DEFAULT_TENANT, kb)
+    return kb.loaded
+
+
+def load_tenant_knowledge(tenant):
+    """Loader for tenant_registry: the default tenant is PDF_PATH, others live in TENANTS_DIR/<tenant>/"""
+    if tenant == DEFAULT_TENANT:
+        return build_response_snapshot(_load_knowledge_sources(PDF_PATH))
+
+    tenant_dir = os.path.join(TENANTS_DIR, tenant)
+    if not TENANT_ID_RE.match(tenant) or not os.path.isdir(tenant_dir):
+        raise UnknownTenantError(tenant)
+
+    pdfs = sorted(Path(tenant_dir).glob("*.pdf"))
+    pdf_path = str(pdfs[0]) if pdfs else os.path.join(tenant_dir, "catalog.pdf")
+    txt_path = os.path.join(tenant_dir, "knowledge_base.txt")
+    return build_response_snapshot(_load_knowledge_sources(pdf_path, txt_path, tenant))
+
+
+tenant_registry = TenantRegistry(load_tenant_knowledge, int(TENANT_MEMORY_BUDGET_MB * 1024 * 1024))
+
+
+def current_knowledge():
+    """Snapshot of the tenant being served; the default tenant outside of requests"""
+    kb = _current_knowledge.get()
+    return kb if kb is not None else tenant_registry.get(DEFAULT_TENANT)
+
+
+@contextmanager
+def use_knowledge(kb):
+    """Answer from kb within the block, e.g. to pre-render another tenant's responses"""
+    token = _current_knowledge.set(kb)
+    try:
+        yield kb
+    finally:
+        _current_knowledge.reset(token)
+
+
+def _load_knowledge_sources(pdf_path, txt_path="knowledge_base.txt", tenant=DEFAULT_TENANT):
+    """Parse the PDF and knowledge_base.txt into a KnowledgeSnapshot for tenant"""
     # Load additional knowledge from text file
     additional_knowledge = ""
-    txt_path = "knowledge_base.txt"
     if os.path.exists(txt_path):
         try:
             with open(txt_path, 'r', encoding='utf-8') as f:
@@ -220,7 +435,7 @@ def load_knowledge_from_pdf(pdf_path):
         logger.error(f"PDF file not found: {pdf_path}")
         # If PDF not found but we have text file, use that
         if additional_knowledge:
-            KNOWLEDGE_BASE = f"""
+            knowledge_base = f"""
 You are PomBot, the auto parts specialist at PomWorkz workshop.
 You ONLY answer questions about the products and services listed below.
 You are created by Cleo Dipasupil.
@@ -237,10 +452,10 @@ You can respond in English or Tagalog.
 - ✅ **Include warranty information when relevant.**
 - ✅ **For unrelated questions, reply: "I only answer questions about auto parts at PomWorkz."**
 """
-            return True
+            return KnowledgeSnapshot(tenant, pdf_path, knowledge_base, loaded=True)
         else:
             # Create a default PDF message
-            KNOWLEDGE_BASE = f"""
+            knowledge_base = f"""
 PDF file not found at: {pdf_path}
 
 Please create a PDF file with your product catalog and service information.
@@ -250,7 +465,7 @@ The PDF should include:
 
 Using fallback mode with basic responses only.
 """
-            return False
+            return KnowledgeSnapshot(tenant, pdf_path, knowledge_base)
     
     try:
         # Extract text from PDF
@@ -258,11 +473,12 @@ Using fallback mode with basic responses only.
         
         if not pdf_text.strip():
             logger.error("No text could be extracted from PDF")
-            return False
+            return KnowledgeSnapshot(tenant, pdf_path)
         
         # Parse products and services
-        PRODUCTS = parse_products_from_text(pdf_text)
-        SERVICES = parse_services_from_text(pdf_text)
+        products = parse_products_from_text(pdf_text)
+        services = parse_services_from_text(pdf_text)
+        catalog = CatalogIndex(parse_catalog_items(pdf_text))
         
         # Extract warranty information specifically
         warranty_info = extract_warranty_info(pdf_text)
@@ -274,7 +490,7 @@ Using fallback mode with basic responses only.
         workshop_info = extract_workshop_info(pdf_text)
         
         # Create comprehensive knowledge base from extracted content + additional text file
-        KNOWLEDGE_BASE = f"""
+        knowledge_base = f"""
 You are PomBot, the auto parts specialist at PomWorkz workshop.
 You ONLY answer questions about the products and services listed below.
 You are created by Cleo Dipasupil.
@@ -287,10 +503,10 @@ COMPLETE WORKSHOP INFORMATION:
 {pdf_text}
 
 EXTRACTED PRODUCTS:
-{chr(10).join([f"- {product.title()}: ₱{price:,}" for product, price in PRODUCTS.items()])}
+{chr(10).join([f"- {product.title()}: ₱{price:,}" for product, price in products.items()])}
 
 EXTRACTED SERVICES:
-{chr(10).join([f"- {service.title()}: {price}" for service, price in SERVICES.items()])}
+{chr(10).join([f"- {service.title()}: {price}" for service, price in services.items()])}
 
 WARRANTY INFORMATION:
 {warranty_info}
@@ -303,12 +519,12 @@ WORKSHOP DETAILS:
 
         # Add additional knowledge from text file if available
         if additional_knowledge:
-            KNOWLEDGE_BASE += f"""
+            knowledge_base += f"""
 
 ADDITIONAL INFORMATION:
 {additional_knowledge}"""
 
-        KNOWLEDGE_BASE += """
+        knowledge_base += """
 
 🚨 STRICT RESPONSE RULES:
 - ❌ **DO NOT answer unrelated questions.**
@@ -317,16 +533,16 @@ ADDITIONAL INFORMATION:
 - ✅ **For unrelated questions, reply: "I only answer questions about auto parts at PomWorkz."**
 """
 
-        logger.info(f"Successfully loaded knowledge base from PDF. Found {len(PRODUCTS)} products and {len(SERVICES)} services.")
+        logger.info(f"Successfully loaded knowledge base from PDF. Found {len(products)} products and {len(services)} services.")
         logger.info(f"Warranty info length: {len(warranty_info)} characters")
         logger.info(f"FAQ info length: {len(faq_info)} characters")
         if additional_knowledge:
             logger.info(f"Additional knowledge from text file: {len(additional_knowledge)} characters")
-        return True
+        return KnowledgeSnapshot(tenant, pdf_path, knowledge_base, products, services, catalog, loaded=True)
         
     except Exception as e:
         logger.error(f"Error loading PDF: {e}")
-        return False
+        return KnowledgeSnapshot(tenant, pdf_path)
 
 
 def extract_warranty_info(text):
@@ -496,29 +712,240 @@ def extract_workshop_info(text):
         return "Workshop information not found in PDF."
 
 
-def reload_pdf_data():
-    """Reload PDF data - useful for updates without restart"""
-    return load_knowledge_from_pdf(PDF_PATH)
+def reload_pdf_data(tenant=DEFAULT_TENANT):
+    """Reload a tenant's PDF data - useful for updates without restart"""
+    return tenant_registry.reload(tenant).loaded
+
+
+# Compiled once: hashed single words plus a token trie for phrases like "son of a bitch"
+profanity_filter = ProfanityFilter(BADWORDS)
 
 
 def contains_badwords(text):
-    # Convert text to lowercase and split into words
-    words = text.lower().split()
-    # Check if any complete word matches a bad word
-    return any(word in words for word in BADWORDS)
+    """True if text contains any of BADWORDS as whole words or phrases"""
+    return profanity_filter.contains(text)
+
+
+class TransientResponse(str):
+    """An answer produced because the model was unavailable; never cached"""
+
+
+class DeferredResponse(TransientResponse):
+    """Stands in for a model answer while _defer_model_calls is set; the question goes to a background job"""
+
 
+class RateLimitedResponse(TransientResponse):
+    """Given instead of a model call when the client's LLM budget is used up; chat() turns it into a 429"""
 
-def get_ollama_response(query, context="", max_retries=3):
+    def __new__(cls, text, retry_after):
+        response = super().__new__(cls, text)
+        response.retry_after = retry_after
+        return response
+
+
+def get_degraded_response(query, is_tagalog=False):
+    """
+    Deterministic, catalog-grounded answer used while the LLM is unavailable:
+    the closest product and service matches plus a hint for the full lists.
+    """
+    kb = current_knowledge()
+    stop_words = {'the', 'and', 'for', 'you', 'your', 'have', 'what', 'how', 'does', 'can',
+                  'ang', 'mga', 'ano', 'kayo', 'meron', 'may', 'ba', 'po', 'naman', 'lang'}
+    query_tokens = [token for token in re.findall(r'[a-z0-9]+', query.lower())
+                    if len(token) > 2 and token not in stop_words]
+
+    def score(name):
+        # (best single-word similarity, average similarity over the name's words)
+        name_tokens = re.findall(r'[a-z0-9]+', name.lower())
+        similarities = [
+            max((difflib.SequenceMatcher(None, token, name_token).ratio() for token in query_tokens), default=0.0)
+            for name_token in name_tokens
+        ]
+        return max(similarities, default=0.0), sum(similarities) / max(len(similarities), 1)
+
+    matches = []
+    for name, price in kb.products.items():
+        matches.append((score(name), f"- {name.title()}: ₱{price:,}"))
+    for name, price in kb.services.items():
+        matches.append((score(name), f"- {name.title()}: {price}"))
+    matches.sort(key=lambda m: (-m[0][1], -m[0][0]))
+    # Prefer items sharing an exact word with the query; otherwise accept close spellings
+    min_similarity = 1.0 if any(best == 1.0 for (best, _), _ in matches) else 0.85
+    matches = [line for (best, _), line in matches if best >= min_similarity][:5]
+
+    if is_tagalog:
+        response = "Pasensya na po, hindi available ang aming AI assistant ngayon."
+        if matches:
+            response += " Ito ang pinakamalapit na items sa aming catalog:\n" + "\n".join(matches)
+        response += "\n\nPara sa buong listahan, itanong ang \"mga products\" o \"mga service\"."
+    else:
+        response = "Sorry, our AI assistant is temporarily unavailable."
+        if matches:
+            response += " Here are the closest matches from our catalog:\n" + "\n".join(matches)
+        response += "\n\nFor complete listings, ask \"what products\" or \"what services\"."
+    return TransientResponse(response)
+
+
+def build_system_prompt(knowledge_context):
+    """
+    System prompt for the LLM fallback. The instructions come first and the
+    knowledge base follows unchanged, so the prefix is byte-identical across
+    requests and Ollama can reuse its prompt cache.
+    """
+    return (
+        "You are PomBot, the helpful AI assistant for the motorcycle parts "
+        "shop PomWorkz. Use ONLY the information contained in the knowledge "
+        "base below to answer the user's question. If the answer cannot be "
+        "found in the knowledge base, respond with 'I am not sure about that.'\n\n"
+        f"KNOWLEDGE BASE:\n{knowledge_context.strip()}"
+    )
+
+
+# Shared by all request threads: pooled connections, timeouts, retries and load balancing over OLLAMA_HOSTS
+ollama_client = OllamaPool(
+    OLLAMA_HOSTS,
+    connect_timeout=OLLAMA_CONNECT_TIMEOUT,
+    read_timeout=OLLAMA_READ_TIMEOUT,
+    deadline=OLLAMA_DEADLINE,
+    pool_size=OLLAMA_POOL_SIZE,
+    affinity_slack=OLLAMA_AFFINITY_SLACK,
+    eject_after=OLLAMA_EJECT_AFTER,
+    eject_seconds=OLLAMA_EJECT_SECONDS,
+    health_interval=OLLAMA_HEALTH_INTERVAL,
+    models=[OLLAMA_MODEL, OLLAMA_SMALL_MODEL, WARMUP_EMBEDDING_MODEL],
+)
+
+
+def tier_options(num_predict, num_ctx):
+    """Ollama options of a model tier; zero leaves Ollama's default"""
+    return {name: value for name, value in (("num_predict", num_predict), ("num_ctx", num_ctx)) if value}
+
+
+LARGE_TIER = ModelTier(LARGE, OLLAMA_MODEL, tier_options(OLLAMA_NUM_PREDICT, OLLAMA_NUM_CTX))
+
+# Sends short, simple questions to the small model first; None when every question uses OLLAMA_MODEL
+model_router = ModelRouter(
+    ModelTier(SMALL, OLLAMA_SMALL_MODEL, tier_options(OLLAMA_SMALL_NUM_PREDICT, OLLAMA_SMALL_NUM_CTX)),
+    LARGE_TIER,
+    slo_p95_seconds=MODEL_SLO_P95_SECONDS,
+    demote_seconds=MODEL_DEMOTE_SECONDS,
+) if OLLAMA_SMALL_MODEL and OLLAMA_SMALL_MODEL != OLLAMA_MODEL else None
+
+# Fails LLM calls fast while Ollama is down or overloaded
+ollama_breaker = CircuitBreaker(
+    failure_rate_threshold=BREAKER_FAILURE_RATE,
+    slow_call_seconds=BREAKER_SLOW_CALL_SECONDS,
+    open_seconds=BREAKER_OPEN_SECONDS,
+)
+
+# Chat requests answered without the model never wait behind requests waiting on it
+fast_lane = Lane("fast", FAST_LANE_CONCURRENCY, FAST_LANE_QUEUE)
+slow_lane = Lane("slow", SLOW_LANE_CONCURRENCY, SLOW_LANE_QUEUE)
+
+# Every model tier is kept resident, loaded with the options its calls use
+model_warmer = ModelWarmer(
+    ollama_client,
+    {tier.model: tier.options for tier in (model_router.tiers.values() if model_router else [LARGE_TIER])},
+    embedding_model=WARMUP_EMBEDDING_MODEL or None,
+    keep_alive=OLLAMA_KEEP_ALIVE,
+    ping_interval=WARMUP_PING_INTERVAL,
+    system_prompt_factory=lambda: build_system_prompt(tenant_registry.get(DEFAULT_TENANT).prompt_context),
+    hosts=ollama_client.hosts if len(ollama_client.hosts) > 1 else None,
+)
+
+
+def create_answer_cache():
+    """Model answers on disk, shared by all workers and kept across restarts, or None if disabled"""
+    if not ANSWER_CACHE_PATH:
+        return None
+    try:
+        return AnswerCache(ANSWER_CACHE_PATH, ANSWER_CACHE_MAX_ENTRIES)
+    except (sqlite3.Error, OSError) as e:
+        logger.warning(f"Answer cache disabled, could not open {ANSWER_CACHE_PATH}: {e}")
+        return None
+
+
+answer_cache = create_answer_cache()
+
+
+def create_rate_limiter():
+    """Token buckets for every chat request ("fast") and for model calls ("llm"), or None if disabled"""
+    if not RATE_LIMIT_ENABLED:
+        return None
+    budgets = {
+        "fast": Budget(RATE_LIMIT_FAST_PER_MINUTE / 60, RATE_LIMIT_FAST_BURST),
+        "llm": Budget(RATE_LIMIT_LLM_PER_MINUTE / 60, RATE_LIMIT_LLM_BURST),
+    }
+    if RATE_LIMIT_STORE != "memory":
+        try:
+            return RateLimiter(FileBucketStore(RATE_LIMIT_STORE, RATE_LIMIT_MAX_CLIENTS), budgets)
+        except (OSError, RuntimeError) as e:
+            logger.warning(f"Rate limits are per process, could not open {RATE_LIMIT_STORE}: {e}")
+    return RateLimiter(MemoryBucketStore(RATE_LIMIT_MAX_CLIENTS), budgets)
+
+
+rate_limiter = create_rate_limiter()
+
+
+def client_identity():
+    """
+    Rate limit key of the current request: the API key if it is one of
+    API_KEYS, otherwise the client IP (unknown keys would let a client start
+    a fresh bucket per request). X-Forwarded-For is only believed when the
+    connection comes from one of RATE_LIMIT_TRUSTED_PROXIES.
+    """
+    api_key = request.headers.get(API_KEY_HEADER)
+    if api_key and api_key in API_KEYS:
+        return "key:" + hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+
+    address = request.remote_addr or "unknown"
+    if address in RATE_LIMIT_TRUSTED_PROXIES:
+        hops = [hop.strip() for hop in request.headers.get("X-Forwarded-For", "").split(",") if hop.strip()]
+        # The right-most address not added by our own proxies is the real client
+        for hop in reversed(hops):
+            if hop not in RATE_LIMIT_TRUSTED_PROXIES:
+                return "ip:" + hop
+    return "ip:" + address
+
+
+def rate_limit_message(retry_after, is_tagalog=False):
+    seconds = max(1, math.ceil(retry_after))
+    if is_tagalog:
+        return f"Masyadong maraming tanong sa maikling oras. Pakisubukan ulit pagkalipas ng {seconds} segundo."
+    return f"You're sending messages too quickly. Please try again in {seconds} second{'' if seconds == 1 else 's'}."
+
+
+def charge_fast_budget():
+    """Every chat message costs a "fast" token (model calls also cost an "llm" one); a 429 response if none is left"""
+    if not rate_limiter:
+        return None
+    g.rate_limit_client = client_identity()
+    allowed, retry_after = rate_limiter.acquire(g.rate_limit_client, "fast")
+    if not allowed:
+        return rate_limited_response(rate_limit_message(retry_after), retry_after)
+    return None
+
+
+def rate_limited_response(text, retry_after):
+    """429 reply with Retry-After (whole seconds)"""
+    response = jsonify({"response": text, "retry_after": max(1, math.ceil(retry_after))})
+    response.status_code = 429
+    response.headers["Retry-After"] = str(max(1, math.ceil(retry_after)))
+    return response
+
+
+def get_ollama_response(query, context="", max_retries=3, is_tagalog=None, use_cache=True):
     """Get response from Ollama with retry logic - PDF-driven only"""
+    kb = current_knowledge()
     cleaned_query = query.strip().lower()
     
     # Check if we have PDF data loaded
-    if not KNOWLEDGE_BASE or (not PRODUCTS and not SERVICES):
+    if not kb.knowledge_base or (not kb.products and not kb.services):
         return "PDF knowledge base is not loaded. Please ensure your PDF file is available and reload the system."
     
-    # Detect if query is in Tagalog
-    tagalog_indicators = ['ano', 'gaano', 'ilang', 'paano', 'saan', 'kailan', 'bakit', 'kung', 'mga', 'ng', 'sa', 'para', 'naman', 'lang', 'po', 'magkano', 'meron', 'walang', 'kumusta', 'kamusta']
-    is_tagalog = any(indicator in cleaned_query for indicator in tagalog_indicators)
+    # Detect if query is in Tagalog, unless the caller already did
+    if is_tagalog is None:
+        is_tagalog = detect_tagalog(cleaned_query)
     
     # Handle location/contact queries first
     location_keywords_en = ['where are you located', 'where is your shop', 'your location', 'your address', 'where can i find you', 'shop location', 'workshop location', 'location']
@@ -530,7 +957,7 @@ def get_ollama_response(query, context="", max_retries=3):
     if is_location_query:
         # Extract contact info from knowledge base
         contact_section = ""
-        lines = KNOWLEDGE_BASE.split('\n')
+        lines = kb.knowledge_base.split('\n')
         in_workshop = False
         
         for line in lines:
@@ -613,7 +1040,7 @@ def get_ollama_response(query, context="", max_retries=3):
     if is_contact_query:
         # Extract contact info from knowledge base (same logic as location)
         contact_section = ""
-        lines = KNOWLEDGE_BASE.split('\n')
+        lines = kb.knowledge_base.split('\n')
         in_workshop = False
         
         for line in lines:
@@ -696,9 +1123,9 @@ def get_ollama_response(query, context="", max_retries=3):
     
     # Check for service queries with more flexible matching
     if any(keyword in cleaned_query for keyword in service_keywords):
-        if SERVICES:
+        if kb.services:
             service_list = []
-            for i, (service, price) in enumerate(SERVICES.items(), 1):
+            for i, (service, price) in enumerate(kb.services.items(), 1):
                 service_list.append(f"{i}. {service.title()} – {price}")
             
             if is_tagalog:
@@ -712,13 +1139,9 @@ def get_ollama_response(query, context="", max_retries=3):
                 return "No services found in PDF knowledge base. Please check your PDF content."
     
     # Handle price queries directly from PDF data
-    price_keywords_en = ["how much", "price", "cost", "magkano"]
-    price_keywords_tl = ["magkano", "presyo", "halaga", "bayad"]
-    
-    if (any(keyword in cleaned_query for keyword in price_keywords_en) or 
-        any(keyword in cleaned_query for keyword in price_keywords_tl)):
+    if any(keyword in cleaned_query for keyword in PRICE_KEYWORDS):
         # Check services first
-        for service, price in SERVICES.items():
+        for service, price in kb.services.items():
             if service in cleaned_query:
                 if is_tagalog:
                     return f"Ang bayad para sa {service} ay {price}."
@@ -726,7 +1149,7 @@ def get_ollama_response(query, context="", max_retries=3):
                     return f"The cost for {service} is {price}."
                 
         # Check products
-        for product, price in PRODUCTS.items():
+        for product, price in kb.products.items():
             if product in cleaned_query:
                 if is_tagalog:
                     return f"Ang presyo ng {product} ay ₱{price:,}."
@@ -735,7 +1158,7 @@ def get_ollama_response(query, context="", max_retries=3):
         
         # Fuzzy token-based matching for products (partial names)
         query_tokens = set(re.sub(r'[^a-z0-9\s]','', cleaned_query).split())
-        for product, price in PRODUCTS.items():
+        for product, price in kb.products.items():
             tokens = set(re.sub(r'[^a-z0-9\s]','', product).split())
             overlap = query_tokens.intersection(tokens)
             if overlap:
@@ -756,41 +1179,632 @@ def get_ollama_response(query, context="", max_retries=3):
     try:
         # Build a concise system prompt that instructs the model to stick to
         # answers that can be grounded on the provided knowledge base.
-        knowledge_context = (context or KNOWLEDGE_BASE).strip()
-        system_prompt = (
-            "You are PomBot, the helpful AI assistant for the motorcycle parts "
-            "shop PomWorkz. Use ONLY the information contained in the knowledge "
-            "base below to answer the user's question. If the answer cannot be "
-            "found in the knowledge base, respond with 'I am not sure about that.'\n\n"
-            f"KNOWLEDGE BASE:\n{knowledge_context}"
-        )
+        system_prompt = build_system_prompt(context or kb.prompt_context)
 
         messages = [
             {"role": "system", "content": system_prompt},
             {"role": "user", "content": query},
         ]
 
-        for attempt in range(max_retries):
-            try:
-                ollama_response = ollama.chat(model=OLLAMA_MODEL, messages=messages)
-                answer = ollama_response.get("message", {}).get("content", "").strip()
-                if answer:
-                    return answer
-            except Exception as retry_err:
-                logger.warning(f"Ollama attempt {attempt + 1} failed: {retry_err}")
-                time.sleep(1)
-
-        # If all retries failed, fall through to a generic message
-        return "I couldn't retrieve a response from the local language model at the moment."  # noqa: E501
+        tiers = model_tiers(cleaned_query)
+
+        # Answers are paid for once per model and knowledge version, not once per worker
+        knowledge_hash = hashlib.sha256(system_prompt.encode("utf-8")).hexdigest()[:16]
+        if use_cache and answer_cache is not None and not _caches_checked.get():
+            timer = current_timer()
+            with timer.stage("disk_cache"):
+                cached = answer_cache.get_any([tier.model for tier in tiers], knowledge_hash, query)
+            timer.describe("disk_cache", "hit" if cached is not None else "miss")
+            if cached is not None:
+                return cached
+
+        # Per-client LLM budget, charged only when the model is really about to be called
+        client = g.get("rate_limit_client") if has_request_context() else None
+        if rate_limiter and client:
+            allowed, retry_after = rate_limiter.acquire(client, "llm")
+            if not allowed:
+                return RateLimitedResponse(rate_limit_message(retry_after, is_tagalog), retry_after)
+
+        if _defer_model_calls.get():
+            return DeferredResponse("Your question is being answered in the background.")
+
+        # Within a request the model call is streamed and abandoned at the deadline or on disconnect
+        deadline = current_deadline()
+
+        # chat() puts every request's model call in the slow lane; a full lane answers from the catalog
+        lane = g.get("model_lane") if has_request_context() else None
+        wait = SLOW_LANE_MAX_WAIT if deadline is None else min(SLOW_LANE_MAX_WAIT, deadline.remaining())
+        try:
+            with lane.admit(wait) if lane is not None else nullcontext():
+                return ask_model(query, messages, tiers, knowledge_hash, deadline, is_tagalog, max_retries, use_cache)
+        except LaneFull as e:
+            logger.warning(f"{e}: answering from the catalog")
+            return get_degraded_response(query, is_tagalog)
 
     except Exception as e:
         logger.error(f"Error communicating with Ollama: {e}")
-        return "I encountered an error while contacting the local language model."  # noqa: E501
+        return TransientResponse("I encountered an error while contacting the local language model.")  # noqa: E501
+
+
+def ask_model(query, messages, tiers, knowledge_hash, deadline, is_tagalog, max_retries, use_cache):
+    """get_ollama_response's model call: the tiers in order, within the breaker and the request's deadline"""
+    # Nothing to do if the deadline passed or the client left, e.g. while waiting for the slow lane
+    if deadline is not None and deadline.cancel_reason():
+        return get_degraded_response(query, is_tagalog)
+
+    # Fail fast while the circuit breaker is open instead of waiting on a dead model
+    if not ollama_breaker.allow():
+        return get_degraded_response(query, is_tagalog)
+
+    start = time.perf_counter()
+    try:
+        answer, tier, cancelled = ask_model_tiers(messages, tiers, deadline, max_retries)
+    except Exception:
+        # Every allowed call must be recorded, or a half-open breaker never closes again
+        ollama_breaker.record(False, time.perf_counter() - start)
+        raise
+
+    if cancelled == DISCONNECT:
+        # Nobody is waiting for the answer; that says nothing about the model
+        ollama_breaker.release()
+        return TransientResponse("The request was cancelled.")
+    if cancelled == DEADLINE and deadline.from_client and deadline.expired():
+        # The client chose to wait less than the server would; only the server's own deadline counts as a failure
+        ollama_breaker.release()
+    else:
+        ollama_breaker.record(bool(answer), time.perf_counter() - start)
+    if answer:
+        if use_cache and answer_cache is not None and tier is not None:
+            answer_cache.put(tier.model, knowledge_hash, query, answer)
+        return answer
+    if cancelled:
+        return get_degraded_response(query, is_tagalog)
+
+    # If all retries failed, fall through to a generic message
+    return TransientResponse("I couldn't retrieve a response from the local language model at the moment.")  # noqa: E501
+
+
+def ask_model_tiers(messages, tiers, deadline, max_retries):
+    """
+    (answer, tier that gave it, cancel reason or None): the tiers in order,
+    a tier without an answer handing the question to the next one. An
+    unsure answer is kept in case no later tier does better, and returned
+    without a tier so it is not cached.
+    """
+    timer = current_timer()
+    fallback = ""
+    cancelled = None
+    for index, tier in enumerate(tiers):
+        last_tier = index == len(tiers) - 1
+        call_options = {}
+        if deadline is not None:
+            cancelled = deadline.cancel_reason()
+            if cancelled:
+                break
+            call_options = {"deadline": min(OLLAMA_DEADLINE, deadline.remaining()),
+                            "cancel": deadline.cancel_reason}
+        tier_start = time.perf_counter()
+        try:
+            with timer.stage("llm"):
+                ollama_response = ollama_client.chat(tier.model, messages, options=tier.options or None,
+                                                     keep_alive=OLLAMA_KEEP_ALIVE, max_attempts=max_retries,
+                                                     **call_options)
+            answer = ollama_response.get("message", {}).get("content", "").strip()
+            model_warmer.record_call(tier.model, time.perf_counter() - tier_start,
+                                     (ollama_response.get("load_duration") or 0) / 1e9)
+        except OllamaCancelled as e:
+            answer = ""
+            cancelled = e.reason
+            logger.info(f"Ollama request to {tier.model} cancelled ({e.reason}) after {e.elapsed:.2f}s")
+        except OllamaError as ollama_err:
+            answer = ""
+            logger.warning(f"Ollama request to {tier.model} failed: {ollama_err}")
+        if model_router and cancelled != DISCONNECT:
+            model_router.record(tier, time.perf_counter() - tier_start, escalated=index > 0)
+        timer.describe("llm", tier.name)
+        if cancelled:
+            break
+
+        if answer and (last_tier or UNSURE_ANSWER not in answer.lower()):
+            return answer, tier, None
+        fallback = fallback or answer
+    return fallback, None, cancelled
+
+
+def query_features(cleaned_query):
+    """What model routing looks at: length, catalog items and words mentioned, reasoning cues"""
+    catalog = current_knowledge().catalog
+    return QueryFeatures(
+        words=len(cleaned_query.split()),
+        catalog_items=len(catalog.mentions(cleaned_query)) if catalog else 0,
+        catalog_terms=len(catalog.vocabulary_terms(cleaned_query, ignored=GENERIC_ITEM_WORDS)) if catalog else 0,
+        reasoning=bool(REASONING_RE.search(cleaned_query)),
+    )
+
+
+def model_tiers(cleaned_query):
+    """Models to ask for this question, in order"""
+    if model_router is None:
+        return [LARGE_TIER]
+    return model_router.route(query_features(cleaned_query))
+
+
+def detect_tagalog(cleaned_query):
+    """Whether a query is Tagalog/Taglish, used to pick the response language; computed once per request"""
+    return language_id.is_tagalog(cleaned_query)
+
+
+def availability_keywords(cleaned_query):
+    """Words left in a Tagalog availability question once question words are removed"""
+    return [word for word in cleaned_query.split() if word not in AVAILABILITY_SKIP_WORDS and len(word) > 2]
+
+
+def detect_intent(cleaned_query, is_tagalog):
+    """
+    Classify a cleaned (stripped, lowercased) query into the intent that
+    get_ai_response answers it with. Checks run in priority order; "llm"
+    means no deterministic answer applies.
+    """
+    kb = current_knowledge()
+    def matches(keywords):
+        return any(keyword in cleaned_query for keyword in keywords)
+
+    if matches(LOCATION_KEYWORDS):
+        return "location"
+    if matches(CONTACT_KEYWORDS):
+        return "contact"
+    if is_tagalog and matches(AVAILABILITY_KEYWORDS_TL) and availability_keywords(cleaned_query):
+        return "availability"
+    if matches(WARRANTY_KEYWORDS):
+        return "warranty"
+    if kb.catalog and kb.catalog.parse_query(cleaned_query):
+        return "catalog_query"
+    if matches(SERVICE_LIST_KEYWORDS):
+        return "service_list"
+    if matches(BOOKING_KEYWORDS):
+        return "booking"
+    if matches(ORDERING_KEYWORDS):
+        return "ordering"
+    if matches(SERVICE_PROCESS_KEYWORDS):
+        return "service_process"
+    if matches(GREETINGS_EN) or matches(GREETINGS_TL):
+        return "greeting"
+    if matches(CREATOR_KEYWORDS):
+        return "creator"
+    if matches(FAQ_KEYWORDS) and kb.faq_section.strip():
+        return "faq"
+    if matches(SERVICES_AVAILABLE_KEYWORDS):
+        return "services_available"
+    if matches(PRODUCT_LIST_KEYWORDS):
+        return "product_list"
+    if product_info_kind(cleaned_query) and not matches(PRICE_KEYWORDS) and product_info_items(cleaned_query)[0]:
+        return "product_info"
+    return "llm"
+
+
+def product_info_kind(cleaned_query):
+    """"availability" or "description" for questions about a named item, else None"""
+    if any(keyword in cleaned_query for keyword in PRODUCT_DESCRIPTION_KEYWORDS):
+        return "description"
+    if any(keyword in cleaned_query for keyword in PRODUCT_AVAILABILITY_KEYWORDS):
+        return "availability"
+    return None
+
+
+def product_info_items(cleaned_query):
+    """
+    (items, named) for a question about catalog items: the items it names in
+    full, else for availability questions the items sharing a distinctive
+    word with it ("do you have brakes" -> every brake item)
+    """
+    catalog = current_knowledge().catalog
+    if not catalog:
+        return [], False
+    items = catalog.mentions(cleaned_query)
+    if items:
+        return items, True
+    if product_info_kind(cleaned_query) != "availability":
+        return [], False
+    terms = catalog.vocabulary_terms(cleaned_query, ignored=GENERIC_ITEM_WORDS)
+    return (catalog.containing(terms) if terms else []), False
+
+
+def render_product_info_response(cleaned_query, is_tagalog):
+    """Whether we carry an item and what it is, from its catalog line, category and related items"""
+    kb = current_knowledge()
+    items, named = product_info_items(cleaned_query)
+    kind = product_info_kind(cleaned_query)
+
+    if len(items) > 1 or not named:
+        shown = items[:PRODUCT_INFO_MAX_ITEMS]
+        lines = [f"- {item.display_name}: {item.price_text}" for item in shown]
+        if len(items) > len(shown):
+            more = len(items) - len(shown)
+            lines.append(f"...at {more} pa" if is_tagalog else f"...and {more} more")
+        if named:
+            header = "Yes po, meron kami ng mga ito:" if is_tagalog else "Yes, we have:"
+        else:
+            subject = " ".join(kb.catalog.vocabulary_terms(cleaned_query, ignored=GENERIC_ITEM_WORDS))
+            header = f"Narito ang meron kami para sa {subject}:" if is_tagalog else f"Here's what we have for {subject}:"
+        return header + "\n" + "\n".join(lines)
+
+    item = items[0]
+    is_service = item.kind == SERVICE
+    if kind == "availability":
+        if is_tagalog:
+            verb = "ginagawa namin ang" if is_service else "meron kaming"
+            answer = f"Yes po, {verb} {item.display_name} ({item.category}) sa halagang {item.price_text}."
+            if not is_service:
+                answer += " Para sigurado sa stock, tumawag o mag-message po muna bago pumunta."
+        else:
+            verb = "we offer" if is_service else "we have the"
+            answer = f"Yes, {verb} {item.display_name} ({item.category}) for {item.price_text}."
+            if not is_service:
+                answer += " Stock moves quickly, so please call or message us to reserve one before visiting."
+        return answer
+
+    if is_tagalog:
+        answer = f"Ang {item.display_name} ay nasa ilalim ng {item.category}, na nagkakahalaga ng {item.price_text}."
+    else:
+        answer = f"The {item.display_name} is listed under {item.category}, priced at {item.price_text}."
+    related = kb.catalog.related(item)
+    if related:
+        names = ", ".join(f"{other.display_name} ({other.price_text})" for other in related)
+        answer += f"\n\nKaugnay sa {item.category}: {names}" if is_tagalog else f"\n\nAlso in {item.category}: {names}"
+    # Parts and the labor for them: "CDI Unit" <-> "CDI Replacement"; at least half of the other name must match
+    terms = item.tokens - GENERIC_ITEM_WORDS
+    counterparts = [other for other in kb.catalog.containing(terms)
+                    if other.kind != item.kind and 2 * len(terms & other.tokens) >= len(other.tokens - GENERIC_ITEM_WORDS)]
+    if counterparts:
+        names = ", ".join(f"{other.display_name} ({other.price_text})" for other in counterparts[:3])
+        if is_tagalog:
+            answer += f"\nKaugnay na {'products' if is_service else 'service'}: {names}"
+        else:
+            answer += f"\nRelated {'products' if is_service else 'services'}: {names}"
+    return answer
+
+
+def render_catalog_query_response(cleaned_query, is_tagalog):
+    """Answer a price-range, cheapest/most-expensive or category question from the catalog"""
+    kb = current_knowledge()
+    catalog_query = kb.catalog.parse_query(cleaned_query)
+    limit = 3 if catalog_query.order and catalog_query.low is None and catalog_query.high is None else None
+    items = kb.catalog.run_query(catalog_query, limit=limit)
+
+    # Describe what was asked for: "brake products under ₱500 in Suspension & Brakes"
+    noun = {PRODUCT: "products", SERVICE: "services"}.get(catalog_query.kind, "items")
+    subject = " ".join(catalog_query.terms + (noun,))
+    conditions = []
+    if catalog_query.low is not None and catalog_query.high is not None:
+        conditions.append(f"₱{catalog_query.low:,} - ₱{catalog_query.high:,}" if not is_tagalog
+                          else f"mula ₱{catalog_query.low:,} hanggang ₱{catalog_query.high:,}")
+    elif catalog_query.high is not None:
+        conditions.append(f"₱{catalog_query.high:,} and below" if not is_tagalog else f"₱{catalog_query.high:,} pababa")
+    elif catalog_query.low is not None:
+        conditions.append(f"₱{catalog_query.low:,} and above" if not is_tagalog else f"₱{catalog_query.low:,} pataas")
+    if catalog_query.category:
+        conditions.append(f"in {catalog_query.category}" if not is_tagalog else f"sa {catalog_query.category}")
+    description = " ".join([subject] + conditions)
+
+    if not items:
+        if is_tagalog:
+            return f"Wala po kaming {description}. Maaari ninyong itanong ang aming complete product o service list."
+        return f"We don't have any {description}. You can ask for our complete product or service list."
+
+    lines = [f"- {item.display_name}: {item.price_text}" for item in items]
+    if catalog_query.order == "asc":
+        header = f"Pinakamurang {description}:" if is_tagalog else f"Cheapest {description}:"
+    elif catalog_query.order == "desc":
+        header = f"Pinakamahal na {description}:" if is_tagalog else f"Most expensive {description}:"
+    else:
+        header = f"Narito ang {description}:" if is_tagalog else f"Here are our {description}:"
+    return header + "\n" + "\n".join(lines)
+
+
+def response_is_tagalog(intent, cleaned_query, is_tagalog):
+    """Language of the answer; Tagalog greetings get a Tagalog reply even without other markers"""
+    if intent == "greeting":
+        return is_tagalog or any(greeting in cleaned_query for greeting in GREETINGS_TL)
+    return is_tagalog
+
+
+def render_static_response(intent, is_tagalog):
+    """Answer text for one of STATIC_INTENTS in the requested language"""
+    kb = current_knowledge()
+    if intent == "service_list":
+        if kb.services:
+            service_list = []
+            for i, (service, price) in enumerate(kb.services.items(), 1):
+                service_list.append(f"{i}. {service.title()} – {price}")
+            
+            if is_tagalog:
+                return "Narito ang lahat ng services na inooffer namin sa PomWorkz:\n" + "\n".join(service_list)
+            else:
+                return "Here are all services offered at PomWorkz:\n" + "\n".join(service_list)
+        else:
+            if is_tagalog:
+                return "Walang services na nakita sa PDF knowledge base."
+            else:
+                return "No services found in PDF knowledge base."
+
+    if intent == "booking":
+        if is_tagalog:
+            return """Paano mag-book ng services sa PomWorkz:
+
+1. 🌐 Pumunta sa aming online booking platform: https://pomworkz.vercel.app/services/book
+
+2. 🔧 Select Services: Piliin ang mga service na kailangan ninyo tulad ng engine repairs, transmission work, general maintenance, at iba pa.
+
+3. 📝 Type Customer Information: I-enter ang inyong contact details, vehicle information, at service requirements.
+
+4. 📅 Pick Schedule: Piliin ang preferred date at time para sa service appointment.
+
+5. ✅ Book a Service: I-click ang "Book a service" button para ma-confirm ang appointment.
+
+🌟 Benefits ng Online Booking:
+- Available 24/7
+- Instant confirmation
+- Flexible scheduling
+- Easy appointment management
+
+Para sa urgent repairs o kung gusto ninyo ng phone booking, pwede rin kayong tumawag sa amin during business hours!"""
+        else:
+            return """How to Book Services at PomWorkz:
+
+1. 🌐 Go to our online booking platform: https://pomworkz.vercel.app/services/book
+
+2. 🔧 Select Services: Choose from our wide range of available services including engine repairs, transmission work, general maintenance, and more.
+
+3. 📝 Type Customer Information: Enter your contact details, vehicle information, and service requirements.
+
+4. 📅 Pick Schedule: Select your preferred date and time for the service appointment.
 
+5. ✅ Book a Service: Press the "Book a service" button to confirm your appointment.
+
+🌟 Online Booking Benefits:
+- 24/7 booking availability
+- Instant confirmation
+- Service scheduling flexibility
+- Easy appointment management
+- No phone calls required
+
+For urgent repairs or if you prefer phone booking, you can also contact us directly during business hours!"""
+
+    if intent == "ordering":
+        if is_tagalog:
+            return """Paano mag-order ng products sa PomWorkz:
+
+1. 🛒 Choose a Product: Piliin ang product na kailangan ninyo mula sa aming catalog
+
+2. ➕ Press Add to Cart: I-click ang "Add to Cart" para ilagay sa shopping cart
+
+3. 🛍️ Press Show Cart: I-click ang "Show Cart" para tingnan ang mga nasa cart ninyo
+
+4. 💳 Then Proceed to Checkout: I-click ang "Proceed to Checkout" para ma-complete ang order
+
+🌟 Simple at convenient na ordering process para sa lahat ng inyong motorcycle parts needs!"""
+        else:
+            return """How to Order Products at PomWorkz:
+
+1. 🛒 Choose a Product: Select the product you need from our catalog
+
+2. ➕ Press Add to Cart: Click "Add to Cart" to add the item to your shopping cart
+
+3. 🛍️ Press Show Cart: Click "Show Cart" to review the items in your cart
+
+4. 💳 Then Proceed to Checkout: Click "Proceed to Checkout" to complete your order
+
+🌟 Simple and convenient ordering process for all your motorcycle parts needs!"""
+
+    if intent == "service_process":
+        if is_tagalog:
+            return """Ang Service Process sa PomWorkz:
+
+1. 📅 Book Appointment: Mag-schedule ng service appointment sa aming website, sa phone, o personal na pagpunta.
+
+2. 🔍 Initial Assessment: Aming mga technicians ay mag-aassess ng inyong motorcycle at magbibigay ng detailed service plan.
+
+3. 🔧 Service Execution: Ang aming skilled mechanics ay gagawin ang requested services nang may precision at care.
+
+4. ✅ Quality Check: Thoroughly namin tinetest ang lahat ng work para ma-ensure na naaabot namin ang aming high standards.
+
+5. 🚀 Delivery: Pick up ninyo ang inyong motorcycle at mag-enjoy sa improved performance at reliability.
+
+🌟 Professional at comprehensive service process para sa best results!"""
+        else:
+            return """The Service Process at PomWorkz:
+
+1. 📅 Book Appointment: Schedule a service appointment through our website, by phone, or in person.
+
+2. 🔍 Initial Assessment: Our technicians will assess your motorcycle and provide a detailed service plan.
+
+3. 🔧 Service Execution: Skilled mechanics perform the requested services with precision and care.
 
-@lru_cache(maxsize=100)
-def get_ai_response(query):
+4. ✅ Quality Check: We thoroughly test all work to ensure everything meets our high standards.
+
+5. 🚀 Delivery: Pick up your motorcycle and enjoy the improved performance and reliability.
+
+🌟 Professional and comprehensive service process for the best results!"""
+
+    if intent == "greeting":
+        if is_tagalog:
+            return f"Kumusta! Ako si PomBot, ang auto parts specialist ninyo sa PomWorkz. May {len(kb.products)} products at {len(kb.services)} services akong alam mula sa aming catalog. Paano kita matutulungan ngayon?"
+        else:
+            return f"Hello! I'm PomBot, your auto parts specialist at PomWorkz. I have information about {len(kb.products)} products and {len(kb.services)} services from our catalog. How can I help you today?"
+
+    if intent == "creator":
+        if is_tagalog:
+            return "Ginawa ako ni Cleo Dipasupil."
+        else:
+            return "I am created by Cleo Dipasupil."
+
+    if intent == "services_available":
+        if kb.services:
+            service_list = []
+            for i, (service, price) in enumerate(kb.services.items(), 1):
+                service_list.append(f"{i}. {service.title()} – {price}")
+            
+            if is_tagalog:
+                return "Available na Services sa PomWorkz:\n" + "\n".join(service_list)
+            else:
+                return "Available Services at PomWorkz:\n" + "\n".join(service_list)
+        else:
+            if is_tagalog:
+                return "Walang services na nakita sa PDF knowledge base."
+            else:
+                return "No services found in PDF knowledge base."
+
+    if intent == "product_list":
+        if kb.products:
+            product_list = []
+            for product, price in kb.products.items():
+                product_list.append(f"- {product.title()}: ₱{price:,}")
+            
+            if is_tagalog:
+                return "Available na Products sa PomWorkz:\n" + "\n".join(product_list)
+            else:
+                return "Available Products at PomWorkz:\n" + "\n".join(product_list)
+        else:
+            if is_tagalog:
+                return "Walang products na nakita sa PDF knowledge base."
+            else:
+                return "No products found in PDF knowledge base."
+
+    raise ValueError(f"Not a static intent: {intent}")
+
+
+def extract_faq_section(knowledge_base):
+    """FAQ lines of the assembled knowledge base, as answered for FAQ questions"""
+    faq_section = ""
+    in_faq = False
+
+    for line in knowledge_base.split('\n'):
+        if "FREQUENTLY ASKED QUESTIONS:" in line:
+            in_faq = True
+            continue
+        elif in_faq and "WORKSHOP DETAILS:" in line:
+            break
+        elif in_faq:
+            faq_section += line + "\n"
+
+    return faq_section
+
+
+def build_prompt_context(kb):
+    """
+    Compacted knowledge for the model's system prompt, within
+    PROMPT_TOKEN_BUDGET. Raises KnowledgeBudgetError if it does not fit and
+    PROMPT_OVER_BUDGET is "refuse".
+    """
+    context = compact_knowledge(kb.knowledge_base) if KNOWLEDGE_COMPACTION else kb.knowledge_base.strip()
+    stats = {
+        "chars_before": len(kb.knowledge_base),
+        "tokens_before": estimate_tokens(kb.knowledge_base),
+        "chars": len(context),
+        "tokens": estimate_tokens(context),
+        "budget": PROMPT_TOKEN_BUDGET,
+        "trimmed_lines": 0,
+    }
+    if stats["tokens"] > PROMPT_TOKEN_BUDGET:
+        if PROMPT_OVER_BUDGET == "refuse":
+            raise KnowledgeBudgetError(f"Knowledge base of tenant {kb.tenant} needs about {stats['tokens']} prompt "
+                                       f"tokens, over the budget of {PROMPT_TOKEN_BUDGET}")
+        context, stats["trimmed_lines"] = trim_to_budget(context, PROMPT_TOKEN_BUDGET)
+        logger.warning(f"Knowledge base of tenant {kb.tenant} is over the prompt budget of {PROMPT_TOKEN_BUDGET} "
+                       f"tokens, dropped its last {stats['trimmed_lines']} lines")
+        stats["chars"], stats["tokens"] = len(context), estimate_tokens(context)
+    logger.info(f"Prompt context of tenant {kb.tenant}: {stats['chars_before']} -> {stats['chars']} characters, "
+                f"about {stats['tokens_before']} -> {stats['tokens']} tokens")
+    return context, stats
+
+
+def build_response_snapshot(kb):
+    """
+    Fill in everything derived from a snapshot's knowledge base, products
+    and services: the compacted prompt context, the version hash, the FAQ
+    section and the pre-rendered JSON bodies of all static and listing
+    answers, so /api/chat can send them as-is.
+    """
+    kb.prompt_context, kb.prompt_stats = build_prompt_context(kb)
+    digest = hashlib.sha256(kb.knowledge_base.encode("utf-8"))
+    digest.update(kb.prompt_context.encode("utf-8"))
+    digest.update(json.dumps([kb.products, kb.services], sort_keys=True).encode("utf-8"))
+    kb.version = digest.hexdigest()[:16]
+    kb.faq_section = extract_faq_section(kb.knowledge_base)
+
+    prerendered = {}
+    # Without catalog data get_ai_response answers with a "not loaded" message instead
+    if kb.knowledge_base and (kb.products or kb.services):
+        for intent in STATIC_INTENTS:
+            for language in ("en", "tl"):
+                with use_knowledge(kb):
+                    text = render_static_response(intent, language == "tl")
+                prerendered[(intent, language)] = app.json.response({"response": text}).get_data()
+    kb.prerendered = prerendered
+    return kb
+
+
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "maxsize", "currsize"])
+
+
+def cache_stable_responses(maxsize=100, key=None):
+    """
+    LRU cache for get_ai_response that skips TransientResponse answers, so a
+    degraded reply given during an outage is not served after recovery.
+    key(query) maps a call to its cache key (default: the query itself).
+    """
+    def decorator(func):
+        cache = OrderedDict()
+        lock = threading.Lock()
+        counters = {"hits": 0, "misses": 0}
+
+        @wraps(func)
+        def wrapper(query, *args, **kwargs):
+            # Extra arguments are derived from the query (e.g. is_tagalog) and not part of the key
+            timer = current_timer()
+            cache_key = key(query) if key else query
+            if _caches_checked.get():
+                return store(cache_key, func(query, *args, **kwargs))
+            with timer.stage("cache"):
+                with lock:
+                    if cache_key in cache:
+                        cache.move_to_end(cache_key)
+                        counters["hits"] += 1
+                        timer.describe("cache", "hit")
+                        return cache[cache_key]
+                    counters["misses"] += 1
+            timer.describe("cache", "miss")
+            return store(cache_key, func(query, *args, **kwargs))
+
+        def store(cache_key, response):
+            if not isinstance(response, TransientResponse):
+                with lock:
+                    cache[cache_key] = response
+                    while len(cache) > maxsize:
+                        cache.popitem(last=False)
+            return response
+
+        def cache_info():
+            with lock:
+                return CacheInfo(counters["hits"], counters["misses"], maxsize, len(cache))
+
+        def cache_clear():
+            with lock:
+                cache.clear()
+                counters["hits"] = counters["misses"] = 0
+
+        wrapper.cache_info = cache_info
+        wrapper.cache_clear = cache_clear
+        return wrapper
+
+    return decorator
+
+
+# Keyed by knowledge base version so tenants, and reloads, never share answers
+@cache_stable_responses(maxsize=100, key=lambda query: (current_knowledge().version, query))
+def get_ai_response(query, is_tagalog=None):
     """Get AI response with fallback - completely PDF-driven"""
+    kb = current_knowledge()
     try:
         # Clean and format the input
         cleaned_query = query.strip().lower()
@@ -798,24 +1812,19 @@ def get_ai_response(query):
             return "Please provide a message."
 
         # Check if PDF data is loaded
-        if not KNOWLEDGE_BASE or (not PRODUCTS and not SERVICES):
+        if not kb.knowledge_base or (not kb.products and not kb.services):
             return "PDF knowledge base is not loaded. Please ensure 'POMWORKZ AUTO PARTS CATALOG.pdf' is in the project directory and restart the application."
 
-        # Detect if query is in Tagalog
-        tagalog_indicators = ['ano', 'gaano', 'ilang', 'paano', 'saan', 'kailan', 'bakit', 'kung', 'mga', 'ng', 'sa', 'para', 'naman', 'lang', 'po', 'magkano', 'meron', 'walang', 'kumusta', 'kamusta']
-        is_tagalog = any(indicator in cleaned_query for indicator in tagalog_indicators)
+        # Detect if query is in Tagalog, unless chat() already did
+        if is_tagalog is None:
+            is_tagalog = detect_tagalog(cleaned_query)
+        intent = detect_intent(cleaned_query, is_tagalog)
 
         # Handle location/contact queries first
-        location_keywords_en = ['where are you located', 'where is your shop', 'your location', 'your address', 'where can i find you', 'shop location', 'workshop location', 'location']
-        location_keywords_tl = ['saan kayo', 'nasaan kayo', 'asan ang shop', 'location nyo', 'address nyo', 'saan po kayo', 'nasaan po kayo', 'saan kayo located', 'saan po kayo located', 'saan ang location', 'asan kayo', 'saan ang shop']
-        
-        is_location_query = (any(keyword in cleaned_query for keyword in location_keywords_en) or
-                            any(keyword in cleaned_query for keyword in location_keywords_tl))
-        
-        if is_location_query:
+        if intent == "location":
             # Extract contact info from knowledge base
             contact_section = ""
-            lines = KNOWLEDGE_BASE.split('\n')
+            lines = kb.knowledge_base.split('\n')
             in_workshop = False
             
             for line in lines:
@@ -889,16 +1898,10 @@ def get_ai_response(query):
                 return "Contact information not found in PDF. Please check your PDF content."
         
         # Handle contact/hours queries - also use PDF extraction
-        contact_keywords_en = ['contact', 'phone', 'email', 'hours', 'operating hours', 'open hours', 'business hours']
-        contact_keywords_tl = ['contact', 'numero', 'email', 'oras', 'bukas', 'operating hours']
-        
-        is_contact_query = (any(keyword in cleaned_query for keyword in contact_keywords_en) or
-                           any(keyword in cleaned_query for keyword in contact_keywords_tl))
-        
-        if is_contact_query:
+        if intent == "contact":
             # Extract contact info from knowledge base (same logic as location)
             contact_section = ""
-            lines = KNOWLEDGE_BASE.split('\n')
+            lines = kb.knowledge_base.split('\n')
             in_workshop = False
             
             for line in lines:
@@ -967,31 +1970,15 @@ def get_ai_response(query):
             else:
                 return "Contact information not found in PDF. Please check your PDF content."
 
-        # Check for warranty-related questions in English and Tagalog
-        warranty_keywords_en = ['warranty', 'guarantee', 'coverage', 'how long', 'return policy']
-        warranty_keywords_tl = ['warranty', 'garantiya', 'takot', 'gaano katagal', 'ilang araw', 'ilang buwan', 'ilang taon', 'policy', 'patakaran']
-        
-        is_warranty_query = (any(keyword in cleaned_query for keyword in warranty_keywords_en) or 
-                           any(keyword in cleaned_query for keyword in warranty_keywords_tl))
-        
         # Check for product availability questions in Tagalog
-        availability_keywords_tl = ['may', 'meron', 'available', 'ba kayo', 'po ba']
-        is_availability_query = any(keyword in cleaned_query for keyword in availability_keywords_tl)
-        
-        if is_availability_query and is_tagalog:
+        if intent == "availability":
             # Extract product name from query (remove question words)
-            query_words = cleaned_query.split()
-            product_keywords = []
-            skip_words = ['may', 'meron', 'po', 'ba', 'kayo', 'available', 'ang', 'ng', 'na']
-            
-            for word in query_words:
-                if word not in skip_words and len(word) > 2:
-                    product_keywords.append(word)
+            product_keywords = availability_keywords(cleaned_query)
             
             if product_keywords:
                 # Check if any products match the keywords
                 found_products = []
-                for product, price in PRODUCTS.items():
+                for product, price in kb.products.items():
                     for keyword in product_keywords:
                         if keyword in product.lower() or product.lower() in keyword:
                             found_products.append((product, price))
@@ -1006,7 +1993,7 @@ def get_ai_response(query):
                 else:
                     # Check if it's available as a service
                     found_services = []
-                    for service, price in SERVICES.items():
+                    for service, price in kb.services.items():
                         for keyword in product_keywords:
                             if keyword in service.lower() or service.lower() in keyword:
                                 found_services.append((service, price))
@@ -1017,13 +2004,16 @@ def get_ai_response(query):
                         for service, price in found_services:
                             service_list.append(f"- {service.title()}: {price}")
                         return f"Hindi namin directly binebenta ang {' '.join(product_keywords)}, pero meron kaming service para dito:\n" + "\n".join(service_list)
+                    elif product_info_items(cleaned_query)[0]:
+                        # Word-level catalog match for spellings the substring check misses ("oil?", plurals)
+                        return render_product_info_response(cleaned_query, is_tagalog)
                     else:
                         return f"Hindi po namin available ang {' '.join(product_keywords)} sa aming inventory. Maaari ninyo pong tingnan ang aming complete product list o magtanong tungkol sa ibang parts na kailangan ninyo."
 
-        if is_warranty_query:
+        if intent == "warranty":
             # Extract warranty info from knowledge base
             warranty_section = ""
-            lines = KNOWLEDGE_BASE.split('\n')
+            lines = kb.knowledge_base.split('\n')
             in_warranty = False
             
             for line in lines:
@@ -1051,237 +2041,27 @@ Para sa mga tanong tungkol sa warranty, maaari kayong magtanong sa Tagalog o Eng
                     return f"Here's our warranty information:\n\n{warranty_section.strip()}"
             else:
                 # Fallback to Ollama for warranty questions
-                response = get_ollama_response(cleaned_query, KNOWLEDGE_BASE)
+                response = get_ollama_response(cleaned_query, kb.prompt_context, is_tagalog=is_tagalog)
                 if response:
                     return response
                 return "I have warranty information in our knowledge base, but let me get that for you from our complete catalog."
 
-        # Move service check before greetings to prevent greeting responses for service queries
-        service_keywords_en = [
-            "what are the service", "what are the servic",
-            "what service", "list service",
-            "available service", "show service",
-            "tell me the service", "what are your service",
-            "services offer", "service list"
-        ]
-        
-        service_keywords_tl = [
-            "ano ang service", "ano ang mga service", "anong service",
-            "mga service", "lista ng service", "available na service",
-            "pwedeng service", "ano ang pwedeng service"
-        ]
-        
-        is_service_query = (any(keyword in cleaned_query for keyword in service_keywords_en) or
-                          any(keyword in cleaned_query for keyword in service_keywords_tl))
-        
-        if is_service_query:
-            if SERVICES:
-                service_list = []
-                for i, (service, price) in enumerate(SERVICES.items(), 1):
-                    service_list.append(f"{i}. {service.title()} – {price}")
-                
-                if is_tagalog:
-                    return "Narito ang lahat ng services na inooffer namin sa PomWorkz:\n" + "\n".join(service_list)
-                else:
-                    return "Here are all services offered at PomWorkz:\n" + "\n".join(service_list)
-            else:
-                if is_tagalog:
-                    return "Walang services na nakita sa PDF knowledge base."
-                else:
-                    return "No services found in PDF knowledge base."
-
-        # Check for booking-related questions in English and Tagalog
-        booking_keywords_en = [
-            "how to book", "book service", "book a service", "booking process", 
-            "how do i book", "steps to book", "booking procedure", "how can i book",
-            "service booking", "book services", "schedule service", "appointment"
-        ]
-        booking_keywords_tl = [
-            "paano mag book", "pano mag book", "booking process", "paano mag appointment",
-            "book service", "mag book ng service", "paano mag schedule"
-        ]
-        
-        is_booking_query = (any(keyword in cleaned_query for keyword in booking_keywords_en) or
-                           any(keyword in cleaned_query for keyword in booking_keywords_tl))
-        
-        if is_booking_query:
-            if is_tagalog:
-                return """Paano mag-book ng services sa PomWorkz:
-
-1. 🌐 Pumunta sa aming online booking platform: https://pomworkz.vercel.app/services/book
-
-2. 🔧 Select Services: Piliin ang mga service na kailangan ninyo tulad ng engine repairs, transmission work, general maintenance, at iba pa.
-
-3. 📝 Type Customer Information: I-enter ang inyong contact details, vehicle information, at service requirements.
-
-4. 📅 Pick Schedule: Piliin ang preferred date at time para sa service appointment.
-
-5. ✅ Book a Service: I-click ang "Book a service" button para ma-confirm ang appointment.
-
-🌟 Benefits ng Online Booking:
-- Available 24/7
-- Instant confirmation
-- Flexible scheduling
-- Easy appointment management
-
-Para sa urgent repairs o kung gusto ninyo ng phone booking, pwede rin kayong tumawag sa amin during business hours!"""
-            else:
-                return """How to Book Services at PomWorkz:
-
-1. 🌐 Go to our online booking platform: https://pomworkz.vercel.app/services/book
-
-2. 🔧 Select Services: Choose from our wide range of available services including engine repairs, transmission work, general maintenance, and more.
-
-3. 📝 Type Customer Information: Enter your contact details, vehicle information, and service requirements.
+        # Price-range, cheapest/most-expensive and category questions
+        if intent == "catalog_query":
+            return render_catalog_query_response(cleaned_query, is_tagalog)
 
-4. 📅 Pick Schedule: Select your preferred date and time for the service appointment.
+        if intent == "product_info":
+            return render_product_info_response(cleaned_query, is_tagalog)
 
-5. ✅ Book a Service: Press the "Book a service" button to confirm your appointment.
-
-🌟 Online Booking Benefits:
-- 24/7 booking availability
-- Instant confirmation
-- Service scheduling flexibility
-- Easy appointment management
-- No phone calls required
-
-For urgent repairs or if you prefer phone booking, you can also contact us directly during business hours!"""
-
-        # Check for ordering/purchasing-related questions in English and Tagalog
-        ordering_keywords_en = [
-            "how to order", "order product", "order products", "ordering process", 
-            "how do i order", "steps to order", "ordering procedure", "how can i order",
-            "product ordering", "buy product", "purchase product", "how to buy", "how to purchase"
-        ]
-        ordering_keywords_tl = [
-            "paano mag order", "pano mag order", "ordering process", "paano bumili",
-            "order product", "mag order ng product", "paano mag purchase", "bumili ng product"
-        ]
-        
-        is_ordering_query = (any(keyword in cleaned_query for keyword in ordering_keywords_en) or
-                            any(keyword in cleaned_query for keyword in ordering_keywords_tl))
-        
-        if is_ordering_query:
-            if is_tagalog:
-                return """Paano mag-order ng products sa PomWorkz:
-
-1. 🛒 Choose a Product: Piliin ang product na kailangan ninyo mula sa aming catalog
-
-2. ➕ Press Add to Cart: I-click ang "Add to Cart" para ilagay sa shopping cart
-
-3. 🛍️ Press Show Cart: I-click ang "Show Cart" para tingnan ang mga nasa cart ninyo
-
-4. 💳 Then Proceed to Checkout: I-click ang "Proceed to Checkout" para ma-complete ang order
-
-🌟 Simple at convenient na ordering process para sa lahat ng inyong motorcycle parts needs!"""
-            else:
-                return """How to Order Products at PomWorkz:
-
-1. 🛒 Choose a Product: Select the product you need from our catalog
-
-2. ➕ Press Add to Cart: Click "Add to Cart" to add the item to your shopping cart
-
-3. 🛍️ Press Show Cart: Click "Show Cart" to review the items in your cart
-
-4. 💳 Then Proceed to Checkout: Click "Proceed to Checkout" to complete your order
-
-🌟 Simple and convenient ordering process for all your motorcycle parts needs!"""
-
-        # Check for service process questions in English and Tagalog
-        service_process_keywords_en = [
-            "how is the process of the service", "service process", "what is the service process",
-            "how does the service work", "service workflow", "what happens during service",
-            "service procedure", "steps of service", "how do you service", "service steps"
-        ]
-        service_process_keywords_tl = [
-            "ano ang process ng service", "paano ang service process", "service workflow",
-            "ano ang nangyayari sa service", "process ng pag service", "hakbang sa service"
-        ]
-        
-        is_service_process_query = (any(keyword in cleaned_query for keyword in service_process_keywords_en) or
-                                   any(keyword in cleaned_query for keyword in service_process_keywords_tl))
-        
-        if is_service_process_query:
-            if is_tagalog:
-                return """Ang Service Process sa PomWorkz:
-
-1. 📅 Book Appointment: Mag-schedule ng service appointment sa aming website, sa phone, o personal na pagpunta.
-
-2. 🔍 Initial Assessment: Aming mga technicians ay mag-aassess ng inyong motorcycle at magbibigay ng detailed service plan.
-
-3. 🔧 Service Execution: Ang aming skilled mechanics ay gagawin ang requested services nang may precision at care.
-
-4. ✅ Quality Check: Thoroughly namin tinetest ang lahat ng work para ma-ensure na naaabot namin ang aming high standards.
-
-5. 🚀 Delivery: Pick up ninyo ang inyong motorcycle at mag-enjoy sa improved performance at reliability.
-
-🌟 Professional at comprehensive service process para sa best results!"""
-            else:
-                return """The Service Process at PomWorkz:
-
-1. 📅 Book Appointment: Schedule a service appointment through our website, by phone, or in person.
-
-2. 🔍 Initial Assessment: Our technicians will assess your motorcycle and provide a detailed service plan.
-
-3. 🔧 Service Execution: Skilled mechanics perform the requested services with precision and care.
-
-4. ✅ Quality Check: We thoroughly test all work to ensure everything meets our high standards.
-
-5. 🚀 Delivery: Pick up your motorcycle and enjoy the improved performance and reliability.
-
-🌟 Professional and comprehensive service process for the best results!"""
-
-        # Check for greetings in English and Tagalog
-        greetings_en = ["hello", "hi"]
-        greetings_tl = ["kumusta", "magandang", "kamusta", "hoy", "oy"]
-        
-        is_greeting = (any(greeting in cleaned_query for greeting in greetings_en) or
-                      any(greeting in cleaned_query for greeting in greetings_tl))
-        
-        # For greetings, check specifically if it's Tagalog
-        is_tagalog_greeting = any(greeting in cleaned_query for greeting in greetings_tl)
-        
-        if is_greeting:
-            available_items = len(PRODUCTS) + len(SERVICES)
-            if is_tagalog_greeting or is_tagalog:
-                return f"Kumusta! Ako si PomBot, ang auto parts specialist ninyo sa PomWorkz. May {len(PRODUCTS)} products at {len(SERVICES)} services akong alam mula sa aming catalog. Paano kita matutulungan ngayon?"
-            else:
-                return f"Hello! I'm PomBot, your auto parts specialist at PomWorkz. I have information about {len(PRODUCTS)} products and {len(SERVICES)} services from our catalog. How can I help you today?"
-
-        # Check for creator/identity questions in English and Tagalog
-        creator_keywords_en = ["who created you", "who made you", "who is your creator"]
-        creator_keywords_tl = ["sino gumawa", "sino naggawa", "sino creator", "sino ang gumawa"]
-        
-        is_creator_query = (any(q in cleaned_query for q in creator_keywords_en) or
-                          any(q in cleaned_query for q in creator_keywords_tl))
-        
-        if is_creator_query:
-            if is_tagalog:
-                return "Ginawa ako ni Cleo Dipasupil."
-            else:
-                return "I am created by Cleo Dipasupil."
+        # Static and listing answers: booking, ordering, service process,
+        # greetings, creator and the full product/service lists
+        if intent in STATIC_INTENTS:
+            return render_static_response(intent, response_is_tagalog(intent, cleaned_query, is_tagalog))
 
         # Check for FAQ questions in English and Tagalog
-        faq_keywords_en = ['faq', 'frequently asked', 'common questions']
-        faq_keywords_tl = ['mga tanong', 'common na tanong', 'madalas na tanong']
-        
-        is_faq_query = (any(keyword in cleaned_query for keyword in faq_keywords_en) or
-                       any(keyword in cleaned_query for keyword in faq_keywords_tl))
-        
-        if is_faq_query:
-            # Extract FAQ info from knowledge base
-            faq_section = ""
-            lines = KNOWLEDGE_BASE.split('\n')
-            in_faq = False
-            
-            for line in lines:
-                if "FREQUENTLY ASKED QUESTIONS:" in line:
-                    in_faq = True
-                    continue
-                elif in_faq and "WORKSHOP DETAILS:" in line:
-                    break
-                elif in_faq:
-                    faq_section += line + "\n"
+        if intent == "faq":
+            # FAQ section is extracted from the knowledge base once per load
+            faq_section = kb.faq_section
             
             if faq_section.strip():
                 if is_tagalog:
@@ -1289,67 +2069,26 @@ For urgent repairs or if you prefer phone booking, you can also contact us direc
                 else:
                     return f"Here are frequently asked questions:\n\n{faq_section.strip()}"
 
-        # Check for service/product lists from PDF data only
-        product_keywords_en = ["what products", "available products", "list products"]
-        product_keywords_tl = ["ano ang products", "mga products", "anong products", "lista ng products", 
-                              "ano po mga parts", "mga parts nyo", "ano ang parts", "anong parts", 
-                              "available na parts", "mga available na parts"]
-        
-        is_product_query = (any(keyword in cleaned_query for keyword in product_keywords_en) or
-                          any(keyword in cleaned_query for keyword in product_keywords_tl))
-        
-        if any(keyword in cleaned_query for keyword in ["what services", "available services", "list services"]):
-            if SERVICES:
-                service_list = []
-                for i, (service, price) in enumerate(SERVICES.items(), 1):
-                    service_list.append(f"{i}. {service.title()} – {price}")
-                
-                if is_tagalog:
-                    return "Available na Services sa PomWorkz:\n" + "\n".join(service_list)
-                else:
-                    return "Available Services at PomWorkz:\n" + "\n".join(service_list)
-            else:
-                if is_tagalog:
-                    return "Walang services na nakita sa PDF knowledge base."
-                else:
-                    return "No services found in PDF knowledge base."
-        
-        if is_product_query:
-            if PRODUCTS:
-                product_list = []
-                for product, price in PRODUCTS.items():
-                    product_list.append(f"- {product.title()}: ₱{price:,}")
-                
-                if is_tagalog:
-                    return "Available na Products sa PomWorkz:\n" + "\n".join(product_list)
-                else:
-                    return "Available Products at PomWorkz:\n" + "\n".join(product_list)
-            else:
-                if is_tagalog:
-                    return "Walang products na nakita sa PDF knowledge base."
-                else:
-                    return "No products found in PDF knowledge base."
-
         # Get response from Ollama using PDF data
-        response = get_ollama_response(cleaned_query, KNOWLEDGE_BASE)
+        response = get_ollama_response(cleaned_query, kb.prompt_context, is_tagalog=is_tagalog)
         
         # If we got a valid response, return it
         if response and response.strip():
             return response
             
         # Fallback responses based on PDF data
-        if PRODUCTS or SERVICES:
+        if kb.products or kb.services:
             if is_tagalog:
                 return f"""Paano kita matutulungan? Base sa aming PDF catalog, maaari mong itanong:
-• Tungkol sa presyo ng specific products mula sa {len(PRODUCTS)} available products namin
-• Tungkol sa cost ng services mula sa {len(SERVICES)} available services namin
+• Tungkol sa presyo ng specific products mula sa {len(kb.products)} available products namin
+• Tungkol sa cost ng services mula sa {len(kb.services)} available services namin
 • Para sa complete product o service listings
 • Tungkol sa warranty information at policies
 • General information tungkol sa PomWorkz workshop"""
             else:
                 return f"""How can I help you? Based on our PDF catalog, you can ask:
-• About specific product prices from our {len(PRODUCTS)} available products
-• About service costs from our {len(SERVICES)} available services  
+• About specific product prices from our {len(kb.products)} available products
+• About service costs from our {len(kb.services)} available services  
 • For complete product or service listings
 • About warranty information and policies
 • General information about PomWorkz workshop"""
@@ -1364,19 +2103,82 @@ For urgent repairs or if you prefer phone booking, you can also contact us direc
         return "I encountered an error. Please ensure the PDF knowledge base is properly loaded."
 
 
+@app.before_request
+def select_tenant():
+    """Answer the request from the tenant in the /t/<tenant>/ prefix or TENANT_HEADER"""
+    tenant = request.environ.get(TENANT_ENVIRON_KEY) or request.headers.get(TENANT_HEADER) or DEFAULT_TENANT
+    tenant = tenant.strip().lower()
+    try:
+        kb = tenant_registry.get(tenant)
+    except UnknownTenantError:
+        return jsonify({"error": f"Unknown tenant '{tenant}'"}), 404
+    g.knowledge_token = _current_knowledge.set(kb)
+
+
+@app.teardown_request
+def release_tenant(exc):
+    token = g.pop("knowledge_token", None)
+    if token is not None:
+        _current_knowledge.reset(token)
+
+
+@app.before_request
+def start_stage_timer():
+    """Time the stages of chat requests when SERVER_TIMING is on"""
+    if SERVER_TIMING and request.endpoint == "chat":
+        g.timer_token = start_timer()
+
+
+@app.teardown_request
+def stop_stage_timer(exc):
+    token = g.pop("timer_token", None)
+    if token is not None:
+        stop_timer(token)
+
+
+@app.before_request
+def start_request_deadline():
+    """Give the request REQUEST_DEADLINE_SECONDS, or less if the client says it waits less"""
+    seconds = REQUEST_DEADLINE_SECONDS
+    client_seconds = parse_timeout(request.headers.get(DEADLINE_HEADER))
+    from_client = client_seconds is not None and client_seconds < seconds
+    if from_client:
+        seconds = client_seconds
+    g.deadline_token = start_deadline(Deadline(seconds, disconnect_probe(request.environ), from_client))
+
+
+@app.teardown_request
+def stop_request_deadline(exc):
+    token = g.pop("deadline_token", None)
+    if token is not None:
+        stop_deadline(token)
+
+
 @app.after_request
 def after_request(response):
     """Add headers to allow cross-origin requests"""
     response.headers.add('Access-Control-Allow-Origin', '*')
     response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization')
     response.headers.add('Access-Control-Allow-Methods', 'GET,PUT,POST,DELETE,OPTIONS')
+    timer = current_timer()
+    if timer.enabled:
+        response.headers["Server-Timing"] = timer.header()
+        response.headers["Timing-Allow-Origin"] = "*"
     return response
 
 
 @app.route("/api/chat", methods=["POST", "OPTIONS"])
 def chat():
+    kb = current_knowledge()
     if request.method == "OPTIONS":
         return jsonify({"status": "ok"}), 200
+
+    timer = current_timer()
+
+    limited = charge_fast_budget()
+    if limited is not None:
+        timer.intent = "rate_limited"
+        return limited
         
     try:
         data = request.get_json()
@@ -1385,16 +2187,57 @@ def chat():
 
         user_message = data["message"]
         print(f"\nProcessing message: {user_message}")
+
+        with timer.stage("route"):
+            cleaned_query = user_message.strip().lower()
+            is_tagalog = detect_tagalog(cleaned_query)
+
+            # Abusive messages get a canned reply before any routing or model call
+            if profanity_filter.check(cleaned_query):
+                # Intent detection only runs for flagged messages, to count the model calls they would have cost
+                if detect_intent(cleaned_query, is_tagalog) == "llm":
+                    profanity_filter.record_llm_call_saved()
+                timer.intent = "profanity"
+                return jsonify({"response": PROFANITY_REPLY_TL if is_tagalog else PROFANITY_REPLY_EN})
+
+            intent = detect_intent(cleaned_query, is_tagalog)
+        timer.intent = intent
+
+        # Static and listing answers are pre-rendered per knowledge base version
+        language = "tl" if response_is_tagalog(intent, cleaned_query, is_tagalog) else "en"
+        prerendered = kb.prerendered.get((intent, language))
+        if prerendered is not None:
+            timer.intent = f"{intent}/prerendered"
+            return app.response_class(prerendered, mimetype=app.json.mimetype)
         
-        response = get_ai_response(user_message)
+        if intent == "llm":
+            cache_warmer.record(cleaned_query)
+        with timer.stage("answer"), answering(), request_lane(intent):
+            response = get_ai_response(user_message, is_tagalog=is_tagalog)
         print(f"AI response: {response}")
+        if timer.enabled and intent == "llm" and "llm" not in timer.stages:
+            # Price and product questions are answered from the catalog before the model is asked
+            cached = "hit" in (timer.descriptions.get("cache"), timer.descriptions.get("disk_cache"))
+            timer.intent = "cached" if cached else "catalog_lookup"
+
+        if isinstance(response, RateLimitedResponse):
+            timer.intent = "rate_limited"
+            return rate_limited_response(response, response.retry_after)
         
         if not response:
             return jsonify({
                 "response": "I apologize, but I couldn't generate a response. Please try again."
             }), 503
-            
-        return jsonify({"response": response})
+
+        with timer.stage("serialize"):
+            return jsonify({"response": response})
+
+    except LaneFull as e:
+        logger.warning(f"{e}: turning the request away")
+        busy = jsonify({"response": "We are answering a lot of questions right now, please try again shortly."})
+        busy.status_code = 503
+        busy.headers["Retry-After"] = "1"
+        return busy
 
     except Exception as e:
         print(f"Error in chat endpoint: {str(e)}")
@@ -1403,17 +2246,271 @@ def chat():
         }), 500
 
 
+def request_lane(intent):
+    """
+    Lane of a chat request by intent: deterministic answers run in the fast
+    lane; a question for the model takes the slow lane only once the model
+    is really called (catalog and cached answers do not wait for it). Any
+    intent can fall back to the model (e.g. a warranty question the
+    catalog cannot answer), so every request's model call takes the slow
+    lane; a fast request keeps its fast slot meanwhile, but the slow lane
+    bounds how many do.
+    """
+    g.model_lane = slow_lane
+    if intent == "llm":
+        return nullcontext()
+    return fast_lane.admit(FAST_LANE_MAX_WAIT)
+
+
+def create_job_runner():
+    """Background answering for /api/chat/jobs, with results shared by all workers unless CHAT_JOB_STORE=memory"""
+    store = MemoryJobStore(CHAT_JOB_TTL, CHAT_JOB_MAX_RESULTS)
+    if CHAT_JOB_STORE != "memory":
+        try:
+            store = SQLiteJobStore(CHAT_JOB_STORE, CHAT_JOB_TTL, CHAT_JOB_MAX_RESULTS)
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(f"Chat jobs are per process, could not open {CHAT_JOB_STORE}: {e}")
+    return JobRunner(store, workers=CHAT_JOB_WORKERS,
+                     max_pending=CHAT_JOB_MAX_PENDING, stale_after=OLLAMA_DEADLINE * 2)
+
+
+chat_jobs = create_job_runner()
+
+def create_in_flight_counter():
+    """Customer answers in flight, shared by the gunicorn workers unless CACHE_WARMUP_BUSY_FILE=memory"""
+    if CACHE_WARMUP_BUSY_FILE != "memory":
+        try:
+            return InFlightCounter(CACHE_WARMUP_BUSY_FILE)
+        except (OSError, RuntimeError) as e:
+            logger.warning(f"Cache warming only waits for its own worker, could not open {CACHE_WARMUP_BUSY_FILE}: {e}")
+    return InFlightCounter()
+
+
+answers_in_flight = create_in_flight_counter()
+
+
+@contextmanager
+def answering():
+    """Marks a customer's question being answered; cache warming waits until none are"""
+    answers_in_flight.add(1)
+    try:
+        yield
+    finally:
+        answers_in_flight.add(-1)
+
+
+def warm_answer(kb, question):
+    """cache_warmer callback: answer question from kb as /api/chat would, filling the answer caches"""
+    cleaned_query = question.strip().lower()
+    is_tagalog = detect_tagalog(cleaned_query)
+    intent = detect_intent(cleaned_query, is_tagalog)
+    language = "tl" if response_is_tagalog(intent, cleaned_query, is_tagalog) else "en"
+    if (intent, language) in kb.prerendered:
+        return WARM
+
+    token = start_timer()
+    try:
+        with use_knowledge(kb):
+            response = get_ai_response(question, is_tagalog=is_tagalog)
+        used_model = "llm" in current_timer().stages
+    finally:
+        stop_timer(token)
+    if not response or isinstance(response, TransientResponse):
+        return FAILED
+    return WARMED if used_model else WARM
+
+
+cache_warmer = CacheWarmer(
+    warm_answer,
+    read_supported_questions("SUPPORTED_QUESTIONS.md"),
+    is_busy=answers_in_flight.busy,
+    concurrency=CACHE_WARMUP_CONCURRENCY,
+    top_n=CACHE_WARMUP_TOP_N,
+)
+
+
+def answer_in_background(message, is_tagalog, kb):
+    """Job body: the full answer, model call included, from the submitting request's tenant"""
+    token = _caches_checked.set(True)
+    try:
+        with use_knowledge(kb), answering():
+            return get_ai_response(message, is_tagalog=is_tagalog)
+    finally:
+        _caches_checked.reset(token)
+
+
+def job_response(job, status_code):
+    response = jsonify(job.to_dict())
+    response.status_code = status_code
+    if not job.done:
+        response.headers["Location"] = url_for("chat_job", job_id=job.id)
+        response.headers["Retry-After"] = "1"
+    return response
+
+
+@app.route("/api/chat/jobs", methods=["POST", "OPTIONS"])
+def submit_chat_job():
+    """
+    Like /api/chat, but questions that need the language model are answered
+    by a background job: 202 with a job id to poll. Everything else is
+    answered inline with status "done".
+    """
+    if request.method == "OPTIONS":
+        return jsonify({"status": "ok"}), 200
+
+    limited = charge_fast_budget()
+    if limited is not None:
+        return limited
+
+    data = request.get_json(silent=True)
+    if not data or not isinstance(data.get("message"), str):
+        return jsonify({"error": "Missing 'message' field"}), 400
+
+    message = data["message"]
+    cleaned_query = message.strip().lower()
+    is_tagalog = detect_tagalog(cleaned_query)
+    if profanity_filter.check(cleaned_query):
+        if detect_intent(cleaned_query, is_tagalog) == "llm":
+            profanity_filter.record_llm_call_saved()
+        return jsonify({"status": "done", "response": PROFANITY_REPLY_TL if is_tagalog else PROFANITY_REPLY_EN})
+
+    if detect_intent(cleaned_query, is_tagalog) == "llm":
+        cache_warmer.record(cleaned_query)
+
+    # Run the deterministic routes now; a model call comes back as DeferredResponse
+    token = _defer_model_calls.set(True)
+    try:
+        response = get_ai_response(message, is_tagalog=is_tagalog)
+    finally:
+        _defer_model_calls.reset(token)
+
+    if isinstance(response, RateLimitedResponse):
+        return rate_limited_response(response, response.retry_after)
+    if not isinstance(response, DeferredResponse):
+        return jsonify({"status": "done", "response": response})
+
+    kb = current_knowledge()
+    job = chat_jobs.submit(lambda: answer_in_background(message, is_tagalog, kb))
+    if job is None:
+        busy = jsonify({"error": "Too many questions are waiting for an answer, please try again shortly."})
+        busy.status_code = 503
+        busy.headers["Retry-After"] = "5"
+        return busy
+    return job_response(job, 202)
+
+
+@app.route("/api/chat/jobs/<job_id>", methods=["GET"])
+def chat_job(job_id):
+    """State of a chat job; ?wait=N long-polls up to N seconds for the answer"""
+    try:
+        wait = min(float(request.args.get("wait", 0)), CHAT_JOB_MAX_WAIT)
+    except ValueError:
+        return jsonify({"error": "'wait' must be a number of seconds"}), 400
+
+    job = chat_jobs.wait(job_id, wait) if wait > 0 else chat_jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown or expired job"}), 404
+    return job_response(job, 200 if job.done else 202)
+
+
+def catalog_response(kind):
+    """
+    Paginated, filterable JSON listing of products or services with an ETag
+    tied to the knowledge base version, 304 support and gzip for large pages.
+    """
+    kb = current_knowledge()
+    try:
+        page = int(request.args.get("page", 1))
+        per_page = int(request.args.get("per_page", CATALOG_PAGE_SIZE))
+    except ValueError:
+        return jsonify({"error": "'page' and 'per_page' must be integers"}), 400
+    if page < 1 or not 1 <= per_page <= CATALOG_MAX_PAGE_SIZE:
+        return jsonify({"error": f"'page' must be >= 1 and 'per_page' between 1 and {CATALOG_MAX_PAGE_SIZE}"}), 400
+
+    category = request.args.get("category", "").strip().lower()
+    name_filter = request.args.get("q", "").strip().lower()
+    use_gzip = "gzip" in request.accept_encodings
+
+    # Same version and query -> same body, so the ETag can be computed before building it
+    query_key = json.dumps([kind, page, per_page, category, name_filter])
+    etag = f"{kb.version}-{hashlib.sha1(query_key.encode('utf-8')).hexdigest()[:12]}"
+    for candidate in (etag + "-gz", etag):
+        if request.if_none_match.contains(candidate):
+            response = app.response_class(status=304)
+            response.set_etag(candidate)
+            response.headers["Vary"] = "Accept-Encoding"
+            return response
+
+    source = kb.products if kind == "products" else kb.services
+    items = []
+    for name, price in source.items():
+        entry = catalog_item(name)
+        item_category = entry.category if entry else None
+        if category and (item_category or "").lower() != category:
+            continue
+        if name_filter and name_filter not in name:
+            continue
+        item = {"name": name.title(), "category": item_category}
+        if kind == "products":
+            item.update({"price": price, "price_display": f"₱{price:,}"})
+        else:
+            item.update({"price_display": entry.price_text if entry else price})
+            if entry:
+                item.update({"min_price": entry.min_price, "max_price": entry.max_price})
+        items.append(item)
+
+    total = len(items)
+    start = (page - 1) * per_page
+    body = app.json.response({
+        "items": items[start:start + per_page],
+        "page": page,
+        "per_page": per_page,
+        "total": total,
+        "total_pages": (total + per_page - 1) // per_page,
+        "version": kb.version,
+    }).get_data()
+
+    response = app.response_class(body, mimetype=app.json.mimetype)
+    if use_gzip and len(body) >= CATALOG_GZIP_MIN_BYTES:
+        response.set_data(gzip.compress(body, compresslevel=6))
+        response.headers["Content-Encoding"] = "gzip"
+        etag += "-gz"
+    response.set_etag(etag)
+    response.headers["Vary"] = "Accept-Encoding"
+    response.headers["Cache-Control"] = "public, max-age=60"
+    return response
+
+
+@app.route("/api/catalog/products", methods=["GET"])
+def catalog_products():
+    """Read-only product listing for storefront and mobile clients"""
+    return catalog_response("products")
+
+
+@app.route("/api/catalog/services", methods=["GET"])
+def catalog_services():
+    """Read-only service listing for storefront and mobile clients"""
+    return catalog_response("services")
+
+
 @app.route("/api/reload", methods=["POST"])
 def reload_knowledge():
-    """Endpoint to reload PDF knowledge base"""
+    """Endpoint to reload the requesting tenant's PDF knowledge base"""
+    tenant = current_knowledge().tenant
     try:
-        success = reload_pdf_data()
-        if success:
+        kb = tenant_registry.reload(tenant)
+        if kb.loaded:
+            # Cached answers are keyed by knowledge version, so only this tenant's go stale
+            if tenant == DEFAULT_TENANT:
+                # The system prompt changed, so re-prime Ollama's prompt cache
+                model_warmer.request_warmup()
+            if CACHE_WARMUP:
+                cache_warmer.schedule(kb)
             return jsonify({
                 "status": "success", 
-                "message": f"Knowledge base reloaded. Found {len(PRODUCTS)} products and {len(SERVICES)} services.",
-                "products_count": len(PRODUCTS),
-                "services_count": len(SERVICES)
+                "message": f"Knowledge base reloaded. Found {len(kb.products)} products and {len(kb.services)} services.",
+                "products_count": len(kb.products),
+                "services_count": len(kb.services)
             }), 200
         else:
             return jsonify({
@@ -1427,37 +2524,94 @@ def reload_knowledge():
         }), 500
 
 
+profiler = SamplingProfiler()
+
+
+def admin_authorized():
+    """True if the request carries ADMIN_TOKEN as a bearer token"""
+    header = request.headers.get("Authorization", "")
+    return bool(ADMIN_TOKEN) and hmac.compare_digest(header, f"Bearer {ADMIN_TOKEN}")
+
+
+@app.route("/api/admin/profile", methods=["POST"])
+def profile():
+    """
+    Sample this worker's live traffic for ?seconds=N and return the hottest
+    functions. Off unless ADMIN_TOKEN is set; one capture at a time.
+    """
+    if not ADMIN_TOKEN:
+        return jsonify({"error": "Not found"}), 404
+    if not admin_authorized():
+        return jsonify({"error": "Unauthorized"}), 401
+    try:
+        seconds = float(request.args.get("seconds", 10))
+        top = int(request.args.get("top", 25))
+    except ValueError:
+        return jsonify({"error": "'seconds' must be a number and 'top' an integer"}), 400
+    if not 0 < seconds <= PROFILE_MAX_SECONDS or top < 1:
+        return jsonify({"error": f"'seconds' must be between 0 and {PROFILE_MAX_SECONDS} and 'top' >= 1"}), 400
+
+    logger.info(f"Profiling for {seconds}s")
+    result = profiler.capture(seconds, top)
+    if result is None:
+        return jsonify({"error": "A profile is already being captured"}), 409
+    result["pid"] = os.getpid()
+    return jsonify(result)
+
+
 @app.route("/health", methods=["GET"])
 def health():
+    kb = current_knowledge()
     try:
-        # Test Ollama connection
-        response = get_ollama_response("test", max_retries=1)
+        # Ollama is asked for its model list only: a test generation would take a model slot per probe
+        try:
+            ollama_ok = model_name(OLLAMA_MODEL) in {model_name(model) for model in ollama_client.list_models()}
+            ollama_status = "connected" if ollama_ok else f"{OLLAMA_MODEL} not found"
+        except OllamaError as e:
+            logger.warning(f"Ollama health check failed: {e}")
+            ollama_ok, ollama_status = False, "not responding"
         
         # Detailed PDF status
-        pdf_exists = os.path.exists(PDF_PATH)
+        pdf_exists = os.path.exists(kb.pdf_path)
         pdf_status = "not found"
         if pdf_exists:
-            if KNOWLEDGE_BASE and (PRODUCTS or SERVICES):
+            if kb.knowledge_base and (kb.products or kb.services):
                 pdf_status = "loaded and parsed"
-            elif KNOWLEDGE_BASE:
+            elif kb.knowledge_base:
                 pdf_status = "loaded but no data extracted"
             else:
                 pdf_status = "found but not loaded"
         
+        breaker_state = ollama_breaker.state
         health_info = {
-            "status": "healthy" if response and pdf_status == "loaded and parsed" else "degraded",
-            "ollama": "connected" if response else "not responding",
+            "status": "healthy" if ollama_ok and pdf_status == "loaded and parsed" else "degraded",
+            "ollama": "circuit open" if breaker_state == OPEN else ollama_status,
+            "tenant": kb.tenant,
             "pdf_file": {
-                "path": PDF_PATH,
+                "path": kb.pdf_path,
                 "exists": pdf_exists,
                 "status": pdf_status
             },
             "knowledge_base": {
-                "loaded": bool(KNOWLEDGE_BASE),
-                "content_length": len(KNOWLEDGE_BASE) if KNOWLEDGE_BASE else 0,
-                "products_count": len(PRODUCTS),
-                "services_count": len(SERVICES)
+                "loaded": bool(kb.knowledge_base),
+                "content_length": len(kb.knowledge_base) if kb.knowledge_base else 0,
+                "prompt": kb.prompt_stats,
+                "products_count": len(kb.products),
+                "services_count": len(kb.services)
             },
+            "ollama_client": ollama_client.stats(),
+            "circuit_breaker": ollama_breaker.stats(),
+            "lanes": {"fast": fast_lane.stats(), "slow": slow_lane.stats()},
+            "model_router": model_router.stats() if model_router else None,
+            "model_warmup": model_warmer.stats(),
+            "profanity_filter": profanity_filter.stats(),
+            "rate_limiter": rate_limiter.stats() if rate_limiter else None,
+            "chat_jobs": chat_jobs.stats(),
+            "answer_cache": answer_cache.stats() if answer_cache is not None else None,
+            "cache_warmer": cache_warmer.stats(),
+            "tenants": tenant_registry.stats(),
+            "process": {"pid": os.getpid(), **{key: round(value, 1) if value is not None else None for key, value
+                                               in zip(("rss_mb", "private_mb"), process_memory_mb())}},
             "data_source": "PDF-only (no hardcoded data)"
         }
         
@@ -1472,17 +2626,86 @@ def health():
         }), 503
 
 
+def process_memory_mb():
+    """
+    (rss, private) memory of this process in MB, or (None, None) off Linux.
+    Private memory leaves out pages still shared copy-on-write with the
+    gunicorn master, so it shows what each worker really adds.
+    """
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            sizes = {}
+            for line in f:
+                match = re.match(r'^(\w+):\s+(\d+) kB', line)
+                if match:
+                    sizes[match.group(1)] = int(match.group(2))
+        return sizes["Rss"] / 1024, (sizes["Private_Clean"] + sizes["Private_Dirty"]) / 1024
+    except (OSError, KeyError):
+        pass
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024), None
+    except (OSError, ValueError, AttributeError):
+        return None, None
+
+
+IMPORT_SECONDS = time.perf_counter() - _IMPORT_STARTED
+_boot_lock = threading.Lock()
+_booted = False
+_worker_pid = None
+
+
+def boot():
+    """
+    Startup phase 1, once per server: load the default tenant's knowledge
+    base. Under gunicorn --preload this runs in the master, before the
+    workers fork and share the snapshot. Returns the snapshot.
+    """
+    global _booted
+    with _boot_lock:
+        started = time.perf_counter()
+        kb = tenant_registry.get(DEFAULT_TENANT)
+        if not _booted:
+            _booted = True
+            rss, _ = process_memory_mb()
+            logger.info(f"Imported in {IMPORT_SECONDS * 1000:.0f} ms, knowledge base loaded in "
+                        f"{(time.perf_counter() - started) * 1000:.0f} ms ({len(kb.products)} products, "
+                        f"{len(kb.services)} services), RSS {rss or 0:.1f} MB")
+    return kb
+
+
+def start_worker():
+    """
+    Startup phase 2, once per serving process and after any fork: start the
+    background threads (threads do not survive fork) and report memory.
+    """
+    global _worker_pid
+    if _worker_pid == os.getpid():
+        return
+    _worker_pid = os.getpid()
+
+    ollama_client.start()
+    # Preload the models so the first customer does not pay the model load time
+    if OLLAMA_WARMUP:
+        model_warmer.start()
+    if CACHE_WARMUP:
+        cache_warmer.schedule(tenant_registry.get(DEFAULT_TENANT))
+    rss, private = process_memory_mb()
+    logger.info(f"Worker {_worker_pid} started: RSS {rss or 0:.1f} MB"
+                + (f", {private:.1f} MB private" if private is not None else ""))
+
+
 # WSGI Application
 def create_app():
+    """The app with its knowledge base loaded; servers call start_worker() in each serving process"""
+    boot()
     return app
 
 
-# Load knowledge base automatically when module is imported
-print(f"Loading knowledge base from PDF: {PDF_PATH}")
-load_knowledge_from_pdf(PDF_PATH)
-print(f"PDF Knowledge base loaded: {len(PRODUCTS)} products, {len(SERVICES)} services")
-
-
 if __name__ == "__main__":
+    from werkzeug.serving import run_simple
+
+    boot()
+    start_worker()
     print(f"Starting server on {HOST}:{PORT}")
     run_simple(HOST, PORT, app, use_reloader=True)
@@ -0,0 +1,117 @@
+"""
+Routing of model fallbacks between a small fast model and a larger one.
+
+Each question that reaches the language model is routed from a few cheap
+features: its length, how many catalog items and catalog words it
+mentions, and whether it asks for reasoning ("why", "compare", "paano").
+Short questions about one catalog item go to the small tier; the large
+tier is only used for the rest, or when the small model has no answer.
+
+Latencies of each tier are kept in a sliding window. When the large
+tier's p95 goes over the SLO it is demoted for a cool-down period and
+every question goes to the small tier; afterwards it gets traffic again
+with a fresh window, like a circuit breaker's half-open state.
+"""
+
+import logging
+import threading
+import time
+from collections import deque, namedtuple
+
+logger = logging.getLogger(__name__)
+
+SMALL = "small"
+LARGE = "large"
+
+ModelTier = namedtuple("ModelTier", ["name", "model", "options"])  # options: Ollama options, e.g. num_predict
+QueryFeatures = namedtuple("QueryFeatures", ["words", "catalog_items", "catalog_terms", "reasoning"])
+
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class ModelRouter:
+    """Picks the model tiers to try for a question and demotes the large tier when it is too slow"""
+
+    def __init__(self, small, large, short_words=12, off_catalog_words=6, slo_p95_seconds=20.0,
+                 window_size=50, minimum_calls=10, demote_seconds=300.0):
+        self.tiers = {SMALL: small, LARGE: large}
+        self.short_words = short_words  # Longer questions go to the large tier
+        self.off_catalog_words = off_catalog_words  # Longer questions naming nothing from the catalog too
+        self.slo_p95_seconds = slo_p95_seconds
+        self.minimum_calls = minimum_calls
+        self.demote_seconds = demote_seconds
+
+        self._lock = threading.Lock()
+        self._latencies = {SMALL: deque(maxlen=window_size), LARGE: deque(maxlen=window_size)}
+        self._demoted_until = 0.0
+        self.calls = {SMALL: 0, LARGE: 0}
+        self.escalations = 0
+        self.demotions = 0
+        self.demoted_calls = 0
+
+    def is_simple(self, features):
+        """True if the small tier should be tried first"""
+        if features.reasoning or features.catalog_items > 1 or features.words > self.short_words:
+            return False
+        return bool(features.catalog_items or features.catalog_terms or features.words <= self.off_catalog_words)
+
+    def route(self, features):
+        """Tiers to try in order: the small tier, then the large one if the small has no answer"""
+        with self._lock:
+            demoted = self._demoted_locked()
+            if demoted:
+                self.demoted_calls += 1
+        if demoted:
+            return [self.tiers[SMALL]]
+        if self.is_simple(features):
+            return [self.tiers[SMALL], self.tiers[LARGE]]
+        return [self.tiers[LARGE]]
+
+    def _demoted_locked(self):
+        if self._demoted_until and time.monotonic() >= self._demoted_until:
+            # Cool-down over: let the large tier prove itself again
+            self._demoted_until = 0.0
+            self._latencies[LARGE].clear()
+            logger.info("Large model tier restored")
+        return bool(self._demoted_until)
+
+    def record(self, tier, elapsed, escalated=False):
+        """Record a call to tier that took elapsed seconds; escalated if it followed a small-tier miss"""
+        with self._lock:
+            self.calls[tier.name] += 1
+            self._latencies[tier.name].append(elapsed)
+            if escalated:
+                self.escalations += 1
+            window = self._latencies[LARGE]
+            if (tier.name == LARGE and not self._demoted_until and len(window) >= self.minimum_calls
+                    and _percentile(window, 0.95) > self.slo_p95_seconds):
+                self._demoted_until = time.monotonic() + self.demote_seconds
+                self.demotions += 1
+                logger.warning(f"Large model tier p95 {_percentile(window, 0.95):.2f}s is over the "
+                               f"{self.slo_p95_seconds:.2f}s SLO: routing to {self.tiers[SMALL].model} "
+                               f"for {self.demote_seconds:.0f}s")
+
+    def stats(self):
+        with self._lock:
+            demoted = self._demoted_locked()
+            tiers = {}
+            for name, tier in self.tiers.items():
+                window = self._latencies[name]
+                tiers[name] = {
+                    "model": tier.model,
+                    "options": tier.options,
+                    "calls": self.calls[name],
+                    "p50_seconds": round(_percentile(window, 0.50), 3) if window else None,
+                    "p95_seconds": round(_percentile(window, 0.95), 3) if window else None,
+                }
+            return {
+                "tiers": tiers,
+                "slo_p95_seconds": self.slo_p95_seconds,
+                "large_demoted": demoted,
+                "demotions": self.demotions,
+                "demoted_calls": self.demoted_calls,
+                "escalations": self.escalations,
+            }
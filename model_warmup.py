@@ -0,0 +1,153 @@
+"""
+Ollama model warm-up and keep-alive manager.
+
+Preloads the chat models (every model tier, with the tier's own options
+so the first real call does not reload it) and optionally the embedding
+model when the app starts, primes Ollama's prompt cache with the stable
+PomBot system prompt, and pings each model in the background once it has
+been idle long enough to risk being unloaded. Every chat call is recorded as cold or warm based on the
+``load_duration`` Ollama reports, so the cost of cold starts is visible.
+"""
+
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# A call is considered cold when Ollama spent longer than this loading the model
+COLD_LOAD_SECONDS = 0.5
+
+
+class ModelWarmer:
+    """Keeps Ollama models resident and tracks cold versus warm call latency"""
+
+    def __init__(self, client, chat_models, embedding_model=None, keep_alive="30m",
+                 ping_interval=600, system_prompt_factory=None, hosts=None):
+        self.client = client
+        self.hosts = hosts or [None]  # With an OllamaPool: warm each of its servers
+        self.chat_models = dict(chat_models)  # model -> Ollama options its calls use (num_ctx etc.)
+        self.embedding_model = embedding_model
+        self.keep_alive = keep_alive
+        self.ping_interval = ping_interval
+        self.system_prompt_factory = system_prompt_factory
+
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._last_activity = {}  # model -> monotonic time of its last call or warm-up
+
+        self.warmups = 0
+        self.warmup_failures = 0
+        self.cold_calls = 0
+        self.warm_calls = 0
+        self.cold_seconds = 0.0
+        self.warm_seconds = 0.0
+        self.last_warmup_seconds = None
+
+    def start(self):
+        """Start the background warm-up thread (idempotent)"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run, name="ollama-warmup", daemon=True)
+        self._thread.start()
+
+    def request_warmup(self):
+        """Ask the background thread to warm up now, e.g. after a knowledge base reload"""
+        self._wake.set()
+
+    def record_call(self, model, elapsed, load_seconds=0.0):
+        """Record a chat call to model; called by get_ollama_response after every model call"""
+        with self._lock:
+            self._last_activity[model] = time.monotonic()
+            if load_seconds >= COLD_LOAD_SECONDS:
+                self.cold_calls += 1
+                self.cold_seconds += elapsed
+            else:
+                self.warm_calls += 1
+                self.warm_seconds += elapsed
+
+    def warm_up(self, models=None):
+        """Load the given models (default: all) and prime the prompt cache with the current system prompt"""
+        if models is None:
+            models = self.models()
+        start = time.perf_counter()
+        messages = None
+        if self.system_prompt_factory and any(model in self.chat_models for model in models):
+            # Same system message as real requests, so Ollama keeps its prefix cached
+            messages = [
+                {"role": "system", "content": self.system_prompt_factory()},
+                {"role": "user", "content": "hi"},
+            ]
+        warmed = []
+        for model in models:
+            try:
+                for host in self.hosts:
+                    self._load(model, messages, {"host": host} if host else {})
+            except Exception as e:
+                logger.warning(f"Ollama warm-up of {model} failed: {e}")
+            else:
+                warmed.append(model)
+
+        elapsed = time.perf_counter() - start
+        now = time.monotonic()
+        with self._lock:
+            for model in warmed:
+                self._last_activity[model] = now
+            if len(warmed) < len(models):
+                self.warmup_failures += 1
+                return False
+            self.warmups += 1
+            self.last_warmup_seconds = elapsed
+        logger.info(f"Warmed up {', '.join(models)} in {elapsed:.2f}s")
+        return True
+
+    def _load(self, model, messages, pinned):
+        if model not in self.chat_models:
+            self.client.embed(model, "warm up", keep_alive=self.keep_alive, max_attempts=1, **pinned)
+            return
+        # The tier's own options (num_ctx in particular): other ones would make the first real call reload it
+        options = self.chat_models[model]
+        if messages:
+            self.client.chat(model, messages, options=dict(options, num_predict=1),
+                             keep_alive=self.keep_alive, max_attempts=1, **pinned)
+        else:
+            self.client.generate(model, options=options or None, keep_alive=self.keep_alive,
+                                 max_attempts=1, **pinned)
+
+    def models(self):
+        """Every model kept resident: the chat models, then the embedding model"""
+        extra = [self.embedding_model] if self.embedding_model and self.embedding_model not in self.chat_models else []
+        return list(self.chat_models) + extra
+
+    def idle_models(self):
+        """Models whose last call or warm-up is at least ping_interval ago"""
+        now = time.monotonic()
+        with self._lock:
+            return [model for model in self.models()
+                    if now - self._last_activity.get(model, 0.0) >= self.ping_interval]
+
+    def _run(self):
+        self.warm_up()
+        while True:
+            woken = self._wake.wait(timeout=self.ping_interval)
+            self._wake.clear()
+            # Only ping models that no real traffic has kept loaded
+            models = None if woken else self.idle_models()
+            if models is None or models:
+                self.warm_up(models)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "chat_models": list(self.chat_models),
+                "embedding_model": self.embedding_model,
+                "keep_alive": self.keep_alive,
+                "warmups": self.warmups,
+                "warmup_failures": self.warmup_failures,
+                "last_warmup_seconds": round(self.last_warmup_seconds, 3) if self.last_warmup_seconds is not None else None,
+                "cold_calls": self.cold_calls,
+                "warm_calls": self.warm_calls,
+                "avg_cold_seconds": round(self.cold_seconds / self.cold_calls, 3) if self.cold_calls else None,
+                "avg_warm_seconds": round(self.warm_seconds / self.warm_calls, 3) if self.warm_calls else None,
+            }
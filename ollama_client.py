@@ -0,0 +1,350 @@
+"""
+Pooled HTTP client for the Ollama API.
+
+One instance is shared by all request threads. It keeps a persistent
+connection pool, applies connect/read timeouts plus a total deadline per
+call, and retries only retryable failures (connection errors, timeouts,
+429 and 5xx) with jittered exponential backoff.
+
+Calls given a ``cancel`` callable are streamed over their own connection.
+A watcher thread checks every in-flight stream a few times per second and
+shuts its socket down once the deadline passes or ``cancel()`` names a
+reason (e.g. the customer disconnected), also while the prompt is still
+being processed; Ollama stops generating when the connection closes, so
+abandoned answers no longer hold the model.
+"""
+
+import http.client
+import json
+import logging
+import os
+import random
+import socket
+import threading
+import time
+
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+CANCEL_POLL_SECONDS = 0.25  # How often the watcher checks in-flight streams
+
+
+class OllamaError(Exception):
+    """Raised when an Ollama call fails; retryable tells whether another attempt could succeed"""
+
+    def __init__(self, message, retryable=False, status_code=None):
+        super().__init__(message)
+        self.retryable = retryable
+        self.status_code = status_code
+
+
+class OllamaCancelled(OllamaError):
+    """Raised when a streamed call is abandoned; reason is e.g. "deadline" or "disconnect"."""
+
+    def __init__(self, reason, elapsed, received):
+        super().__init__(f"Ollama call cancelled ({reason}) after {elapsed:.2f}s")
+        self.reason = reason
+        self.elapsed = elapsed
+        self.received = received  # Chunks generated before the cancellation
+
+
+class _Stream:
+    """An in-flight streamed call, watched for cancellation"""
+
+    __slots__ = ("sock", "cancel", "deadline_at", "reason")
+
+    def __init__(self, sock, cancel, deadline_at):
+        self.sock = sock
+        self.cancel = cancel
+        self.deadline_at = deadline_at
+        self.reason = None
+
+    def abort(self, reason):
+        self.reason = reason
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)  # Wakes the reading thread and closes the connection to Ollama
+        except OSError:
+            pass
+
+
+class OllamaClient:
+    """Thread-safe Ollama client with timeouts, deadlines and retry accounting"""
+
+    def __init__(self, host="http://localhost:11434", connect_timeout=3.0, read_timeout=60.0,
+                 deadline=90.0, max_attempts=3, backoff_base=0.25, backoff_max=4.0, pool_size=8):
+        self.host = host.rstrip("/")
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.deadline = deadline
+        self.max_attempts = max(1, max_attempts)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.attempts = 0
+        self.retries = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.cancelled = {}  # reason -> count
+        self.cancelled_seconds_saved = 0.0
+        self._mean_generation_seconds = None  # Of completed calls, to estimate what a cancellation saved
+
+        self._streams = set()
+        self._watcher_pid = None
+
+    def _count(self, **increments):
+        with self._lock:
+            for name, value in increments.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def backoff(self, attempt):
+        """Full-jitter exponential backoff for the given (0-based) retry"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def _post_once(self, path, body, timeout):
+        try:
+            response = self.session.post(
+                f"{self.host}{path}",
+                data=body,
+                headers={"Content-Type": "application/json"},
+                timeout=timeout,
+            )
+        except requests.Timeout as e:
+            self._count(timeouts=1)
+            raise OllamaError(f"Ollama timed out: {e}", retryable=True) from e
+        except requests.ConnectionError as e:
+            raise OllamaError(f"Could not connect to Ollama: {e}", retryable=True) from e
+        except requests.RequestException as e:
+            # Broken chunked or compressed bodies and the like
+            raise OllamaError(f"Ollama request failed: {e}", retryable=True) from e
+
+        if response.status_code != 200:
+            try:
+                detail = response.json().get("error", response.text)
+            except ValueError:
+                detail = response.text
+            raise OllamaError(
+                f"Ollama returned {response.status_code}: {detail}",
+                retryable=response.status_code in RETRYABLE_STATUS_CODES,
+                status_code=response.status_code,
+            )
+
+        try:
+            result = response.json()
+        except ValueError as e:
+            raise OllamaError(f"Unreadable Ollama response: {e}") from e
+        if not isinstance(result, dict):
+            raise OllamaError(f"Unexpected Ollama response: {response.text[:200]}")
+        self._record_generation(result)
+        return result
+
+    def _record_generation(self, result):
+        seconds = (result.get("total_duration") or 0) / 1e9
+        if seconds > 0:
+            with self._lock:
+                mean = self._mean_generation_seconds
+                self._mean_generation_seconds = seconds if mean is None else 0.9 * mean + 0.1 * seconds
+
+    def _stream_once(self, path, body, timeout, cancel, deadline_at):
+        """
+        One streamed attempt on a dedicated connection, collected into the
+        shape of a non-streamed answer. Raises OllamaCancelled if the
+        watcher aborted it.
+        """
+        url = urlsplit(self.host)
+        connection_class = http.client.HTTPSConnection if url.scheme == "https" else http.client.HTTPConnection
+        connection = connection_class(url.hostname, url.port, timeout=timeout[0])
+        try:
+            connection.connect()
+        except socket.timeout as e:
+            self._count(timeouts=1)
+            raise OllamaError(f"Ollama timed out: {e}", retryable=True) from e
+        except OSError as e:
+            raise OllamaError(f"Could not connect to Ollama: {e}", retryable=True) from e
+
+        connection.sock.settimeout(timeout[1])
+        stream = _Stream(connection.sock, cancel, deadline_at)
+        self._ensure_watcher()
+        with self._lock:
+            self._streams.add(stream)
+        start = time.monotonic()
+        parts = []
+        final = None
+        try:
+            connection.request("POST", url.path.rstrip("/") + path, body=body,
+                               headers={"Content-Type": "application/json"})
+            response = connection.getresponse()
+            if response.status != 200:
+                text = response.read().decode("utf-8", "replace")
+                try:
+                    detail = json.loads(text).get("error", text)
+                except ValueError:
+                    detail = text
+                raise OllamaError(f"Ollama returned {response.status}: {detail}",
+                                  retryable=response.status in RETRYABLE_STATUS_CODES, status_code=response.status)
+            for line in response:
+                if not line.strip():
+                    continue
+                chunk = json.loads(line)
+                if "error" in chunk:
+                    raise OllamaError(f"Ollama stream failed: {chunk['error']}")
+                parts.append(chunk.get("message", {}).get("content") or chunk.get("response") or "")
+                if chunk.get("done"):
+                    final = chunk
+                    break
+        except (OSError, http.client.HTTPException, ValueError) as e:
+            if stream.reason is None and isinstance(e, socket.timeout) and time.monotonic() >= deadline_at:
+                # The read timeout is capped at the deadline, so it can beat the watcher to it
+                stream.reason = "deadline"
+            if stream.reason is None:
+                if isinstance(e, socket.timeout):
+                    self._count(timeouts=1)
+                # Only retry when nothing was generated yet
+                raise OllamaError(f"Ollama stream failed: {e}", retryable=not parts) from e
+        finally:
+            with self._lock:
+                self._streams.discard(stream)
+            connection.close()
+
+        if final is None:
+            if stream.reason is None:
+                raise OllamaError("Ollama stream ended before the answer was complete")
+            elapsed = time.monotonic() - start
+            with self._lock:
+                self.cancelled[stream.reason] = self.cancelled.get(stream.reason, 0) + 1
+                if self._mean_generation_seconds is not None:
+                    self.cancelled_seconds_saved += max(0.0, self._mean_generation_seconds - elapsed)
+            raise OllamaCancelled(stream.reason, elapsed, len(parts))
+
+        self._record_generation(final)
+        if "message" in final:
+            final["message"] = {"role": "assistant", "content": "".join(parts)}
+        else:
+            final["response"] = "".join(parts)
+        return final
+
+    def _ensure_watcher(self):
+        with self._lock:
+            if self._watcher_pid == os.getpid():
+                return
+            self._watcher_pid = os.getpid()
+            self._streams = set()
+        threading.Thread(target=self._watch, name="ollama-cancel-watcher", daemon=True).start()
+
+    def _watch(self):
+        while True:
+            time.sleep(CANCEL_POLL_SECONDS)
+            with self._lock:
+                streams = list(self._streams)
+            now = time.monotonic()
+            for stream in streams:
+                if stream.reason is not None:
+                    continue
+                try:
+                    reason = "deadline" if now >= stream.deadline_at else stream.cancel()
+                except Exception as e:
+                    logger.warning(f"Cancellation check failed: {e}")
+                    reason = None
+                if reason:
+                    stream.abort(reason)
+
+    def post(self, path, payload, deadline=None, max_attempts=None, cancel=None):
+        """
+        POST a JSON payload, retrying retryable errors until max_attempts or
+        the deadline (seconds from now) is reached. With cancel, the answer
+        is streamed and abandoned as soon as cancel() returns a reason.
+        """
+        if cancel is not None:
+            payload = dict(payload, stream=True)
+        # Serialize once; retries resend the same bytes
+        body = json.dumps(payload).encode("utf-8")
+        deadline_at = time.monotonic() + (deadline if deadline is not None else self.deadline)
+        max_attempts = max_attempts or self.max_attempts
+        self._count(requests=1)
+
+        attempt = 0
+        while True:
+            remaining = deadline_at - time.monotonic()
+            if remaining <= 0:
+                self._count(failures=1, timeouts=1)
+                raise OllamaError("Ollama request deadline exceeded", retryable=False)
+
+            self._count(attempts=1)
+            timeout = (self.connect_timeout, min(self.read_timeout, remaining))
+            try:
+                if cancel is not None:
+                    return self._stream_once(path, body, timeout, cancel, deadline_at)
+                return self._post_once(path, body, timeout)
+            except OllamaCancelled:
+                raise
+            except OllamaError as e:
+                attempt += 1
+                if not e.retryable or attempt >= max_attempts:
+                    self._count(failures=1)
+                    raise
+
+                delay = min(self.backoff(attempt - 1), max(0.0, deadline_at - time.monotonic()))
+                logger.warning(f"Ollama attempt {attempt} failed: {e}; retrying in {delay:.2f}s")
+                self._count(retries=1)
+                time.sleep(delay)
+
+    def list_models(self, timeout=None):
+        """Names of the models the server has (GET /api/tags)"""
+        try:
+            response = self.session.get(f"{self.host}/api/tags",
+                                        timeout=timeout or (self.connect_timeout, self.connect_timeout))
+            if response.status_code != 200:
+                raise OllamaError(f"Ollama returned {response.status_code} listing models",
+                                  retryable=response.status_code in RETRYABLE_STATUS_CODES,
+                                  status_code=response.status_code)
+            return [model.get("name") or model.get("model") for model in response.json().get("models", [])]
+        except requests.RequestException as e:
+            raise OllamaError(f"Could not list Ollama models: {e}", retryable=True) from e
+        except ValueError as e:
+            raise OllamaError(f"Unreadable Ollama model list: {e}") from e
+
+    def chat(self, model, messages, options=None, keep_alive=None, **kwargs):
+        payload = {"model": model, "messages": messages, "stream": False}
+        if options:
+            payload["options"] = options
+        if keep_alive is not None:
+            payload["keep_alive"] = keep_alive
+        return self.post("/api/chat", payload, **kwargs)
+
+    def generate(self, model, prompt="", options=None, keep_alive=None, **kwargs):
+        payload = {"model": model, "prompt": prompt, "stream": False}
+        if options:
+            payload["options"] = options
+        if keep_alive is not None:
+            payload["keep_alive"] = keep_alive
+        return self.post("/api/generate", payload, **kwargs)
+
+    def embed(self, model, input, keep_alive=None, **kwargs):
+        payload = {"model": model, "input": input}
+        if keep_alive is not None:
+            payload["keep_alive"] = keep_alive
+        return self.post("/api/embed", payload, **kwargs)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "host": self.host,
+                "requests": self.requests,
+                "attempts": self.attempts,
+                "retries": self.retries,
+                "failures": self.failures,
+                "timeouts": self.timeouts,
+                "cancelled": dict(self.cancelled),
+                "cancelled_seconds_saved": round(self.cancelled_seconds_saved, 2),
+            }
@@ -0,0 +1,345 @@
+"""
+Load balancing of model calls over several Ollama servers.
+
+The pool has the OllamaClient interface (chat, generate, embed, post,
+stats) and one client per backend. Each call goes to the backend with the
+fewest calls in flight, with two exceptions:
+
+- Affinity: calls with the same system prompt (or prompt prefix, or an
+  explicit session key) prefer the same backend, picked by rendezvous
+  hashing, so they reuse the prompt Ollama already has processed. A
+  preferred backend keeps the call as long as it has no more than
+  ``affinity_slack`` calls in flight over the least busy one; beyond that
+  the call spills to the least busy backend.
+- Health: a backend failing ``eject_after`` calls in a row (connection
+  errors, timeouts, 429 and 5xx) is ejected for ``eject_seconds``. A
+  background thread also lists every backend's models (GET /api/tags)
+  every ``health_interval`` seconds. Backends that do not answer are left
+  out, and so are backends that lack the requested model. If no backend
+  qualifies, all of them are tried rather than failing outright.
+
+A failed call is retried on another backend within the call's deadline.
+In-flight counts are per process; with several gunicorn workers each
+balances its own calls.
+"""
+
+import hashlib
+import logging
+import os
+import random
+import threading
+import time
+
+from ollama_client import OllamaCancelled, OllamaClient, OllamaError
+
+logger = logging.getLogger(__name__)
+
+AFFINITY_PREFIX_CHARS = 4096  # Prompt characters that make up a call's affinity key
+
+
+def model_name(name):
+    """name as Ollama lists it, with the implicit ":latest" tag"""
+    return name if ":" in name else f"{name}:latest"
+
+
+def affinity_key(payload):
+    """Affinity key of a call: its system prompt, or the start of its prompt; None for embeddings"""
+    messages = payload.get("messages")
+    if messages:
+        prefix = messages[0].get("content", "") if messages[0].get("role") == "system" else ""
+    else:
+        prefix = payload.get("prompt") or ""
+    if not prefix:
+        return None
+    return hashlib.sha256(prefix[:AFFINITY_PREFIX_CHARS].encode("utf-8")).hexdigest()[:16]
+
+
+def _rendezvous_weight(key, host):
+    return int(hashlib.sha256(f"{key}\0{host}".encode("utf-8")).hexdigest()[:16], 16)
+
+
+class Backend:
+    """One Ollama server of the pool and what the pool knows about it"""
+
+    def __init__(self, client):
+        self.client = client
+        self.host = client.host
+        self.outstanding = 0
+        self.models = None  # Model names from the last health check; None until the first one
+        self.healthy = None  # Result of the last health check; None until the first one
+        self.consecutive_failures = 0
+        self.ejected_until = 0.0
+        self.ejections = 0
+        self.calls = 0
+        self.failures = 0
+        self.last_error = None
+
+    def serves(self, model):
+        return self.models is None or model is None or model_name(model) in self.models
+
+    def available(self, now):
+        return self.healthy is not False and now >= self.ejected_until
+
+
+class OllamaPool:
+    """OllamaClient-compatible pool of Ollama servers with least-outstanding-requests routing"""
+
+    def __init__(self, hosts, connect_timeout=3.0, read_timeout=60.0, deadline=90.0, max_attempts=3,
+                 backoff_base=0.25, backoff_max=4.0, pool_size=8, affinity_slack=2, eject_after=3,
+                 eject_seconds=30.0, health_interval=15.0, models=()):
+        if not hosts:
+            raise ValueError("An Ollama pool needs at least one host")
+        self.backends = [Backend(OllamaClient(host, connect_timeout=connect_timeout, read_timeout=read_timeout,
+                                              deadline=deadline, max_attempts=1, backoff_base=backoff_base,
+                                              backoff_max=backoff_max, pool_size=pool_size))
+                         for host in hosts]
+        self.deadline = deadline
+        self.max_attempts = max(1, max_attempts)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.affinity_slack = affinity_slack
+        self.eject_after = eject_after
+        self.eject_seconds = eject_seconds
+        self.health_interval = health_interval
+        self.models = [model for model in models if model]  # Models the app calls; missing ones are logged
+
+        self._lock = threading.Lock()
+        self._next = 0  # Round-robin among equally busy backends
+        self._checker_pid = None
+        self.requests = 0
+        self.failovers = 0
+        self.failures = 0
+        self.affinity_hits = 0
+        self.affinity_spills = 0
+        self.panics = 0  # Calls sent while no backend was healthy and had the model
+
+    @property
+    def hosts(self):
+        return [backend.host for backend in self.backends]
+
+    def backoff(self, attempt):
+        """Full-jitter exponential backoff for the given (0-based) retry"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def _choose(self, model, affinity, tried, host=None):
+        now = time.monotonic()
+        with self._lock:
+            if host is not None:
+                candidates = [backend for backend in self.backends if backend.host == host]
+            else:
+                candidates = [backend for backend in self.backends if backend not in tried] or self.backends
+                candidates = [backend for backend in candidates if backend.serves(model)] or candidates
+                available = [backend for backend in candidates if backend.available(now)]
+                if not available:
+                    self.panics += 1
+                candidates = available or candidates
+            if not candidates:
+                raise OllamaError(f"No Ollama backend {host}")
+
+            least = min(backend.outstanding for backend in candidates)
+            choice = None
+            if affinity is not None and len(candidates) > 1:
+                preferred = max(candidates, key=lambda backend: _rendezvous_weight(affinity, backend.host))
+                if preferred.outstanding <= least + self.affinity_slack:
+                    choice = preferred
+                    self.affinity_hits += 1
+                else:
+                    self.affinity_spills += 1
+            if choice is None:
+                idle = [backend for backend in candidates if backend.outstanding == least]
+                choice = idle[self._next % len(idle)]
+                self._next += 1
+            choice.outstanding += 1
+            choice.calls += 1
+            return choice
+
+    def _release(self, backend, model, error=None):
+        with self._lock:
+            backend.outstanding -= 1
+            if error is None or isinstance(error, OllamaCancelled):
+                backend.consecutive_failures = 0
+                return
+            backend.last_error = str(error)
+            if error.status_code == 404 and model and backend.models is not None:
+                # "model not found": skip this backend for the model until the next health check
+                backend.models.discard(model_name(model))
+            if not error.retryable:
+                return
+            backend.failures += 1
+            backend.consecutive_failures += 1
+            if backend.consecutive_failures >= self.eject_after and time.monotonic() >= backend.ejected_until:
+                backend.ejected_until = time.monotonic() + self.eject_seconds
+                backend.ejections += 1
+                logger.warning(f"Ejected Ollama backend {backend.host} for {self.eject_seconds:.0f}s after "
+                               f"{backend.consecutive_failures} failed calls: {error}")
+
+    def post(self, path, payload, deadline=None, max_attempts=None, cancel=None, affinity=None, host=None):
+        """
+        POST payload to the best backend, failing over to another one on
+        retryable errors until max_attempts or the deadline (seconds from
+        now). affinity overrides the prompt-prefix key (e.g. a session id);
+        host pins the call to one backend.
+        """
+        deadline_at = time.monotonic() + (deadline if deadline is not None else self.deadline)
+        max_attempts = max_attempts or self.max_attempts
+        model = payload.get("model")
+        if affinity is None:
+            affinity = affinity_key(payload)
+        with self._lock:
+            self.requests += 1
+
+        tried = set()
+        attempt = 0
+        while True:
+            remaining = deadline_at - time.monotonic()
+            if remaining <= 0:
+                with self._lock:
+                    self.failures += 1
+                raise OllamaError("Ollama request deadline exceeded", retryable=False)
+
+            backend = self._choose(model, affinity, tried, host)
+            try:
+                result = backend.client.post(path, payload, deadline=remaining, max_attempts=1, cancel=cancel)
+            except OllamaError as e:
+                self._release(backend, model, e)
+                attempt += 1
+                missing_model = e.status_code == 404 and host is None
+                if isinstance(e, OllamaCancelled):
+                    raise
+                if not (e.retryable or missing_model) or attempt >= max_attempts:
+                    with self._lock:
+                        self.failures += 1
+                    raise
+                tried.add(backend)
+                if len(tried) >= len(self.backends):
+                    # Every backend failed once: back off before going round again
+                    tried.clear()
+                    time.sleep(min(self.backoff(attempt - 1), max(0.0, deadline_at - time.monotonic())))
+                with self._lock:
+                    self.failovers += 1
+                logger.warning(f"Ollama backend {backend.host} failed: {e}; trying again")
+                continue
+            except Exception as e:
+                # Not the backend's fault as far as we know: give its slot back without judging its health
+                self._release(backend, model, OllamaError(f"Unexpected error: {e}"))
+                with self._lock:
+                    self.failures += 1
+                raise
+            self._release(backend, model)
+            return result
+
+    def chat(self, model, messages, options=None, keep_alive=None, **kwargs):
+        payload = {"model": model, "messages": messages, "stream": False}
+        if options:
+            payload["options"] = options
+        if keep_alive is not None:
+            payload["keep_alive"] = keep_alive
+        return self.post("/api/chat", payload, **kwargs)
+
+    def generate(self, model, prompt="", options=None, keep_alive=None, **kwargs):
+        payload = {"model": model, "prompt": prompt, "stream": False}
+        if options:
+            payload["options"] = options
+        if keep_alive is not None:
+            payload["keep_alive"] = keep_alive
+        return self.post("/api/generate", payload, **kwargs)
+
+    def embed(self, model, input, keep_alive=None, **kwargs):
+        payload = {"model": model, "input": input}
+        if keep_alive is not None:
+            payload["keep_alive"] = keep_alive
+        return self.post("/api/embed", payload, **kwargs)
+
+    def list_models(self, timeout=None):
+        """Models of every backend that answers (GET /api/tags); OllamaError if none does"""
+        models = set()
+        errors = []
+        for backend in self.backends:
+            try:
+                models.update(backend.client.list_models(timeout))
+            except OllamaError as e:
+                errors.append(e)
+        if len(errors) == len(self.backends):
+            raise OllamaError(f"No Ollama backend answered: {errors[-1]}", retryable=True)
+        return sorted(model for model in models if model)
+
+    def check_health(self):
+        """List the models of every backend now; unreachable backends are left out until they answer"""
+        for backend in self.backends:
+            try:
+                models = {model_name(name) for name in backend.client.list_models() if name}
+            except OllamaError as e:
+                with self._lock:
+                    was_healthy = backend.healthy
+                    backend.healthy = False
+                    backend.last_error = str(e)
+                if was_healthy is not False:
+                    logger.warning(f"Ollama backend {backend.host} is down: {e}")
+                continue
+            missing = [model for model in self.models if model_name(model) not in models]
+            with self._lock:
+                was_healthy = backend.healthy
+                was_missing = backend.models is not None and any(model_name(m) not in backend.models
+                                                                 for m in self.models)
+                backend.healthy = True
+                backend.models = models
+            if was_healthy is False:
+                logger.info(f"Ollama backend {backend.host} is up again")
+            if missing and not was_missing:
+                logger.warning(f"Ollama backend {backend.host} does not have {', '.join(missing)}")
+
+    def start(self):
+        """Start the health-check thread of this process (idempotent, and again after a fork)"""
+        with self._lock:
+            if self._checker_pid == os.getpid():
+                return
+            self._checker_pid = os.getpid()
+        threading.Thread(target=self._check_forever, name="ollama-health", daemon=True).start()
+
+    def _check_forever(self):
+        while True:
+            try:
+                self.check_health()
+            except Exception as e:
+                logger.warning(f"Ollama health check failed: {e}")
+            time.sleep(self.health_interval)
+
+    def stats(self):
+        clients = [backend.client.stats() for backend in self.backends]
+        cancelled = {}
+        for client in clients:
+            for reason, count in client["cancelled"].items():
+                cancelled[reason] = cancelled.get(reason, 0) + count
+        now = time.monotonic()
+        with self._lock:
+            backends = []
+            for backend, client in zip(self.backends, clients):
+                backends.append({
+                    "host": backend.host,
+                    "healthy": backend.healthy,
+                    "ejected_seconds": round(max(0.0, backend.ejected_until - now), 1),
+                    "outstanding": backend.outstanding,
+                    "calls": backend.calls,
+                    "failures": backend.failures,
+                    "ejections": backend.ejections,
+                    "missing_models": [model for model in self.models
+                                       if backend.models is not None and model_name(model) not in backend.models],
+                    "last_error": backend.last_error,
+                    "timeouts": client["timeouts"],
+                })
+            return {
+                "hosts": self.hosts,
+                "requests": self.requests,
+                "attempts": sum(client["attempts"] for client in clients),
+                # A pool retries on another backend: the same count under the name OllamaClient.stats() uses
+                "retries": self.failovers,
+                "failovers": self.failovers,
+                "failures": self.failures,
+                "timeouts": sum(client["timeouts"] for client in clients),
+                "cancelled": cancelled,
+                "cancelled_seconds_saved": round(sum(client["cancelled_seconds_saved"] for client in clients), 2),
+                "affinity_hits": self.affinity_hits,
+                "affinity_spills": self.affinity_spills,
+                "panics": self.panics,
+                "backends": backends,
+            }
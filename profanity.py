@@ -0,0 +1,94 @@
+"""
+Phrase-aware profanity filter for incoming chat messages.
+
+The word list is compiled once: single-word entries go into a hashed set
+and multi-word entries ("son of a bitch", "dick-head") into a token trie,
+so a message is checked in one pass over its tokens instead of scanning
+the whole list. Matching is on whole tokens, so "hello" or "class" never
+trip "hell" or "ass".
+"""
+
+import re
+import threading
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# Marks the end of a phrase in the trie
+_END = "$"
+
+
+def _tokens(text):
+    return TOKEN_RE.findall(text.lower())
+
+
+class ProfanityFilter:
+    """Compiled matcher for a list of words and phrases, with usage counters"""
+
+    def __init__(self, entries):
+        self._words = set()
+        self._phrases = {}
+        self.size = 0
+
+        for entry in entries:
+            tokens = _tokens(entry)
+            if not tokens:
+                continue
+            self.size += 1
+            if len(tokens) == 1:
+                self._words.add(tokens[0])
+                continue
+            node = self._phrases
+            for token in tokens:
+                node = node.setdefault(token, {})
+            node[_END] = " ".join(tokens)
+
+        self._lock = threading.Lock()
+        self.checked = 0
+        self.flagged = 0
+        self.llm_calls_saved = 0
+
+    def find(self, text):
+        """First offending word or phrase in text, or None"""
+        tokens = _tokens(text)
+        words = self._words
+        phrases = self._phrases
+
+        for i, token in enumerate(tokens):
+            if token in words:
+                return token
+            node = phrases.get(token)
+            j = i + 1
+            while node is not None:
+                if _END in node:
+                    return node[_END]
+                if j == len(tokens):
+                    break
+                node = node.get(tokens[j])
+                j += 1
+        return None
+
+    def contains(self, text):
+        return self.find(text) is not None
+
+    def check(self, text):
+        """find() for a chat message, counted in the stats"""
+        match = self.find(text)
+        with self._lock:
+            self.checked += 1
+            if match is not None:
+                self.flagged += 1
+        return match
+
+    def record_llm_call_saved(self):
+        """Count a flagged message that would otherwise have gone to the model"""
+        with self._lock:
+            self.llm_calls_saved += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": self.size,
+                "checked": self.checked,
+                "flagged": self.flagged,
+                "llm_calls_saved": self.llm_calls_saved,
+            }
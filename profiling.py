@@ -0,0 +1,175 @@
+"""
+Request stage timing and an on-demand sampling profiler.
+
+StageTimer collects how long each stage of a chat request took (routing,
+cache lookup, knowledge-base answer, model call, serialization) and
+renders them as a Server-Timing header. When timing is disabled the
+shared NULL_TIMER is used, whose stages are a no-op context manager.
+
+SamplingProfiler snapshots the stacks of every thread in the process
+(sys._current_frames) at a fixed interval for a few seconds of live
+traffic and reports the hottest functions. Nothing is installed between
+captures, so it costs nothing until someone asks for a profile.
+"""
+
+import contextvars
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+
+# Leaf frames of threads that are parked waiting for work, not doing any
+IDLE_FRAMES = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"),
+    ("selectors.py", "select"),
+    ("socketserver.py", "serve_forever"),
+    ("task.py", "handler_thread"),  # waitress worker waiting for a request
+    ("channel.py", "service"),
+    ("wasyncore.py", "poll"),
+}
+
+_NULL_STAGE = nullcontext()
+
+
+class StageTimer:
+    """Stage durations of one request, in insertion order"""
+
+    enabled = True
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages = {}
+        self.descriptions = {}
+        self.intent = None
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+
+    def describe(self, name, description):
+        """Attach a short note to a stage, e.g. cache hit/miss"""
+        self.descriptions[name] = description
+
+    def header(self):
+        """Server-Timing value, durations in milliseconds"""
+        parts = []
+        for name, seconds in self.stages.items():
+            description = self.descriptions.get(name)
+            parts.append(f'{name};dur={seconds * 1000:.2f}' + (f';desc="{description}"' if description else ""))
+        parts.append(f"total;dur={(time.perf_counter() - self.started) * 1000:.2f}")
+        if self.intent:
+            parts.append(f'intent;desc="{self.intent}"')
+        return ", ".join(parts)
+
+
+class _NullTimer:
+    """Stand-in used when timing is off; every call is a no-op"""
+
+    enabled = False
+    intent = None
+
+    def stage(self, name):
+        return _NULL_STAGE
+
+    def describe(self, name, description):
+        pass
+
+    def header(self):
+        return ""
+
+
+NULL_TIMER = _NullTimer()
+
+_current_timer = contextvars.ContextVar("stage_timer", default=NULL_TIMER)
+
+
+def current_timer():
+    """Timer of the request being handled, or NULL_TIMER"""
+    return _current_timer.get()
+
+
+def start_timer():
+    """Start timing the current request; returns the token for stop_timer()"""
+    return _current_timer.set(StageTimer())
+
+
+def stop_timer(token):
+    _current_timer.reset(token)
+
+
+def _frame_label(code):
+    return f"{os.path.basename(code.co_filename)}:{code.co_firstlineno} {code.co_name}"
+
+
+class SamplingProfiler:
+    """Samples every thread's stack; one capture at a time per process"""
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self._busy = threading.Lock()
+        self.captures = 0
+
+    def capture(self, seconds, top=25):
+        """
+        Sample for `seconds` and return the `top` functions by samples in
+        which they were running (self) and on the stack (total). Returns
+        None if another capture is already running.
+        """
+        if not self._busy.acquire(blocking=False):
+            return None
+        try:
+            return self._capture(seconds, top)
+        finally:
+            self._busy.release()
+
+    def _capture(self, seconds, top):
+        self_counts = Counter()
+        total_counts = Counter()
+        samples = 0
+        idle = 0
+        threads_seen = set()
+        caller = threading.get_ident()
+
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            for ident, frame in sys._current_frames().items():
+                if ident == caller:
+                    continue
+                leaf = frame.f_code
+                if (os.path.basename(leaf.co_filename), leaf.co_name) in IDLE_FRAMES:
+                    idle += 1
+                    continue
+                samples += 1
+                threads_seen.add(ident)
+                self_counts[_frame_label(leaf)] += 1
+                on_stack = set()
+                while frame is not None:
+                    on_stack.add(_frame_label(frame.f_code))
+                    frame = frame.f_back
+                total_counts.update(on_stack)
+            time.sleep(self.interval)
+
+        self.captures += 1
+        hottest = sorted(total_counts, key=lambda label: (self_counts[label], total_counts[label]), reverse=True)
+        return {
+            "seconds": seconds,
+            "interval_ms": self.interval * 1000,
+            "samples": samples,
+            "idle_samples": idle,
+            "threads": len(threads_seen),
+            "top": [{
+                "function": label,
+                "self": self_counts[label],
+                "self_pct": round(100.0 * self_counts[label] / samples, 1) if samples else 0.0,
+                "total": total_counts[label],
+                "total_pct": round(100.0 * total_counts[label] / samples, 1) if samples else 0.0,
+            } for label in hottest[:top]],
+        }
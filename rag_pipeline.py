@@ -1,22 +1,57 @@
-from langchain_community.vectorstores import Chroma
 from langchain_ollama.embeddings import OllamaEmbeddings
 from langchain_community.document_loaders import TextLoader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
+from embedding_cache import CachedEmbeddings, EmbeddingCache
+from catalog_chunker import CatalogTextSplitter
+import os
 import re
 
+EMBEDDING_MODEL = os.environ.get("EMBEDDING_MODEL", "qwen2.5:0.5b")
+EMBED_BATCH_SIZE = int(os.environ.get("EMBED_BATCH_SIZE", 32))
+EMBED_CONCURRENCY = int(os.environ.get("EMBED_CONCURRENCY", 2))
+EMBED_CACHE_PATH = os.environ.get("EMBED_CACHE_PATH", "cache/embeddings.sqlite3")
+VECTOR_BACKEND = os.environ.get("VECTOR_BACKEND", "chroma")  # "chroma" or "flat"
+FLAT_INDEX_PATH = os.environ.get("FLAT_INDEX_PATH", "cache/flat_index")
+FLAT_INDEX_QUANTIZE = os.environ.get("FLAT_INDEX_QUANTIZE", "0") == "1"
+CHUNKER = os.environ.get("RAG_CHUNKER", "catalog")  # "catalog" or "recursive"
+
 # Load documents with UTF-8 encoding to prevent decoding errors
 loader = TextLoader("knowledge_base.txt", encoding="utf-8")
 documents = loader.load()
 
-# Split text into chunks for better retrieval
-text_splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=100)
+# Split text into chunks for better retrieval. The catalog splitter follows
+# the === banners, category headings and Q/A pairs of knowledge_base.txt.
+if CHUNKER == "recursive":
+    text_splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=100)
+else:
+    text_splitter = CatalogTextSplitter(target_chars=600, max_chars=1200)
 texts = text_splitter.split_documents(documents)
 
-# Use Ollama embeddings for vector search
-embedding_model = OllamaEmbeddings(model="qwen2.5:0.5b")
+# Use Ollama embeddings for vector search, batched and cached by (model, text hash)
+embedding_model = CachedEmbeddings(
+    OllamaEmbeddings(model=EMBEDDING_MODEL),
+    model=EMBEDDING_MODEL,
+    cache=EmbeddingCache(EMBED_CACHE_PATH or None),
+    batch_size=EMBED_BATCH_SIZE,
+    max_concurrency=EMBED_CONCURRENCY,
+)
+
+if VECTOR_BACKEND == "flat":
+    # Contiguous (optionally int8) matrix, memory-mapped and shared by all workers
+    from vector_index import FlatVectorStore
+
+    vector_store = FlatVectorStore.from_documents(
+        texts,
+        embedding_model,
+        path=FLAT_INDEX_PATH or None,
+        quantize=FLAT_INDEX_QUANTIZE,
+        model=EMBEDDING_MODEL,
+    )
+else:
+    # Store embeddings in ChromaDB
+    from langchain_community.vectorstores import Chroma
 
-# Store embeddings in ChromaDB
-vector_store = Chroma.from_documents(texts, embedding_model)
+    vector_store = Chroma.from_documents(texts, embedding_model)
 
 # Create a retriever with a maximum of 2 results
 retriever = vector_store.as_retriever(search_kwargs={"k": 2})
@@ -0,0 +1,186 @@
+"""
+Per-client token-bucket rate limiting.
+
+Each client (API key or IP address) gets one bucket per budget, e.g. a
+generous "fast" budget for every chat request and a small "llm" budget
+for requests that actually reach the language model. Buckets live either
+in process memory or in a small memory-mapped file shared by all gunicorn
+workers on the host. Both stores have a fixed capacity; when full, the
+least recently used bucket is dropped, which only ever resets an idle
+client back to a full bucket.
+"""
+
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: only the in-memory store is available
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+Budget = namedtuple("Budget", ["rate", "burst"])  # tokens per second, bucket size
+
+FILE_MAGIC = b"PBRL0001"
+FILE_HEADER = struct.Struct("<8sQ")  # magic, slot count
+SLOT = struct.Struct("<Qdd")  # key hash (0 = empty), tokens, last update (unix time)
+PROBE_LENGTH = 8
+
+
+def _refill(tokens, updated, now, budget):
+    if updated <= 0:
+        return float(budget.burst)
+    return min(float(budget.burst), tokens + max(0.0, now - updated) * budget.rate)
+
+
+def _take(tokens, budget, cost):
+    """(allowed, tokens left, seconds until cost tokens are available)"""
+    if tokens >= cost:
+        return True, tokens - cost, 0.0
+    return False, tokens, (cost - tokens) / budget.rate
+
+
+class MemoryBucketStore:
+    """Buckets in a bounded LRU dict; per process"""
+
+    def __init__(self, max_keys=4096):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def take(self, key, budget, now, cost=1):
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (0.0, 0.0))
+            allowed, tokens, retry_after = _take(_refill(tokens, updated, now, budget), budget, cost)
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+                self.evictions += 1
+            return allowed, retry_after
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+class FileBucketStore:
+    """
+    Buckets in a fixed-size open-addressing table in a memory-mapped file,
+    shared by every process that opens the same path. Updates are
+    serialized with flock (between processes) and a lock (between threads).
+    """
+
+    def __init__(self, path, max_keys=4096):
+        if fcntl is None:
+            raise RuntimeError("FileBucketStore needs fcntl (POSIX)")
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.path = path
+        self.slots = max_keys
+        self.size = FILE_HEADER.size + SLOT.size * self.slots
+        self._lock = threading.Lock()
+        self._pid = None
+        self.evictions = 0
+        self._open()
+
+    def _open(self):
+        """
+        Open and map the file. Called again after a fork (gunicorn --preload):
+        flock only excludes separate open files, so each worker needs its own.
+        """
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            header = os.pread(self._fd, FILE_HEADER.size, 0)
+            if len(header) < FILE_HEADER.size or FILE_HEADER.unpack(header) != (FILE_MAGIC, self.slots):
+                # New file or a different capacity: start with empty buckets
+                os.ftruncate(self._fd, 0)
+                os.ftruncate(self._fd, self.size)
+                os.pwrite(self._fd, FILE_HEADER.pack(FILE_MAGIC, self.slots), 0)
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        self._map = mmap.mmap(self._fd, self.size)
+        self._pid = os.getpid()
+
+    @staticmethod
+    def key_hash(key):
+        value = int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little")
+        return value or 1  # 0 marks an empty slot
+
+    def _find_slot(self, key_hash):
+        """Offset of key's slot, else an empty one, else the least recently updated in the probe window"""
+        start = key_hash % self.slots
+        empty = None
+        oldest = None
+        oldest_updated = None
+        for i in range(PROBE_LENGTH):
+            offset = FILE_HEADER.size + ((start + i) % self.slots) * SLOT.size
+            slot_key, _, updated = SLOT.unpack_from(self._map, offset)
+            if slot_key == key_hash:
+                return offset, True
+            if slot_key == 0:
+                if empty is None:
+                    empty = offset
+            elif oldest_updated is None or updated < oldest_updated:
+                oldest, oldest_updated = offset, updated
+        if empty is not None:
+            return empty, False
+        self.evictions += 1
+        return oldest, False
+
+    def take(self, key, budget, now, cost=1):
+        key_hash = self.key_hash(key)
+        with self._lock:
+            if self._pid != os.getpid():
+                self._open()
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                offset, found = self._find_slot(key_hash)
+                tokens, updated = (SLOT.unpack_from(self._map, offset)[1:] if found else (0.0, 0.0))
+                allowed, tokens, retry_after = _take(_refill(tokens, updated, now, budget), budget, cost)
+                SLOT.pack_into(self._map, offset, key_hash, tokens, now)
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+        return allowed, retry_after
+
+    def __len__(self):
+        with self._lock:
+            return sum(1 for i in range(self.slots)
+                       if SLOT.unpack_from(self._map, FILE_HEADER.size + i * SLOT.size)[0])
+
+
+class RateLimiter:
+    """Named token-bucket budgets over one bucket store"""
+
+    def __init__(self, store, budgets):
+        self.store = store
+        self.budgets = dict(budgets)
+        self._lock = threading.Lock()
+        self._counts = {name: {"allowed": 0, "rejected": 0} for name in self.budgets}
+
+    def acquire(self, client, budget_name, cost=1):
+        """Take cost tokens from client's bucket; returns (allowed, retry_after_seconds)"""
+        budget = self.budgets[budget_name]
+        allowed, retry_after = self.store.take(f"{budget_name}:{client}", budget, time.time(), cost)
+        with self._lock:
+            self._counts[budget_name]["allowed" if allowed else "rejected"] += 1
+        return allowed, retry_after
+
+    def stats(self):
+        with self._lock:
+            counts = {name: dict(values) for name, values in self._counts.items()}
+        return {
+            "store": type(self.store).__name__,
+            "budgets": {name: {"per_minute": round(budget.rate * 60, 2), "burst": budget.burst, **counts[name]}
+                        for name, budget in self.budgets.items()},
+            "evictions": self.store.evictions,
+        }
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Replay recorded chat messages through get_ai_response and report how they
+were answered.
+
+Messages are read from JSONL files (one object per line with a "message",
+"query", "question" or "text" field) or from application logs (the
+"Processing message: ..." lines chat() prints). Each message is answered
+against a chosen knowledge snapshot with a fake or the real Ollama, and the
+report covers the intent distribution, the share of messages that reached
+the model, cache hits and latency percentiles per intent. Save a report
+with --save and pass it as --baseline on the next catalog version to see
+what moved.
+
+Usage:
+    python replay_traffic.py logs/app.log
+    python replay_traffic.py messages.jsonl --fake-latency-ms 1500 --save before.json
+    python replay_traffic.py messages.jsonl --pdf new_catalog.pdf --baseline before.json
+    python replay_traffic.py messages.jsonl --ollama real
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import random
+import re
+import sys
+import time
+from collections import defaultdict
+
+LOG_MESSAGE_RE = re.compile(r"Processing message: (.*)$")
+MESSAGE_FIELDS = ("message", "query", "question", "text")
+FAKE_ANSWER = "This is a placeholder answer from the fake model."
+
+
+def read_messages(path):
+    """Messages in a JSONL file or an application log, in order"""
+    messages = []
+    with open(path, encoding="utf-8", errors="replace") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith("{"):
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    record = None
+                if isinstance(record, dict):
+                    message = next((record[field] for field in MESSAGE_FIELDS if isinstance(record.get(field), str)), None)
+                    if message is not None:
+                        messages.append(message)
+                    continue
+            match = LOG_MESSAGE_RE.search(line)
+            if match:
+                messages.append(match.group(1))
+    return messages
+
+
+class FakeOllama:
+    """Stands in for OllamaClient.chat with a fixed answer after a simulated generation time"""
+
+    def __init__(self, latency_ms, jitter=0.25, seed=0):
+        self.latency = latency_ms / 1000.0
+        self.jitter = jitter
+        self.random = random.Random(seed)
+        self.calls = 0
+
+    def chat(self, model, messages, **kwargs):
+        self.calls += 1
+        time.sleep(max(0.0, self.latency * (1 + self.random.uniform(-self.jitter, self.jitter))))
+        return {"message": {"content": FAKE_ANSWER}, "load_duration": 0}
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def replay(main, messages):
+    """Answer every message and return (label, reached_model, cache_hit, degraded, seconds) per message"""
+    from profiling import current_timer, start_timer, stop_timer
+
+    results = []
+    labels = {}  # First answer decides what a repeated (cached) question was
+    for message in messages:
+        cleaned = message.strip().lower()
+        token = start_timer()
+        try:
+            start = time.perf_counter()
+            is_tagalog = main.detect_tagalog(cleaned)
+            if main.profanity_filter.contains(cleaned):
+                intent = "profanity"
+            else:
+                intent = main.detect_intent(cleaned, is_tagalog)
+                response = main.get_ai_response(message, is_tagalog=is_tagalog)
+            elapsed = time.perf_counter() - start
+            timer = current_timer()
+        finally:
+            stop_timer(token)
+
+        reached_model = "llm" in timer.stages
+        cache_hit = "hit" in (timer.descriptions.get("cache"), timer.descriptions.get("disk_cache"))
+        degraded = intent != "profanity" and isinstance(response, main.TransientResponse)
+        if intent == "llm" and not reached_model:
+            intent = labels.get(cleaned, "cached") if cache_hit else "catalog_lookup"
+        labels.setdefault(cleaned, intent)
+        results.append((intent, reached_model, cache_hit, degraded, elapsed))
+    return results
+
+
+def summarize(results):
+    by_intent = defaultdict(list)
+    for intent, _, _, _, elapsed in results:
+        by_intent[intent].append(elapsed * 1000)
+
+    total = len(results)
+    intents = {}
+    for intent, latencies in sorted(by_intent.items(), key=lambda entry: -len(entry[1])):
+        latencies.sort()
+        intents[intent] = {
+            "count": len(latencies),
+            "share": round(len(latencies) / total, 4),
+            "p50_ms": round(percentile(latencies, 0.50), 2),
+            "p90_ms": round(percentile(latencies, 0.90), 2),
+            "p99_ms": round(percentile(latencies, 0.99), 2),
+            "max_ms": round(latencies[-1], 2),
+        }
+    return {
+        "messages": total,
+        "llm_fallback_rate": round(sum(1 for r in results if r[1]) / total, 4) if total else 0.0,
+        "cache_hit_rate": round(sum(1 for r in results if r[2]) / total, 4) if total else 0.0,
+        "degraded_rate": round(sum(1 for r in results if r[3]) / total, 4) if total else 0.0,
+        "intents": intents,
+    }
+
+
+def print_report(report, baseline=None):
+    def delta(key):
+        if not baseline:
+            return ""
+        return f"  ({(report[key] - baseline.get(key, 0)) * 100:+.1f} pts)"
+
+    print(f"{report['messages']} messages, knowledge version {report['knowledge_version']}\n")
+    print(f"LLM fallback rate  {report['llm_fallback_rate']:7.1%}{delta('llm_fallback_rate')}")
+    print(f"cache hit rate     {report['cache_hit_rate']:7.1%}{delta('cache_hit_rate')}")
+    print(f"degraded answers   {report['degraded_rate']:7.1%}{delta('degraded_rate')}\n")
+
+    print(f"{'intent':<22}{'count':>7}{'share':>8}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    previous = baseline.get("intents", {}) if baseline else {}
+    for intent, stats in report["intents"].items():
+        line = (f"{intent:<22}{stats['count']:>7}{stats['share']:>8.1%}{stats['p50_ms']:>10.2f}"
+                f"{stats['p90_ms']:>10.2f}{stats['p99_ms']:>10.2f}{stats['max_ms']:>10.2f}")
+        if baseline:
+            line += f"   {(stats['share'] - previous.get(intent, {}).get('share', 0)) * 100:+.1f} pts"
+        print(line)
+    for intent in previous:
+        if intent not in report["intents"]:
+            print(f"{intent:<22}{0:>7}{0:>8.1%}{'':>40}   {-previous[intent]['share'] * 100:+.1f} pts")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay chat messages and report fast-path coverage and latency")
+    parser.add_argument("inputs", nargs="+", help="JSONL files or application logs")
+    parser.add_argument("--pdf", help="catalog PDF to answer from (default: PDF_PATH)")
+    parser.add_argument("--knowledge-txt", default="knowledge_base.txt", help="extra knowledge text used with --pdf")
+    parser.add_argument("--tenant", help="answer from TENANTS_DIR/<tenant> instead")
+    parser.add_argument("--ollama", choices=("fake", "real"), default="fake")
+    parser.add_argument("--fake-latency-ms", type=float, default=1500.0, help="simulated generation time")
+    parser.add_argument("--limit", type=int, help="replay only the first N messages")
+    parser.add_argument("--save", help="write the report as JSON")
+    parser.add_argument("--baseline", help="JSON report to compare against")
+    parser.add_argument("--verbose", action="store_true", help="keep the application's logging")
+    args = parser.parse_args()
+
+    messages = []
+    for path in args.inputs:
+        messages.extend(read_messages(path))
+    if args.limit:
+        messages = messages[:args.limit]
+    if not messages:
+        sys.exit("No chat messages found in the inputs")
+
+    os.environ.setdefault("OLLAMA_WARMUP", "0")
+    os.environ.setdefault("ANSWER_CACHE_PATH", "")  # Fake answers must not land in the shared cache
+    if not args.verbose:
+        logging.disable(logging.WARNING)
+    with contextlib.redirect_stdout(io.StringIO()):
+        import main as app_main
+
+        if args.tenant:
+            kb = app_main.tenant_registry.get(args.tenant)
+        elif args.pdf:
+            kb = app_main.build_response_snapshot(app_main._load_knowledge_sources(args.pdf, args.knowledge_txt))
+        else:
+            kb = app_main.current_knowledge()
+
+        fake = None
+        if args.ollama == "fake":
+            fake = FakeOllama(args.fake_latency_ms)
+            app_main.ollama_client.chat = fake.chat
+
+        with app_main.use_knowledge(kb):
+            results = replay(app_main, messages)
+
+    report = summarize(results)
+    report["knowledge_version"] = kb.version
+    report["ollama"] = args.ollama
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport saved to {args.save}")
+
+
+if __name__ == "__main__":
+    main()
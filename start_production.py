@@ -7,7 +7,7 @@ Uses Waitress WSGI server for production deployment
 import os
 import sys
 from waitress import serve
-from main import app, load_knowledge_from_pdf, PDF_PATH
+from main import app, boot, start_worker, PDF_PATH, SLOW_LANE_CONCURRENCY, SLOW_LANE_QUEUE
 
 def main():
     """Main function to start the production server"""
@@ -15,19 +15,22 @@ def main():
     # Set production environment
     os.environ['FLASK_ENV'] = 'production'
     
-    # Load knowledge base
+    # Load knowledge base (once; importing main no longer parses the PDF)
     print("Loading knowledge base from PDF...")
-    success = load_knowledge_from_pdf(PDF_PATH)
-    if success:
+    if boot().loaded:
         print("✅ Knowledge base loaded successfully")
     else:
         print("❌ Failed to load knowledge base")
         sys.exit(1)
+    start_worker()
     
     # Get configuration
     host = os.environ.get('HOST', '0.0.0.0')
     port = int(os.environ.get('PORT', 1551))
     threads = int(os.environ.get('THREADS', 4))
+    if SLOW_LANE_CONCURRENCY and threads <= SLOW_LANE_CONCURRENCY + SLOW_LANE_QUEUE:
+        print(f"⚠️  {threads} threads leave none for instant answers while the slow lane is full; "
+              f"raise THREADS or lower SLOW_LANE_CONCURRENCY / SLOW_LANE_QUEUE")
     
     print(f"🚀 Starting PomWorkz AI Chatbot on {host}:{port}")
     print(f"📄 PDF Path: {PDF_PATH}")
@@ -43,6 +46,7 @@ def main():
         connection_limit=1000,
         cleanup_interval=30,
         channel_timeout=120,
+        channel_request_lookahead=1,  # Lets requests see client disconnects and cancel their model calls
         expose_tracebacks=False
     )
 
@@ -0,0 +1,180 @@
+"""
+Tenant-scoped knowledge base snapshots.
+
+One PomBot process can serve several shops. Each shop (tenant) has its own
+catalog PDF and knowledge_base.txt, parsed into an immutable
+KnowledgeSnapshot. Snapshots are loaded lazily on first use and kept in an
+LRU bounded by an approximate memory budget; the default tenant is pinned
+and never evicted. A tenant is picked per request from a header or a
+``/t/<tenant>/...`` path prefix.
+"""
+
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TENANT = "default"
+TENANT_ID_RE = re.compile(r'^[a-z0-9][a-z0-9_-]{0,63}$')
+TENANT_PATH_RE = re.compile(r'^/t/([^/]+)(/.*)?$')
+TENANT_ENVIRON_KEY = "pombot.tenant"
+
+# Rough per-record overhead of dict entries, CatalogItems and index arrays
+ITEM_OVERHEAD_BYTES = 400
+
+
+class UnknownTenantError(LookupError):
+    """Raised when a tenant id is malformed or has no catalog on disk"""
+
+
+class KnowledgeSnapshot:
+    """Everything one tenant's answers are built from; replaced, never mutated, on reload"""
+
+    __slots__ = ("tenant", "pdf_path", "knowledge_base", "products", "services", "catalog",
+                 "loaded", "loaded_at", "version", "faq_section", "prerendered", "prompt_context", "prompt_stats")
+
+    def __init__(self, tenant, pdf_path="", knowledge_base="", products=None, services=None,
+                 catalog=None, loaded=False):
+        self.tenant = tenant
+        self.pdf_path = pdf_path
+        self.knowledge_base = knowledge_base
+        self.products = products if products is not None else {}
+        self.services = services if services is not None else {}
+        self.catalog = catalog
+        self.loaded = loaded
+        self.loaded_at = time.time()
+        # Derived data, filled in by main.build_response_snapshot()
+        self.version = ""
+        self.faq_section = ""
+        self.prerendered = {}
+        self.prompt_context = ""  # Compacted knowledge_base for the model's system prompt
+        self.prompt_stats = {}
+
+    def size_bytes(self):
+        """Approximate memory held by this snapshot, used for the LRU budget"""
+        size = len(self.knowledge_base.encode("utf-8")) * 2  # text plus the FAQ/system prompt copies
+        size += len(self.prompt_context.encode("utf-8"))
+        size += sum(len(body) for body in self.prerendered.values())
+        records = len(self.products) + len(self.services) + (len(self.catalog) if self.catalog else 0)
+        return size + records * ITEM_OVERHEAD_BYTES
+
+
+class TenantRegistry:
+    """
+    LRU of loaded tenant snapshots under a memory budget.
+
+    ``loader(tenant)`` builds a snapshot and raises UnknownTenantError for
+    tenants that do not exist. Concurrent first requests for the same
+    tenant share one load.
+    """
+
+    def __init__(self, loader, memory_budget_bytes, pinned=(DEFAULT_TENANT,)):
+        self.loader = loader
+        self.memory_budget_bytes = memory_budget_bytes
+        self.pinned = set(pinned)
+
+        self._lock = threading.Lock()
+        self._load_locks = {}
+        self._snapshots = OrderedDict()
+        self._sizes = {}
+
+        self.hits = 0
+        self.loads = 0
+        self.evictions = 0
+
+    def get(self, tenant):
+        """Snapshot for tenant, loading it on first use"""
+        with self._lock:
+            snapshot = self._snapshots.get(tenant)
+            if snapshot is not None:
+                self._snapshots.move_to_end(tenant)
+                self.hits += 1
+                return snapshot
+            load_lock = self._load_locks.setdefault(tenant, threading.Lock())
+
+        with load_lock:
+            # Another thread may have finished loading while we waited
+            with self._lock:
+                snapshot = self._snapshots.get(tenant)
+                if snapshot is not None:
+                    self._snapshots.move_to_end(tenant)
+                    self.hits += 1
+                    return snapshot
+
+            try:
+                snapshot = self.loader(tenant)
+                self.put(tenant, snapshot)
+                with self._lock:
+                    self.loads += 1
+            finally:
+                with self._lock:
+                    self._load_locks.pop(tenant, None)
+            return snapshot
+
+    def put(self, tenant, snapshot):
+        """Install a (re)loaded snapshot and evict least recently used tenants over budget"""
+        with self._lock:
+            self._snapshots[tenant] = snapshot
+            self._snapshots.move_to_end(tenant)
+            self._sizes[tenant] = snapshot.size_bytes()
+            self._evict_locked(keep=tenant)
+
+    def install(self, tenant, snapshot):
+        """
+        Replace tenant's snapshot with a freshly loaded one. A failed load
+        keeps the previous snapshot, so a broken upload does not take a
+        working shop offline. Returns the snapshot that was given.
+        """
+        with self._lock:
+            previous = self._snapshots.get(tenant)
+        if snapshot.loaded or previous is None or not previous.loaded:
+            self.put(tenant, snapshot)
+        return snapshot
+
+    def reload(self, tenant):
+        """Load tenant again, independently of every other tenant"""
+        return self.install(tenant, self.loader(tenant))
+
+    def _evict_locked(self, keep):
+        total = sum(self._sizes.values())
+        for tenant in list(self._snapshots):
+            if total <= self.memory_budget_bytes:
+                break
+            if tenant == keep or tenant in self.pinned:
+                continue
+            del self._snapshots[tenant]
+            total -= self._sizes.pop(tenant)
+            self.evictions += 1
+            logger.info(f"Evicted tenant {tenant} from memory")
+
+    def stats(self):
+        with self._lock:
+            return {
+                "loaded": list(self._snapshots),
+                "memory_bytes": sum(self._sizes.values()),
+                "memory_budget_bytes": self.memory_budget_bytes,
+                "hits": self.hits,
+                "loads": self.loads,
+                "evictions": self.evictions,
+            }
+
+
+class TenantPathMiddleware:
+    """
+    WSGI middleware that serves every route under ``/t/<tenant>/`` as well,
+    e.g. ``/t/shop-b/api/chat``, recording the tenant in the environ.
+    """
+
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+
+    def __call__(self, environ, start_response):
+        match = TENANT_PATH_RE.match(environ.get("PATH_INFO", ""))
+        if match:
+            environ[TENANT_ENVIRON_KEY] = match.group(1)
+            environ["SCRIPT_NAME"] = environ.get("SCRIPT_NAME", "") + f"/t/{match.group(1)}"
+            environ["PATH_INFO"] = match.group(2) or "/"
+        return self.wsgi_app(environ, start_response)
@@ -0,0 +1,179 @@
+"""
+In-process flat vector index for the RAG retriever.
+
+A lightweight alternative to Chroma for small catalogs: all chunk vectors
+live in one contiguous float32 (or int8-quantized) matrix that is persisted
+as a .npy file and memory-mapped, so every gunicorn worker shares the same
+pages. Search is brute force: one matrix-vector product plus a partial sort.
+"""
+
+import hashlib
+import json
+import logging
+import os
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def _normalize(matrix):
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def documents_fingerprint(documents, model=""):
+    """Hash of the model name and chunk contents, used to validate the on-disk index"""
+    digest = hashlib.sha256(model.encode("utf-8"))
+    for doc in documents:
+        digest.update(b"\0")
+        digest.update(doc.page_content.encode("utf-8"))
+    return digest.hexdigest()
+
+
+class FlatVectorRetriever:
+    """Minimal retriever exposing the same invoke() call as LangChain retrievers"""
+
+    def __init__(self, store, k=4):
+        self.store = store
+        self.k = k
+
+    def invoke(self, question):
+        return self.store.similarity_search(question, k=self.k)
+
+
+class FlatVectorStore:
+    """Brute-force cosine similarity over a memory-mapped embedding matrix"""
+
+    def __init__(self, documents, embedding, matrix, scales=None):
+        self.documents = list(documents)
+        self.embedding = embedding
+        self.matrix = matrix
+        self.scales = scales
+
+    @property
+    def quantized(self):
+        return self.matrix.dtype == np.int8
+
+    @classmethod
+    def from_documents(cls, documents, embedding, path=None, quantize=False, model=""):
+        """
+        Build the index, or memory-map it from path when it was already built
+        for the same documents and model (e.g. by another worker).
+        """
+        documents = list(documents)
+        fingerprint = documents_fingerprint(documents, model)
+        dtype = "int8" if quantize else "float32"
+
+        if path:
+            store = cls.load(path, documents, embedding, fingerprint, dtype)
+            if store is not None:
+                return store
+
+        vectors = np.asarray(embedding.embed_documents([doc.page_content for doc in documents]), dtype=np.float32)
+        matrix = _normalize(vectors.reshape(len(documents), -1)).astype(np.float32)
+        scales = None
+
+        if quantize:
+            # Symmetric per-row int8 quantization: row ~= int8_row * scale
+            scales = np.abs(matrix).max(axis=1) / 127.0
+            scales[scales == 0] = 1.0
+            matrix = np.round(matrix / scales[:, None]).astype(np.int8)
+            scales = scales.astype(np.float32)
+
+        matrix = np.ascontiguousarray(matrix)
+
+        if path:
+            cls._save(path, matrix, scales, fingerprint)
+            store = cls.load(path, documents, embedding, fingerprint, dtype)
+            if store is not None:
+                return store
+
+        return cls(documents, embedding, matrix, scales)
+
+    @staticmethod
+    def _save(path, matrix, scales, fingerprint):
+        """Write the index files atomically so concurrent workers never see partial data"""
+        os.makedirs(path, exist_ok=True)
+        tmp_suffix = f".{os.getpid()}.tmp"
+
+        matrix_path = os.path.join(path, "matrix.npy")
+        with open(matrix_path + tmp_suffix, "wb") as f:
+            np.save(f, matrix)
+        os.replace(matrix_path + tmp_suffix, matrix_path)
+
+        scales_path = os.path.join(path, "scales.npy")
+        if scales is not None:
+            with open(scales_path + tmp_suffix, "wb") as f:
+                np.save(f, scales)
+            os.replace(scales_path + tmp_suffix, scales_path)
+        elif os.path.exists(scales_path):
+            os.remove(scales_path)
+
+        # The manifest is written last: it is what marks the index as complete
+        manifest_path = os.path.join(path, "manifest.json")
+        with open(manifest_path + tmp_suffix, "w", encoding="utf-8") as f:
+            json.dump({"fingerprint": fingerprint, "rows": int(matrix.shape[0]),
+                       "dtype": str(matrix.dtype)}, f)
+        os.replace(manifest_path + tmp_suffix, manifest_path)
+        logger.info(f"Saved flat vector index to {path}: {matrix.shape[0]} x {matrix.shape[1]} {matrix.dtype}")
+
+    @classmethod
+    def load(cls, path, documents, embedding, fingerprint, dtype=None):
+        """
+        Memory-map a previously saved index, or return None if it is missing,
+        stale or stored as another dtype than requested ("float32" or "int8")
+        """
+        manifest_path = os.path.join(path, "manifest.json")
+        try:
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if manifest.get("fingerprint") != fingerprint:
+            logger.info(f"Flat vector index at {path} is stale, rebuilding")
+            return None
+        if dtype is not None and manifest.get("dtype") != dtype:
+            logger.info(f"Flat vector index at {path} is {manifest.get('dtype')}, rebuilding as {dtype}")
+            return None
+
+        try:
+            matrix = np.load(os.path.join(path, "matrix.npy"), mmap_mode="r")
+            scales = None
+            if matrix.dtype == np.int8:
+                scales = np.load(os.path.join(path, "scales.npy"), mmap_mode="r")
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not load flat vector index from {path}: {e}")
+            return None
+
+        if matrix.shape[0] != len(documents):
+            return None
+
+        return cls(documents, embedding, matrix, scales)
+
+    def scores(self, query_vector):
+        """Cosine similarity of the query against every row"""
+        query = _normalize(np.asarray(query_vector, dtype=np.float32))
+        scores = self.matrix @ query
+        if self.scales is not None:
+            scores = scores * self.scales
+        return scores
+
+    def similarity_search_with_score(self, question, k=4):
+        if not self.documents:
+            return []
+
+        scores = self.scores(self.embedding.embed_query(question))
+        k = min(k, len(self.documents))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self.documents[i], float(scores[i])) for i in top]
+
+    def similarity_search(self, question, k=4):
+        return [doc for doc, _ in self.similarity_search_with_score(question, k=k)]
+
+    def as_retriever(self, search_kwargs=None):
+        search_kwargs = search_kwargs or {}
+        return FlatVectorRetriever(self, k=search_kwargs.get("k", 4))
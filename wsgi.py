@@ -1,7 +1,8 @@
-from main import create_app
+from main import create_app, start_worker
 
 app = create_app()
 
 if __name__ == "__main__":
     from waitress import serve
-    serve(app, host="0.0.0.0", port=1551) 
\ No newline at end of file
+    start_worker()
+    serve(app, host="0.0.0.0", port=1551, channel_request_lookahead=1)  # Lets requests see client disconnects